@@ -1,37 +1,149 @@
-from typing import Generator
+import secrets
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.security import decode_token
-from app.db.session import get_db
+from app.core.config import get_settings
+from app.core.ndjson import encode_lines
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.security import Principal, cache_principal, decode_token, get_cached_principal
+from app.db.session import SessionLocal, get_async_db, get_db
 from app.models.student import Student
 from app.services.student_service import StudentService
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> Student:
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _decode_subject(token: str) -> tuple[str, dict]:
     try:
         payload = decode_token(token)
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
     except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user = StudentService.get_by_email(db, email=email)
+        raise _credentials_exception()
+    email: str = payload.get("sub")
+    if email is None:
+        raise _credentials_exception()
+    return email, payload
+
+
+def _remember(token: str, payload: dict, user: Optional[Student]) -> Principal:
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return user
+    principal = Principal(id=user.id, email=user.email, full_name=user.full_name)
+    cache_principal(token, principal, payload.get("exp"))
+    return principal
+
+
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> Principal:
+    # Уже проверенный токен: без декодирования и без запроса к БД
+    principal = get_cached_principal(token)
+    if principal is not None:
+        return principal
+
+    email, payload = _decode_subject(token)
+    return _remember(token, payload, StudentService.get_by_email(db, email=email))
+
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
+) -> Principal:
+    """get_current_user для асинхронных маршрутов: не занимает поток threadpool"""
+    principal = get_cached_principal(token)
+    if principal is not None:
+        return principal
+
+    email, payload = _decode_subject(token)
+    return _remember(token, payload, await StudentService.get_by_email_async(db, email=email))
+
 
+@dataclass(frozen=True)
+class PageParams:
+    """Параметры keyset-пагинации; без limit и cursor список отдается целиком, как раньше"""
+    limit: Optional[int] = None
+    after: Optional[Tuple[datetime, int]] = None
+    include_total: bool = True
 
+    @property
+    def enabled(self) -> bool:
+        return self.limit is not None
+
+
+def get_page_params(
+    limit: Optional[int] = Query(None, ge=1, description="Размер страницы (не больше page_size_max)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor из предыдущего ответа"),
+    include_total: bool = Query(True, description="Считать X-Total-Count"),
+) -> PageParams:
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    page_size_max = get_settings().page_size_max
+    if limit is not None or after is not None:
+        limit = min(limit or page_size_max, page_size_max)
+    return PageParams(limit=limit, after=after, include_total=include_total)
+
+
+def paginate(response: Response, rows: Sequence, page: PageParams, total: Optional[int] = None) -> List:
+    """
+    Обрезает лишнюю строку страницы и выставляет заголовки X-Next-Cursor / X-Total-Count.
+    Тело ответа остается обычным списком, поэтому старые клиенты ничего не замечают.
+    """
+    rows = list(rows)
+    if page.limit is not None and len(rows) > page.limit:
+        rows = rows[: page.limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    return rows
+
+
+def ndjson_response(records: Callable[..., Iterator[dict]], *args, filename: str) -> StreamingResponse:
+    """
+    Потоковый NDJSON-ответ. Сессия запроса закрывается до отправки тела,
+    поэтому генератор открывает свою и закрывает ее, даже если клиент оборвал загрузку.
+    """
+    def body() -> Iterator[bytes]:
+        db = SessionLocal()
+        try:
+            yield from encode_lines(records(db, *args), get_settings().export_chunk_bytes)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+
+def require_metrics_access(request: Request, authorization: Optional[str] = Header(None)) -> None:
+    """Метрики раскрывают трафик по маршрутам и состояние пулов: токен из настроек или только localhost"""
+    token = get_settings().metrics_token
+    if token:
+        scheme, _, credentials = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not secrets.compare_digest(credentials.encode(), token.encode()):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid metrics token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    elif request.client is None or request.client.host not in LOOPBACK_HOSTS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Metrics are only available from localhost")
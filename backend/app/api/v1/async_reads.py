@@ -0,0 +1,112 @@
+"""
+Асинхронные версии горячих GET-маршрутов (включаются настройкой ASYNC_DB=true).
+
+Подключаются в main.py раньше синхронных роутеров и перекрывают те же пути,
+поэтому запросы чтения не занимают потоки threadpool, пока ждут базу.
+Пути с ID объявлены через конвертер :int, чтобы не перехватывать соседние
+статические пути вроде /teams/search-users.
+"""
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import PageParams, get_current_user_async, get_page_params, paginate
+from app.core.etag import etag_matches, project_etag
+from app.core.security import Principal
+from app.db.session import get_async_db
+from app.schemas.project import ProjectRead, ProjectSummary
+from app.schemas.team import TeamRead, TeamReadWithMembers
+from app.services.project_service import ProjectService
+from app.services.team_service import TeamService
+
+projects_router = APIRouter()
+teams_router = APIRouter()
+
+
+@projects_router.get("", response_model=List[ProjectRead])
+async def read_projects(
+    team_id: int,
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async),
+):
+    team = await TeamService.get_team_async(db, team_id)
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+    if not await TeamService.is_user_member_async(db, team.id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a member of the team")
+
+    projects = await ProjectService.get_team_projects_async(db, team_id, limit=page.limit, after=page.after)
+    total = None
+    if page.enabled and page.include_total:
+        total = await ProjectService.count_team_projects_async(db, team_id)
+    return paginate(response, projects, page, total)
+
+
+@projects_router.get("/summary", response_model=List[ProjectSummary])
+async def read_project_summaries(
+    team_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async),
+):
+    team = await TeamService.get_team_async(db, team_id)
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+    if not await TeamService.is_user_member_async(db, team_id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a member of the team")
+
+    return await ProjectService.get_team_project_summaries_async(db, team_id)
+
+
+@projects_router.get("/{project_id:int}", response_model=ProjectRead)
+async def read_project(
+    project_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async),
+):
+    project = await ProjectService.get_project_async(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if not await TeamService.is_user_member_async(db, project.team_id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a member of the project team")
+
+    etag = project_etag(project.id, project.version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag, weak=True):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    # Дерево грузится только для полного ответа
+    return await ProjectService.get_project_async(db, project_id, with_stages=True)
+
+
+@teams_router.get("", response_model=List[TeamRead])
+async def read_teams(
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async),
+):
+    teams = await TeamService.get_user_teams_async(db, current_user.id, limit=page.limit, after=page.after)
+    total = None
+    if page.enabled and page.include_total:
+        total = await TeamService.count_user_teams_async(db, current_user.id)
+    return paginate(response, teams, page, total)
+
+
+@teams_router.get("/{team_id:int}", response_model=TeamReadWithMembers)
+async def read_team(
+    team_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async),
+):
+    team = await TeamService.get_team_async(db, team_id, with_members=True)
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+    if not await TeamService.is_user_member_async(db, team_id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a member of this team")
+    return team
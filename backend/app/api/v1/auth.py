@@ -1,28 +1,65 @@
+from typing import Awaitable, TypeVar
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user, get_db
-from app.core.security import create_access_token, create_refresh_token, decode_token
+from app.core.password_pool import PasswordPoolBusy
+from app.core.security import (
+    Principal,
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    get_password_hash_async,
+    verify_password_async,
+)
 from app.schemas import auth as auth_schema
 from app.schemas.student import StudentCreate, StudentRead
 from app.services.student_service import StudentService
 
 router = APIRouter()
 
+T = TypeVar("T")
+
+
+async def _password_work(work: Awaitable[T]) -> T:
+    """Argon2 идет в отдельный пул; если он переполнен - сразу 503, а не ожидание"""
+    try:
+        return await work
+    except PasswordPoolBusy as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": "1"},
+        ) from exc
+
+
+def _get_by_email_and_release(db: Session, email: str):
+    """Ищет пользователя и сразу возвращает соединение в пул, чтобы не держать его на время Argon2"""
+    student = StudentService.get_by_email(db, email)
+    db.close()
+    return student
+
 
+# register/login асинхронные: запросы к БД идут в общий threadpool короткими вызовами,
+# а хэширование не держит ни его потоки, ни соединения с БД, пока ждет своей очереди
 @router.post("/register", response_model=StudentRead, status_code=status.HTTP_201_CREATED)
-def register(student_in: StudentCreate, db: Session = Depends(get_db)):
-    existing_student = StudentService.get_by_email(db, student_in.email)
+async def register(student_in: StudentCreate, db: Session = Depends(get_db)):
+    existing_student = await run_in_threadpool(_get_by_email_and_release, db, student_in.email)
     if existing_student:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
 
-    student = StudentService.create_student(db, student_in)
+    hashed_password = await _password_work(get_password_hash_async(student_in.password))
+    student = await run_in_threadpool(StudentService.create_student, db, student_in, hashed_password)
     return student
 
 
 @router.post("/login", response_model=auth_schema.Token)
-def login(login_request: auth_schema.LoginRequest, db: Session = Depends(get_db)):
-    student = StudentService.authenticate(db, login_request.email, login_request.password)
+async def login(login_request: auth_schema.LoginRequest, db: Session = Depends(get_db)):
+    student = await run_in_threadpool(_get_by_email_and_release, db, login_request.email)
+    if student and not await _password_work(verify_password_async(login_request.password, student.hashed_password)):
+        student = None
     if not student:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
 
@@ -53,5 +90,5 @@ def refresh_token(request: auth_schema.RefreshRequest):
 
 
 @router.get("/me", response_model=StudentRead)
-def get_me(current_user: StudentRead = Depends(get_current_user)):
+def get_me(current_user: Principal = Depends(get_current_user)):
     return current_user
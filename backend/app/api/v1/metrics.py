@@ -0,0 +1,111 @@
+from typing import List
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import require_metrics_access
+from app.core.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    pool_metrics,
+    query_metrics,
+    render_histogram,
+    render_metric,
+    route_metrics,
+)
+from app.core.security import password_pool, principal_cache
+from app.db import session
+from app.services.student_service import StudentService
+from app.services.team_service import TeamService
+
+router = APIRouter(dependencies=[Depends(require_metrics_access)])
+
+
+@router.get("", response_class=PlainTextResponse)
+def read_metrics():
+    """Все метрики приложения в текстовом формате Prometheus"""
+    lines: List[str] = []
+
+    latency, queries = route_metrics.snapshot()
+    labels = {key: {"method": key[0], "route": key[1], "status": key[2]} for key in latency}
+    render_histogram(
+        lines,
+        "http_request_duration_seconds",
+        "HTTP request latency by route template and status",
+        ((labels[key], histogram) for key, histogram in sorted(latency.items())),
+    )
+    render_metric(
+        lines,
+        "http_request_db_queries_total",
+        "counter",
+        "SQL queries executed while serving requests",
+        ((labels[key], stats.count) for key, stats in sorted(queries.items())),
+    )
+    render_metric(
+        lines,
+        "http_request_db_seconds_total",
+        "counter",
+        "Time spent in SQL queries while serving requests",
+        ((labels[key], stats.seconds) for key, stats in sorted(queries.items())),
+    )
+
+    engine_totals = {name: metrics.snapshot() for name, metrics in query_metrics.items()}
+    render_metric(
+        lines,
+        "db_queries_total",
+        "counter",
+        "SQL queries per engine, including work outside requests",
+        (({"engine": name}, stats.count) for name, stats in engine_totals.items()),
+    )
+    render_metric(
+        lines,
+        "db_query_seconds_total",
+        "counter",
+        "Time spent in SQL queries per engine",
+        (({"engine": name}, stats.seconds) for name, stats in engine_totals.items()),
+    )
+
+    pools = {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
+    for field, name, kind, help_text in (
+        ("in_use", "db_pool_connections_in_use", "gauge", "Connections checked out of the pool"),
+        ("checkouts", "db_pool_checkouts_total", "counter", "Connection checkouts"),
+        ("wait_seconds_total", "db_pool_wait_seconds_total", "counter", "Time spent waiting for a pooled connection"),
+        ("wait_seconds_max", "db_pool_wait_seconds_max", "gauge", "Longest wait for a pooled connection"),
+    ):
+        render_metric(lines, name, kind, help_text, (({"engine": e}, snap[field]) for e, snap in pools.items()))
+
+    caches = {
+        "principal": principal_cache.stats(),
+        "membership": TeamService.membership_cache.stats(),
+        "student_search": StudentService.search_cache.stats(),
+    }
+    for field, name, kind, help_text in (
+        ("size", "cache_entries", "gauge", "Entries currently stored in the cache"),
+        ("hits", "cache_hits_total", "counter", "Cache hits"),
+        ("misses", "cache_misses_total", "counter", "Cache misses"),
+    ):
+        render_metric(lines, name, kind, help_text, (({"cache": c}, stats[field]) for c, stats in caches.items()))
+
+    pool = password_pool.stats()
+    render_metric(lines, "password_pool_in_flight", "gauge", "Password hashes running or queued", [({}, pool["in_flight"])])
+    render_metric(lines, "password_pool_capacity", "gauge", "Password hash workers plus queue slots", [({}, pool["capacity"])])
+    render_metric(
+        lines, "password_pool_rejected_total", "counter", "Password hashes rejected with 503", [({}, pool["rejected"])]
+    )
+
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/pool")
+def read_pool_metrics():
+    """Состояние пулов соединений: занятые соединения, ожидание checkout, размер пула"""
+    engines = {"sync": session.engine, "async": session.async_engine}
+    result = {}
+    for name, metrics in pool_metrics.items():
+        entry = metrics.snapshot()
+        engine = engines.get(name)
+        if engine is not None:
+            pool = engine.pool
+            entry["pool_size"] = pool.size()
+            entry["overflow"] = pool.overflow()
+        result[name] = entry
+    return result
@@ -1,12 +1,32 @@
-from typing import List
+import io
+import tempfile
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_user, get_db
-from app.models.student import Student
-from app.schemas.project import ProjectCreate, ProjectRead, ProjectUpdate, StageCreate, StageRead
-from app.services.project_service import ProjectService
+from app.api.deps import PageParams, get_current_user, get_db, get_page_params, ndjson_response, paginate
+from app.core.config import get_settings
+from app.core.etag import etag_matches, project_etag
+from app.core.security import Principal
+from app.schemas.project import (
+    ProjectCreate,
+    ProjectImportResult,
+    ProjectRead,
+    ProjectSummary,
+    ProjectUpdate,
+    StageCreate,
+    StagePatch,
+    StageRead,
+    TaskPatch,
+)
+from app.schemas.schedule import ProjectCriticalPath, ProjectSchedule, ScheduleChanges
+from app.services.critical_path_service import CriticalPathService
+from app.services.export_service import ExportService
+from app.services.import_service import ImportService, PlanImportError
+from app.services.project_service import ProjectService, StaleProjectVersion
+from app.services.schedule_service import ScheduleService
 from app.services.team_service import TeamService
 
 router = APIRouter()
@@ -16,13 +36,13 @@ router = APIRouter()
 def create_project(
     project_in: ProjectCreate,
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     # Check if user is member of the team
     team = TeamService.get_team(db, project_in.team_id)
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
-    if current_user not in team.members:
+    if not TeamService.is_user_member(db, team.id, current_user.id):
         raise HTTPException(status_code=403, detail="Not a member of the team")
 
     return ProjectService.create_project(db, project_in)
@@ -31,42 +51,121 @@ def create_project(
 @router.get("", response_model=List[ProjectRead])
 def read_projects(
     team_id: int,
+    response: Response,
+    page: PageParams = Depends(get_page_params),
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     team = TeamService.get_team(db, team_id)
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
-    if current_user not in team.members:
+    if not TeamService.is_user_member(db, team.id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a member of the team")
+
+    projects = ProjectService.get_team_projects(db, team_id, limit=page.limit, after=page.after)
+    total = ProjectService.count_team_projects(db, team_id) if page.enabled and page.include_total else None
+    return paginate(response, projects, page, total)
+
+
+@router.get("/summary", response_model=List[ProjectSummary])
+def read_project_summaries(
+    team_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Облегченный список проектов команды: заголовки и агрегаты без этапов и задач"""
+    team = TeamService.get_team(db, team_id)
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+    if not TeamService.is_user_member(db, team_id, current_user.id):
         raise HTTPException(status_code=403, detail="Not a member of the team")
-    
-    return ProjectService.get_team_projects(db, team_id)
+
+    return ProjectService.get_team_project_summaries(db, team_id)
 
 
 @router.get("/{project_id}", response_model=ProjectRead)
 def read_project(
     project_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     project = ProjectService.get_project(db, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Check access via team
-    team = TeamService.get_team(db, project.team_id)
-    if current_user not in team.members:
+    if not TeamService.is_user_member(db, project.team_id, current_user.id):
         raise HTTPException(status_code=403, detail="Not a member of the project team")
-    
+
+    # Версия известна по строке проекта: дерево этапов и задач для 304 не загружается
+    etag = project_etag(project.id, project.version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag, weak=True):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
     return project
 
 
+@router.get("/{project_id}/export")
+def export_project(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Проект целиком в NDJSON (project, stage, task), без сборки ProjectRead в памяти"""
+    project = ProjectService.get_project(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if not TeamService.is_user_member(db, project.team_id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a member of the project team")
+
+    return ndjson_response(ExportService.iter_project, project_id, filename=f"project-{project_id}.ndjson")
+
+
+@router.get("/{project_id}/schedule", response_model=ProjectSchedule)
+def read_project_schedule(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Даты начала и окончания этапов и задач, рассчитанные от дедлайна проекта"""
+    project = ProjectService.get_project(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if not TeamService.is_user_member(db, project.team_id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a member of the project team")
+
+    return ScheduleService.get_project_schedule(db, project_id, project.version)
+
+
+@router.get("/{project_id}/critical-path", response_model=ProjectCriticalPath)
+def read_project_critical_path(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Ранние и поздние сроки, резервы времени и критическая цепочка этапов"""
+    project = ProjectService.get_project(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if not TeamService.is_user_member(db, project.team_id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a member of the project team")
+
+    return CriticalPathService.analyze_project(db, project_id)
+
+
 @router.put("/{project_id}", response_model=ProjectRead)
 def update_project(
     project_id: int,
     project_update: ProjectUpdate,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     project = ProjectService.get_project(db, project_id)
     if not project:
@@ -79,6 +178,7 @@ def update_project(
     updated_project = ProjectService.update_project(db, project_id, project_update)
     if not updated_project:
         raise HTTPException(status_code=404, detail="Project not found")
+    response.headers["ETag"] = project_etag(updated_project.id, updated_project.version)
     return updated_project
 
 
@@ -86,7 +186,7 @@ def update_project(
 def delete_project(
     project_id: int,
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     project = ProjectService.get_project(db, project_id)
     if not project:
@@ -105,25 +205,178 @@ def delete_project(
 def update_project_stages(
     project_id: int,
     stages: List[StageCreate],
+    response: Response,
+    diff: bool = False,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     try:
         project = ProjectService.get_project(db, project_id)
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
         
-        team = TeamService.get_team(db, project.team_id)
-        if current_user not in team.members:
+        if not TeamService.is_user_member(db, project.team_id, current_user.id):
             raise HTTPException(status_code=403, detail="Not a member of the project team")
-        
-        result = ProjectService.update_project_stages(db, project_id, stages)
+
+        # If-Match: сохранение поверх устаревшей версии плана отклоняется
+        expected_version = None
+        if if_match is not None and if_match.strip() != "*":
+            if not etag_matches(if_match, project_etag(project.id, project.version)):
+                raise StaleProjectVersion()
+            expected_version = project.version
+
+        if diff:
+            # Точечное сохранение: этапы и задачи с id обновляются на месте
+            result = ProjectService.update_project_stages_diff(db, project_id, stages, expected_version)
+        else:
+            result = ProjectService.update_project_stages(db, project_id, stages, expected_version)
+        response.headers["ETag"] = project_etag(project.id, project.version)
         return result
+    except StaleProjectVersion:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Project has been modified")
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        # Трассировка уже записана в лог ProjectService
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.post("/{project_id}/import", response_model=ProjectImportResult)
+async def import_project_plan(
+    project_id: int,
+    request: Request,
+    response: Response,
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Формат тела запроса"),
+    partial: bool = Query(False, description="Пропустить строки с ошибками проверки и записать остальные"),
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Заменяет этапы и задачи проекта планом из тела запроса (NDJSON или CSV с заголовком).
+    Тело сначала сбрасывается во временный файл, чтобы транзакция не ждала медленного клиента.
+    Пустой план или план с ошибками (без partial) отклоняется с 422 и отчетом по строкам.
+    """
+    project = await run_in_threadpool(ProjectService.get_project, db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if not await run_in_threadpool(TeamService.is_user_member, db, project.team_id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a member of the project team")
+
+    expected_version = None
+    if if_match is not None and if_match.strip() != "*":
+        if not etag_matches(if_match, project_etag(project.id, project.version)):
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Project has been modified")
+        expected_version = project.version
+
+    with tempfile.SpooledTemporaryFile(max_size=get_settings().import_spool_bytes) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        # utf-8-sig: CSV из табличных редакторов часто начинается с BOM
+        lines = io.TextIOWrapper(upload, encoding="utf-8-sig", errors="replace", newline="")
+        try:
+            result = await run_in_threadpool(
+                ImportService.import_plan, db, project_id, lines, format, expected_version, partial
+            )
+        except StaleProjectVersion:
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Project has been modified")
+        except PlanImportError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail={
+                    "message": exc.message,
+                    "error_count": exc.error_count,
+                    "errors": [error.model_dump() for error in exc.errors],
+                },
+            )
+        finally:
+            lines.detach()
+
+    response.headers["ETag"] = project_etag(project_id, result.version)
+    return result
+
+
+@router.patch("/{project_id}/stages/{stage_id}", response_model=ScheduleChanges)
+def patch_stage(
+    project_id: int,
+    stage_id: int,
+    stage_patch: StagePatch,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Правка одного этапа; в ответе — только изменившиеся даты расписания"""
+    project = ProjectService.get_project(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if not TeamService.is_user_member(db, project.team_id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a member of the project team")
+
+    stage = ProjectService.update_stage(db, project_id, stage_id, stage_patch)
+    if not stage:
+        raise HTTPException(status_code=404, detail="Stage not found")
+    response.headers["ETag"] = project_etag(project.id, project.version)
+    return ScheduleService.apply_stage_update(db, stage, project.version)
+
+
+@router.patch("/{project_id}/tasks/{task_id}", response_model=ScheduleChanges)
+def patch_task(
+    project_id: int,
+    task_id: int,
+    task_patch: TaskPatch,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Правка одной задачи; в ответе — только изменившиеся даты расписания"""
+    project = ProjectService.get_project(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if not TeamService.is_user_member(db, project.team_id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a member of the project team")
+
+    task = ProjectService.update_task(db, project_id, task_id, task_patch)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    response.headers["ETag"] = project_etag(project.id, project.version)
+    return ScheduleService.apply_task_update(db, task, project.version)
+
+
+@router.delete("/{project_id}/stages/{stage_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_stage(
+    project_id: int,
+    stage_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    project = ProjectService.get_project(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if not TeamService.is_user_member(db, project.team_id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a member of the project team")
+
+    if not ProjectService.delete_stage(db, project_id, stage_id):
+        raise HTTPException(status_code=404, detail="Stage not found")
+
+
+@router.delete("/{project_id}/tasks/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_task(
+    project_id: int,
+    task_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    project = ProjectService.get_project(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if not TeamService.is_user_member(db, project.team_id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a member of the project team")
+
+    if not ProjectService.delete_task(db, project_id, task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
@@ -1,14 +1,15 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_user, get_db
-from app.models.student import Student
+from app.api.deps import PageParams, get_current_user, get_db, get_page_params, ndjson_response, paginate
+from app.core.security import Principal
 from app.models.team_invitation import TeamInvitation
 from app.schemas.student import StudentRead
 from app.schemas.team import TeamCreate, TeamRead, TeamReadWithMembers, TeamUpdate
 from app.schemas.team_invitation import TeamInvitationCreate, TeamInvitationRead, TeamInvitationResponse
+from app.services.export_service import ExportService
 from app.services.team_service import TeamService
 from app.services.student_service import StudentService
 from app.services.team_invitation_service import TeamInvitationService
@@ -20,24 +21,28 @@ router = APIRouter()
 def create_team(
     team_in: TeamCreate,
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     return TeamService.create_team(db, team_in, current_user.id)
 
 
 @router.get("", response_model=List[TeamRead])
 def read_teams(
+    response: Response,
+    page: PageParams = Depends(get_page_params),
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
-    return TeamService.get_user_teams(db, current_user.id)
+    teams = TeamService.get_user_teams(db, current_user.id, limit=page.limit, after=page.after)
+    total = TeamService.count_user_teams(db, current_user.id) if page.enabled and page.include_total else None
+    return paginate(response, teams, page, total)
 
 
 @router.get("/search-users", response_model=List[StudentRead])
 def search_users(
     q: str,
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Поиск пользователей по имени или email"""
     if len(q) < 2:
@@ -50,24 +55,39 @@ def search_users(
 def read_team(
     team_id: int,
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     team = TeamService.get_team(db, team_id)
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
     # Check access (is owner OR member)
-    is_member = team.owner_id == current_user.id or any(m.id == current_user.id for m in team.members)
-    if not is_member:
+    if not TeamService.is_user_member(db, team_id, current_user.id):
         raise HTTPException(status_code=403, detail="Not a member of this team")
     return team
 
 
+@router.get("/{team_id}/export")
+def export_team(
+    team_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Все проекты команды в NDJSON, по одному дереву за раз"""
+    team = TeamService.get_team(db, team_id)
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+    if not TeamService.is_user_member(db, team_id, current_user.id):
+        raise HTTPException(status_code=403, detail="Not a member of this team")
+
+    return ndjson_response(ExportService.iter_team, team_id, filename=f"team-{team_id}.ndjson")
+
+
 @router.put("/{team_id}", response_model=TeamRead)
 def update_team(
     team_id: int,
     team_update: TeamUpdate,
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     team = TeamService.update_team(db, team_id, team_update, current_user.id)
     if not team:
@@ -79,7 +99,7 @@ def update_team(
 def delete_team(
     team_id: int,
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     result = TeamService.delete_team(db, team_id, current_user.id)
     if result is None:
@@ -93,7 +113,7 @@ def create_invitation(
     team_id: int,
     invitation_in: TeamInvitationCreate,
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Создать приглашение в команду"""
     team = TeamService.get_team(db, team_id)
@@ -101,8 +121,7 @@ def create_invitation(
         raise HTTPException(status_code=404, detail="Team not found")
     
     # Check access (is owner OR member)
-    is_member = team.owner_id == current_user.id or any(m.id == current_user.id for m in team.members)
-    if not is_member:
+    if not TeamService.is_user_member(db, team_id, current_user.id):
         raise HTTPException(status_code=403, detail="Not a member of this team")
     
     # Проверяем, что приглашают не самого себя
@@ -139,27 +158,21 @@ def create_invitation(
 
 @router.get("/invitations/my", response_model=List[TeamInvitationRead])
 def get_my_invitations(
+    response: Response,
+    page: PageParams = Depends(get_page_params),
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
-    """Получить все мои приглашения"""
-    invitations = TeamInvitationService.get_user_invitations(db, current_user.id)
-    
-    result = []
-    for inv in invitations:
-        result.append(TeamInvitationRead(
-            id=inv.id,
-            team_id=inv.team_id,
-            invited_user_id=inv.invited_user_id,
-            invited_by_id=inv.invited_by_id,
-            status=inv.status,
-            created_at=inv.created_at,
-            responded_at=inv.responded_at,
-            team_name=inv.team.name,
-            invited_by_name=inv.invited_by.full_name,
-            invited_user_name=inv.invited_user.full_name
-        ))
-    return result
+    """Получить мои приглашения (с limit/cursor - постранично)"""
+    invitations = TeamInvitationService.get_user_invitations(
+        db, current_user.id, limit=page.limit, after=page.after
+    )
+    total = (
+        TeamInvitationService.count_user_invitations(db, current_user.id)
+        if page.enabled and page.include_total
+        else None
+    )
+    return paginate(response, invitations, page, total)
 
 
 @router.post("/invitations/{invitation_id}/respond", status_code=status.HTTP_200_OK)
@@ -167,7 +180,7 @@ def respond_to_invitation(
     invitation_id: int,
     response: TeamInvitationResponse,
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Принять или отклонить приглашение"""
     if response.action == "accept":
@@ -188,15 +201,14 @@ def invite_member(
     team_id: int,
     email: str,
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Старый метод для обратной совместимости - создает приглашение по email"""
     team = TeamService.get_team(db, team_id)
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
     # Check access (is owner OR member)
-    is_member = team.owner_id == current_user.id or any(m.id == current_user.id for m in team.members)
-    if not is_member:
+    if not TeamService.is_user_member(db, team_id, current_user.id):
         raise HTTPException(status_code=403, detail="Not a member of this team")
     
     student = StudentService.get_by_email(db, email)
@@ -222,7 +234,7 @@ def invite_member(
 def leave_team(
     team_id: int,
     db: Session = Depends(get_db),
-    current_user: Student = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Выйти из команды"""
     success = TeamService.remove_member(db, team_id, current_user.id)
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -12,6 +13,64 @@ class Settings(BaseSettings):
     refresh_token_expire_days: int = 7
     algorithm: str = "HS256"
     database_url: str = "sqlite:///./app.db"
+    # Асинхронный режим для горячих GET-маршрутов (AsyncEngine поверх той же базы).
+    # Если async_database_url не задан, он выводится из database_url (aiosqlite / psycopg)
+    async_db: bool = False
+    async_database_url: Optional[str] = None
+    # Пул соединений для серверных БД (Postgres); для SQLite используются значения по умолчанию
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
+    # PRAGMA для каждого соединения SQLite: WAL не блокирует чтение на время записи
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 268435456
+    # Кэш проверок членства в команде (на процесс)
+    membership_cache_size: int = 10000
+    membership_cache_ttl_seconds: float = 60.0
+    # Кэш проверенных access-токенов -> пользователь (не дольше срока жизни токена)
+    principal_cache_size: int = 10000
+    principal_cache_ttl_seconds: float = 300.0
+    # Быстрые ответы: orjson для роутеров проектов и команд, gzip для тел от gzip_minimum_size байт
+    orjson_responses: bool = False
+    gzip_enabled: bool = False
+    gzip_minimum_size: int = 1024
+    gzip_compress_level: int = 6
+    # Метрики Prometheus (GET /metrics): задержки по маршрутам, запросы и время БД
+    metrics_enabled: bool = True
+    # Доступ к /metrics и /metrics/pool: с токеном - только с заголовком "Authorization: Bearer <token>"
+    # (bearer_token в конфиге Prometheus), без токена - только с localhost
+    metrics_token: Optional[str] = None
+    # Отладка запросов: заголовки X-Query-Count / X-DB-Time / X-N-Plus-One и предупреждение в лог,
+    # если один и тот же SQL выполнен за запрос n_plus_one_threshold раз и больше
+    debug_queries: bool = False
+    n_plus_one_threshold: int = 5
+    # Запросы дольше порога пишутся в лог вместе с планом EXPLAIN (0 - выключено)
+    slow_query_ms: float = 0.0
+    # Максимальный размер страницы при keyset-пагинации списков
+    page_size_max: int = 100
+    # Поиск пользователей: сколько кандидатов ранжировать и кэш результатов по префиксу запроса
+    student_search_candidates: int = 200
+    student_search_cache_size: int = 2048
+    student_search_cache_ttl_seconds: float = 30.0
+    # Стоимость Argon2 (новые хэши; старые проверяются со своими параметрами)
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65536  # KiB
+    argon2_parallelism: int = 4
+    # Пул для хэширования паролей: потоки и максимальная очередь сверх них
+    password_hash_workers: int = 2
+    password_hash_queue_size: int = 16
+    # Потоковый экспорт NDJSON: строк на порцию курсора и примерный размер куска ответа
+    export_yield_per: int = 1000
+    export_chunk_bytes: int = 65536
+    # Импорт плана: строк на один пакетный INSERT, сколько тела держать в памяти до сброса на диск,
+    # сколько ошибок строк возвращать в ответе
+    import_batch_size: int = 1000
+    import_spool_bytes: int = 1048576
+    import_max_reported_errors: int = 1000
 
 
 @lru_cache
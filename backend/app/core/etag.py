@@ -0,0 +1,45 @@
+from typing import Optional
+
+# Кодировки тела, с которыми ETag получает суффикс: у сжатого тела другие байты,
+# и сильный валидатор не может совпадать с несжатым (кэши, Range-запросы)
+CONTENT_CODINGS = ("gzip", "br", "deflate", "zstd")
+
+
+def project_etag(project_id: int, version: int) -> str:
+    """Сильный ETag проекта: меняется вместе с Project.version"""
+    return f'"project-{project_id}-v{version}"'
+
+
+def encoded_etag(etag: str, coding: str) -> str:
+    """ETag сжатого представления: "project-1-v3" -> "project-1-v3-gzip" (как в Apache mod_deflate)"""
+    return f'{etag[:-1]}-{coding}"'
+
+
+def strip_coding(etag: str) -> str:
+    """Обратное к encoded_etag: версия ресурса одна, в какой бы кодировке клиент его ни получил"""
+    for coding in CONTENT_CODINGS:
+        suffix = f'-{coding}"'
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)] + '"'
+    return etag
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = False) -> bool:
+    """
+    Проверяет If-None-Match (weak=True, слабое сравнение) или If-Match (сильное).
+    Пустой заголовок не совпадает ни с чем, "*" - с любым существующим ресурсом.
+    Теги сжатых представлений (encoded_etag) совпадают с тегом ресурса.
+    """
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if strip_coding(candidate) == etag:
+            return True
+    return False
@@ -0,0 +1,187 @@
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Границы бакетов гистограммы задержек HTTP-запросов, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class PoolMetrics:
+    """Счетчики пула соединений: занятые соединения и ожидание при checkout"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def on_checkout(self) -> None:
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+
+    def on_checkin(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def observe_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_max": self.wait_seconds_max,
+            }
+
+
+# Имя engine ("sync", "async") -> его метрики
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+@dataclass
+class QueryStats:
+    """Число SQL-запросов и время в БД (внутри одного HTTP-запроса или по engine в целом)"""
+    count: int = 0
+    seconds: float = 0.0
+    # Только в режиме DEBUG_QUERIES: текст запроса -> сколько раз выполнен (поиск N+1)
+    statements: Optional[Dict[str, int]] = None
+
+    def add(self, seconds: float, statement: Optional[str] = None) -> None:
+        self.count += 1
+        self.seconds += seconds
+        if self.statements is not None and statement is not None:
+            self.statements[statement] = self.statements.get(statement, 0) + 1
+
+
+# Счетчик текущего HTTP-запроса; threadpool и greenlet-мост SQLAlchemy копируют контекст,
+# поэтому хуки engine видят тот же объект и в синхронных, и в асинхронных маршрутах
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+class QueryMetrics:
+    """Все запросы одного engine, включая выполненные вне HTTP-запросов"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.totals = QueryStats()
+
+    def observe(self, seconds: float, statement: Optional[str] = None) -> None:
+        with self._lock:
+            self.totals.add(seconds)
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.add(seconds, statement)
+
+    def snapshot(self) -> QueryStats:
+        with self._lock:
+            return QueryStats(self.totals.count, self.totals.seconds)
+
+
+# Имя engine -> счетчики его запросов
+query_metrics: Dict[str, QueryMetrics] = {}
+
+
+class Histogram:
+    """Кумулятивная гистограмма в духе Prometheus: бакет i считает значения <= buckets[i]"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def copy(self) -> "Histogram":
+        other = Histogram(self.buckets)
+        other.counts, other.sum, other.count = list(self.counts), self.sum, self.count
+        return other
+
+
+RouteKey = Tuple[str, str, str]  # (method, шаблон пути, статус)
+
+
+class RouteMetrics:
+    """Задержки и запросы к БД по шаблону маршрута (/projects/{project_id}), а не по конкретному URL"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[RouteKey, Histogram] = {}
+        self.queries: Dict[RouteKey, QueryStats] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, queries: QueryStats) -> None:
+        key = (method, route, str(status))
+        with self._lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram()
+                self.queries[key] = QueryStats()
+            histogram.observe(seconds)
+            self.queries[key].count += queries.count
+            self.queries[key].seconds += queries.seconds
+
+    def snapshot(self) -> Tuple[Dict[RouteKey, Histogram], Dict[RouteKey, QueryStats]]:
+        with self._lock:
+            return (
+                {key: histogram.copy() for key, histogram in self.latency.items()},
+                {key: QueryStats(stats.count, stats.seconds) for key, stats in self.queries.items()},
+            )
+
+
+route_metrics = RouteMetrics()
+
+
+# --- Текстовый формат Prometheus ---
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metric(lines: List[str], name: str, kind: str, help_text: str, samples: Iterable[Sample]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+
+def render_histogram(
+    lines: List[str], name: str, help_text: str, histograms: Iterable[Tuple[Dict[str, str], Histogram]]
+) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in histograms:
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': repr(bound)})} {cumulative}")
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
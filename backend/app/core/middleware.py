@@ -0,0 +1,112 @@
+import logging
+import time
+from typing import Dict
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.etag import encoded_etag, strip_coding
+from app.core.metrics import QueryStats, current_query_stats, route_metrics
+
+logger = logging.getLogger(__name__)
+
+# Метка для путей, не совпавших ни с одним маршрутом: сканеры не должны раздувать число серий
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Чистый ASGI-middleware (без BaseHTTPMiddleware): задержка, статус и запросы к БД
+    каждого HTTP-запроса попадают в route_metrics под шаблоном маршрута.
+
+    С debug_queries ответ получает заголовки X-Query-Count / X-DB-Time / X-N-Plus-One,
+    а SQL, повторенный за запрос n_plus_one_threshold раз и больше, пишется в лог как подозрение на N+1.
+    """
+
+    def __init__(
+        self, app: ASGIApp, record_routes: bool = True, debug_queries: bool = False, n_plus_one_threshold: int = 5
+    ):
+        self.app = app
+        self.record_routes = record_routes
+        self.debug_queries = debug_queries
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    def _suspects(self, stats: QueryStats) -> Dict[str, int]:
+        return {sql: count for sql, count in stats.statements.items() if count >= self.n_plus_one_threshold}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(statements={} if self.debug_queries else None)
+        token = current_query_stats.set(stats)
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.debug_queries:
+                    # Тело обычного ответа уже посчитано; запросы потокового тела сюда не попадают
+                    headers = MutableHeaders(scope=message)
+                    headers["X-Query-Count"] = str(stats.count)
+                    headers["X-DB-Time"] = f"{stats.seconds * 1000:.2f}"
+                    headers["X-N-Plus-One"] = str(len(self._suspects(stats)))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_query_stats.reset(token)
+            # Роутер FastAPI кладет найденный маршрут в scope; path_format - шаблон без конвертеров (:int)
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or UNMATCHED_ROUTE
+            if self.record_routes:
+                route_metrics.observe(scope["method"], template, status_code, elapsed, stats)
+            if self.debug_queries:
+                for sql, count in self._suspects(stats).items():
+                    logger.warning(
+                        "Possible N+1 in %s %s: statement ran %d times: %s",
+                        scope["method"], template, count, " ".join(sql.split()),
+                    )
+
+
+class EncodedETagMiddleware:
+    """
+    Ставится снаружи GZipMiddleware: если тело ответа сжато, сильный ETag получает суффикс
+    кодировки (encoded_etag), чтобы сжатое и несжатое тело не делили один валидатор.
+
+    У 304 тела нет, поэтому для него повторяется та форма тега, которую клиент прислал
+    в If-None-Match, - кэш обновляет именно сохраненное у себя представление.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match", "")
+
+        async def send_with_etag(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    coding = headers.get("content-encoding", "identity")
+                    if coding != "identity":
+                        headers["etag"] = encoded_etag(etag, coding)
+                    elif message["status"] == 304:
+                        for candidate in if_none_match.split(","):
+                            candidate = candidate.strip()
+                            if candidate != etag and strip_coding(candidate) == etag:
+                                headers["etag"] = candidate
+                                break
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
@@ -0,0 +1,18 @@
+from typing import Iterable, Iterator
+
+import orjson
+
+
+def encode_lines(records: Iterable[dict], chunk_bytes: int) -> Iterator[bytes]:
+    """
+    Кодирует записи в NDJSON и склеивает строки в куски примерно по chunk_bytes.
+    Отдавать каждую строку отдельно слишком дорого: каждый кусок - отдельный переход в threadpool.
+    """
+    buffer = bytearray()
+    for record in records:
+        buffer += orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+        if len(buffer) >= chunk_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
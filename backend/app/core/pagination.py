@@ -0,0 +1,40 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import Select, func, select, tuple_
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Непрозрачный курсор keyset-пагинации: позиция последней строки страницы по (created_at, id)"""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Обратное к encode_cursor; ValueError, если курсор поврежден"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def keyset(query: Select, created_at: Any, row_id: Any, limit: Optional[int], after: Optional[Tuple[datetime, int]]) -> Select:
+    """
+    Порядок (created_at, id) и условие "строго после курсора".
+    limit - размер страницы; запрашивается на строку больше, чтобы понять, есть ли следующая.
+    """
+    query = query.order_by(created_at, row_id)
+    if after is not None:
+        query = query.where(tuple_(created_at, row_id) > tuple_(*after))
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+
+def count_rows(query: Select) -> Select:
+    """SELECT count(*) по тому же фильтру, без сортировки и пагинации"""
+    return select(func.count()).select_from(query.order_by(None).limit(None).subquery())
@@ -1,12 +1,62 @@
+import hashlib
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Any, Optional
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from app.core.cache import TTLCache
 from app.core.config import get_settings
+from app.core.password_pool import PasswordWorkPool
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=get_settings().argon2_time_cost,
+    argon2__memory_cost=get_settings().argon2_memory_cost,
+    argon2__parallelism=get_settings().argon2_parallelism,
+)
+
+password_pool = PasswordWorkPool(
+    workers=get_settings().password_hash_workers, queue_size=get_settings().password_hash_queue_size
+)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Аутентифицированный пользователь запроса (без ORM-объекта и сессии)"""
+    id: int
+    email: str
+    full_name: str
+
+
+# sha256(token) -> Principal; запись живет не дольше, чем сам токен
+principal_cache = TTLCache(
+    maxsize=get_settings().principal_cache_size, ttl=get_settings().principal_cache_ttl_seconds
+)
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def get_cached_principal(token: str) -> Optional[Principal]:
+    return principal_cache.get(_token_key(token))
+
+
+def cache_principal(token: str, principal: Principal, expires_at: Optional[float]) -> None:
+    """expires_at - значение exp из токена (unix time)"""
+    monotonic_deadline = None
+    if expires_at is not None:
+        monotonic_deadline = time.monotonic() + (expires_at - time.time())
+    principal_cache.set(_token_key(token), principal, expires_at=monotonic_deadline)
+
+
+def invalidate_principal(email: str) -> None:
+    """Сбрасывает закэшированные токены пользователя после изменения его данных"""
+    principal_cache.discard_if(lambda _, principal: principal.email == email)
 
 
 def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
@@ -31,6 +81,15 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password в пуле password_pool; при переполнении - PasswordPoolBusy"""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_pool.run(get_password_hash, password)
+
+
 def decode_token(token: str) -> dict[str, Any]:
     settings = get_settings()
     try:
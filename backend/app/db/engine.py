@@ -0,0 +1,133 @@
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.config import Settings
+from app.core.metrics import PoolMetrics, QueryMetrics, pool_metrics, query_metrics
+
+logger = logging.getLogger(__name__)
+
+# Для каких запросов в лог медленных запросов добавляется план (DDL и служебные команды EXPLAIN не принимают)
+EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+
+
+def _instrumented_pool_class(base: type[Pool], metrics: PoolMetrics) -> type[Pool]:
+    """
+    Подкласс пула, который замеряет ожидание свободного соединения.
+
+    Pool.recreate() (после dispose) создает пул через self.__class__, так что
+    замеры переживают пересоздание пула.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return base._do_get(self)
+        finally:
+            metrics.observe_wait(time.perf_counter() - started)
+
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+def engine_options(database_url: str, settings: Settings, name: str, is_async: bool = False) -> Dict[str, Any]:
+    """Параметры create_engine / create_async_engine для конкретного бэкенда"""
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # Память живет в одном соединении; пул по умолчанию не трогаем
+        return {}
+
+    metrics = pool_metrics.setdefault(name, PoolMetrics(name))
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    options: Dict[str, Any] = {"poolclass": _instrumented_pool_class(base, metrics)}
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+    return options
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    """
+    План запроса на том же соединении и с теми же параметрами: EXPLAIN QUERY PLAN в SQLite, EXPLAIN в PostgreSQL.
+    Идет мимо событий engine, поэтому сам в метрики и в лог не попадает.
+    """
+    if not statement.lstrip().lower().startswith(EXPLAINABLE):
+        return None
+    sqlite = conn.dialect.name == "sqlite"
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(("EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN ") + statement, parameters)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    # SQLite: (id, parent, notused, detail); PostgreSQL: одна строка плана на запись
+    return "\n".join(str(row[3] if sqlite else row[0]) for row in rows)
+
+
+def _log_slow_query(conn, statement: str, parameters, seconds: float) -> None:
+    try:
+        plan = _explain(conn, statement, parameters)
+    except Exception as exc:
+        plan = f"<EXPLAIN failed: {exc}>"
+    logger.warning(
+        "Slow query (%.1f ms): %s\nparameters: %.500r\nplan:\n%s",
+        seconds * 1000, " ".join(statement.split()), parameters, plan or "<not available>",
+    )
+
+
+def _instrument_queries(engine: Engine, metrics: QueryMetrics, slow_query_seconds: float) -> None:
+    # Курсорные вызовы на одном соединении не вкладываются, поэтому хватает одной отметки в conn.info
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_query(conn, *_):
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish_query(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("query_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        metrics.observe(elapsed, statement)
+        # executemany - пакет строк, у него нет одного плана
+        if slow_query_seconds and elapsed >= slow_query_seconds and not executemany:
+            _log_slow_query(conn, statement, parameters, elapsed)
+
+
+def configure_engine(engine: Engine, settings: Settings, name: str) -> None:
+    """Вешает на engine счетчики пула и запросов и, для SQLite, PRAGMA при каждом новом соединении"""
+    metrics = pool_metrics.get(name)
+    if metrics is not None:
+        event.listen(engine, "checkout", lambda *_: metrics.on_checkout())
+        event.listen(engine, "checkin", lambda *_: metrics.on_checkin())
+    if settings.metrics_enabled or settings.debug_queries or settings.slow_query_ms:
+        _instrument_queries(
+            engine, query_metrics.setdefault(name, QueryMetrics(name)), settings.slow_query_ms / 1000
+        )
+
+    if engine.dialect.name != "sqlite":
+        return
+
+    pragmas = [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}",
+        # По умолчанию SQLite не проверяет внешние ключи, и ON DELETE CASCADE у таблиц связей не срабатывает
+        "PRAGMA foreign_keys=ON",
+    ]
+
+    @event.listens_for(engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, _):
+        # WAL: читатели не блокируются записью; NORMAL в WAL безопасен для целостности
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
@@ -0,0 +1,194 @@
+from sqlalchemy import delete, func, inspect, insert, or_, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+from app.db.base import Base
+from app.models.project import Stage, Task, stage_dependencies, task_dependencies
+
+
+def _add_missing_columns(conn: Connection) -> None:
+    """
+    create_all не меняет существующие таблицы, поэтому новые колонки добавляем сами.
+    Поддерживаются только колонки, которые можно добавить через ADD COLUMN (nullable или с server_default).
+    """
+    inspector = inspect(conn)
+    preparer = conn.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} "
+            ddl += column.type.compile(dialect=conn.dialect)
+            if column.server_default is not None:
+                default = column.server_default.arg
+                if isinstance(default, str):
+                    default = "'" + default.replace("'", "''") + "'"
+                ddl += f" DEFAULT {default}"
+            if not column.nullable:
+                ddl += " NOT NULL"
+            conn.execute(text(ddl))
+
+
+def _create_missing_indexes(conn: Connection) -> None:
+    """create_all не добавляет индексы к уже существующим таблицам - создаем недостающие"""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn)
+
+
+def _backfill_dependency_edges(conn: Connection) -> None:
+    """Заполняет stage_dependencies / task_dependencies из JSON-колонок dependencies"""
+    has_edges = (
+        conn.execute(select(func.count()).select_from(stage_dependencies)).scalar()
+        or conn.execute(select(func.count()).select_from(task_dependencies)).scalar()
+    )
+    if has_edges:
+        return
+
+    # Связи допустимы только внутри одного проекта
+    stage_project = {}
+    stage_rows = conn.execute(select(Stage.id, Stage.project_id, Stage.dependencies)).all()
+    for stage_id, project_id, _ in stage_rows:
+        stage_project[stage_id] = project_id
+
+    stage_edges = {
+        (stage_id, dep)
+        for stage_id, project_id, deps in stage_rows
+        for dep in (deps if isinstance(deps, list) else [])
+        if dep != stage_id and stage_project.get(dep) == project_id
+    }
+
+    task_project = {}
+    task_rows = conn.execute(select(Task.id, Task.stage_id, Task.dependencies)).all()
+    for task_id, stage_id, _ in task_rows:
+        task_project[task_id] = stage_project.get(stage_id)
+
+    # В JSON задачи лежат вперемешку ID задач и этапов. Если число - ID и задачи, и этапа
+    # того же проекта, вид зависимости не восстановить: ложная связь задача -> задача привела бы
+    # к потере ссылки на этап при удалении задачи, поэтому такие ID пропускаются
+    task_edges = {
+        (task_id, dep)
+        for task_id, _, deps in task_rows
+        for dep in (deps if isinstance(deps, list) else [])
+        if dep != task_id
+        and task_project.get(dep) is not None
+        and task_project.get(dep) == task_project[task_id]
+        and stage_project.get(dep) != task_project[task_id]
+    }
+
+    if stage_edges:
+        conn.execute(
+            insert(stage_dependencies),
+            [{"stage_id": stage_id, "depends_on_id": dep} for stage_id, dep in stage_edges],
+        )
+    if task_edges:
+        conn.execute(
+            insert(task_dependencies),
+            [{"task_id": task_id, "depends_on_id": dep} for task_id, dep in task_edges],
+        )
+
+
+def _delete_orphan_dependency_edges(conn: Connection) -> None:
+    """
+    Связи, оставшиеся от удаленных этапов и задач: SQLite без PRAGMA foreign_keys не выполнял
+    ON DELETE CASCADE, а переиспользованные ID потом конфликтовали с новыми связями
+    """
+    stage_ids = select(Stage.id)
+    task_ids = select(Task.id)
+    conn.execute(
+        delete(stage_dependencies).where(
+            or_(stage_dependencies.c.stage_id.not_in(stage_ids), stage_dependencies.c.depends_on_id.not_in(stage_ids))
+        )
+    )
+    conn.execute(
+        delete(task_dependencies).where(
+            or_(task_dependencies.c.task_id.not_in(task_ids), task_dependencies.c.depends_on_id.not_in(task_ids))
+        )
+    )
+
+
+_SQLITE_SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS students_search_ai AFTER INSERT ON students BEGIN
+        INSERT INTO students_search(rowid, email, full_name) VALUES (new.id, new.email, new.full_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS students_search_ad AFTER DELETE ON students BEGIN
+        INSERT INTO students_search(students_search, rowid, email, full_name)
+        VALUES ('delete', old.id, old.email, old.full_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS students_search_au AFTER UPDATE OF email, full_name ON students BEGIN
+        INSERT INTO students_search(students_search, rowid, email, full_name)
+        VALUES ('delete', old.id, old.email, old.full_name);
+        INSERT INTO students_search(rowid, email, full_name) VALUES (new.id, new.email, new.full_name);
+    END
+    """,
+]
+
+
+def _create_search_index(conn: Connection) -> None:
+    """
+    Индекс для поиска пользователей по подстроке email / имени.
+
+    SQLite: FTS5-таблица students_search с триграммным токенайзером поверх students
+    (external content), синхронизируется триггерами. Postgres: GIN-индексы pg_trgm,
+    которые обслуживают обычный ILIKE '%q%'. Если расширение недоступно, поиск
+    продолжает работать без индекса.
+    """
+    if conn.dialect.name == "sqlite":
+        exists_before = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students_search'")
+        ).first()
+        if exists_before:
+            return
+        try:
+            with conn.begin_nested():
+                conn.execute(
+                    text(
+                        "CREATE VIRTUAL TABLE students_search USING fts5("
+                        "email, full_name, content='students', content_rowid='id', tokenize='trigram')"
+                    )
+                )
+                for trigger in _SQLITE_SEARCH_TRIGGERS:
+                    conn.execute(text(trigger))
+                conn.execute(text("INSERT INTO students_search(students_search) VALUES ('rebuild')"))
+        except DBAPIError:
+            # SQLite собран без FTS5 или без trigram (< 3.34)
+            pass
+    elif conn.dialect.name == "postgresql":
+        try:
+            with conn.begin_nested():
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conn.execute(
+                    text("CREATE INDEX IF NOT EXISTS ix_students_email_trgm ON students USING gin (email gin_trgm_ops)")
+                )
+                conn.execute(
+                    text(
+                        "CREATE INDEX IF NOT EXISTS ix_students_full_name_trgm "
+                        "ON students USING gin (full_name gin_trgm_ops)"
+                    )
+                )
+        except DBAPIError:
+            # Расширение не установлено или нет прав на CREATE EXTENSION
+            pass
+
+
+def run_migrations(engine: Engine) -> None:
+    """Идемпотентные миграции данных; выполняются при старте после create_all"""
+    with engine.begin() as conn:
+        _add_missing_columns(conn)
+        _create_missing_indexes(conn)
+        _backfill_dependency_edges(conn)
+        _delete_orphan_dependency_edges(conn)
+        _create_search_index(conn)
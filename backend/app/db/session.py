@@ -1,16 +1,53 @@
+from typing import AsyncGenerator, Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import get_settings
+from app.db.engine import configure_engine, engine_options
 
 settings = get_settings()
-engine = create_engine(settings.database_url, echo=False, future=True)
+engine = create_engine(
+    settings.database_url, echo=False, future=True, **engine_options(settings.database_url, settings, "sync")
+)
+configure_engine(engine, settings, "sync")
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
 
 
+def to_async_url(database_url: str) -> str:
+    """sqlite:// -> sqlite+aiosqlite://, postgresql:// -> postgresql+psycopg:// (psycopg 3 умеет async)"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    elif backend == "postgresql":
+        url = url.set(drivername="postgresql+psycopg")
+    return url.render_as_string(hide_password=False)
+
+
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker[AsyncSession]] = None
+if settings.async_db:
+    async_url = settings.async_database_url or to_async_url(settings.database_url)
+    async_engine = create_async_engine(
+        async_url, echo=False, **engine_options(async_url, settings, "async", is_async=True)
+    )
+    configure_engine(async_engine.sync_engine, settings, "async")
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database mode is disabled (set ASYNC_DB=true)")
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,18 +1,28 @@
+from typing import Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 
-from app.api.v1 import auth, projects, teams
+from app.api.v1 import async_reads, auth, metrics, projects, teams
+from app.core.config import Settings, get_settings
+from app.core.middleware import EncodedETagMiddleware, MetricsMiddleware
 from app.db.base import Base
+from app.db.migrations import run_migrations
 from app.db.session import engine
 # Import models to ensure they are registered with Base.metadata
 from app.models import project, student, team  # noqa: F401
 
 
-def create_application() -> FastAPI:
+def create_application(settings: Optional[Settings] = None) -> FastAPI:
+    # settings передаются явно, например, чтобы в тестах собрать приложение с ASYNC_DB рядом с обычным
+    settings = settings or get_settings()
     app = FastAPI(title="Reverse Gantt", version="0.1.0")
 
     # Create tables (in production use Alembic!)
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
 
     # Configure CORS
     origins = [
@@ -28,11 +38,48 @@ def create_application() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Курсор и общее число строк при пагинации, версия проекта, счетчики режима DEBUG_QUERIES
+        expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag", "X-Query-Count", "X-DB-Time", "X-N-Plus-One"],
     )
 
+    if settings.gzip_enabled:
+        # Большие деревья проектов сжимаются в разы; маленькие ответы отдаются как есть
+        app.add_middleware(
+            GZipMiddleware, minimum_size=settings.gzip_minimum_size, compresslevel=settings.gzip_compress_level
+        )
+        # Снаружи GZip: сжатому телу - свой сильный ETag
+        app.add_middleware(EncodedETagMiddleware)
+
+    if settings.metrics_enabled or settings.debug_queries:
+        # Добавлен последним - самый внешний: в задержку входят и сжатие, и CORS
+        app.add_middleware(
+            MetricsMiddleware,
+            record_routes=settings.metrics_enabled,
+            debug_queries=settings.debug_queries,
+            n_plus_one_threshold=settings.n_plus_one_threshold,
+        )
+
+    # Самые тяжелые ответы (деревья проектов, списки команд) кодируются через orjson
+    response_class = ORJSONResponse if settings.orjson_responses else JSONResponse
+
+    if settings.async_db:
+        # Асинхронные GET-маршруты объявлены раньше и перекрывают синхронные с теми же путями
+        app.include_router(
+            async_reads.teams_router, prefix="/api/v1/teams", tags=["teams"], default_response_class=response_class
+        )
+        app.include_router(
+            async_reads.projects_router,
+            prefix="/api/v1/projects",
+            tags=["projects"],
+            default_response_class=response_class,
+        )
+
     app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
-    app.include_router(teams.router, prefix="/api/v1/teams", tags=["teams"])
-    app.include_router(projects.router, prefix="/api/v1/projects", tags=["projects"])
+    app.include_router(teams.router, prefix="/api/v1/teams", tags=["teams"], default_response_class=response_class)
+    app.include_router(
+        projects.router, prefix="/api/v1/projects", tags=["projects"], default_response_class=response_class
+    )
+    app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
 
     return app
 
@@ -1,13 +1,35 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, JSON
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String, JSON, Table
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
 
+# Индексные таблицы связей, дублирующие JSON-колонки dependencies.
+# PK покрывает прямые запросы ("от чего зависит X"), отдельный индекс - обратные ("кто зависит от X")
+stage_dependencies = Table(
+    "stage_dependencies",
+    Base.metadata,
+    Column("stage_id", Integer, ForeignKey("stages.id", ondelete="CASCADE"), primary_key=True),
+    Column("depends_on_id", Integer, ForeignKey("stages.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_stage_dependencies_depends_on_id", "depends_on_id"),
+)
+
+task_dependencies = Table(
+    "task_dependencies",
+    Base.metadata,
+    Column("task_id", Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True),
+    Column("depends_on_id", Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_task_dependencies_depends_on_id", "depends_on_id"),
+)
+
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        # Проекты команды: счетчик Team.project_count и keyset-пагинация по (created_at, id)
+        Index("ix_projects_team_created", "team_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
@@ -15,10 +37,14 @@ class Project(Base):
     deadline = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     team_id = Column(Integer, ForeignKey("teams.id"), nullable=False)
+    # Растет при любом изменении проекта, его этапов или задач (ETag ответа GET /projects/{id})
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     # Relationships
     team = relationship("Team", back_populates="projects")
-    stages = relationship("Stage", back_populates="project", cascade="all, delete-orphan")
+    stages = relationship(
+        "Stage", back_populates="project", cascade="all, delete-orphan", order_by="[Stage.position, Stage.id]"
+    )
 
 
 class Stage(Base):
@@ -34,10 +60,12 @@ class Stage(Base):
     feedback = Column(String(1024), nullable=True)
     # Store array of dependency Stage IDs as JSON
     dependencies = Column(JSON, default=list)
+    # Порядок этапа в проекте (id не отражает порядок после точечных сохранений)
+    position = Column(Integer, default=0, server_default="0", nullable=False)
 
     # Relationships
     project = relationship("Project", back_populates="stages")
-    tasks = relationship("Task", back_populates="stage", cascade="all, delete-orphan", order_by="Task.id")
+    tasks = relationship("Task", back_populates="stage", cascade="all, delete-orphan", order_by="[Task.position, Task.id]")
 
 
 class Task(Base):
@@ -53,6 +81,8 @@ class Task(Base):
     feedback = Column(String(1024), nullable=True)
     # Store array of dependency Task IDs as JSON (or Stage IDs? usually tasks depend on tasks)
     dependencies = Column(JSON, default=list)
+    # Порядок задачи внутри этапа
+    position = Column(Integer, default=0, server_default="0", nullable=False)
 
     # Relationships
     stage = relationship("Stage", back_populates="tasks")
@@ -1,9 +1,10 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Table, func, select
+from sqlalchemy.orm import column_property, relationship
 
 from app.db.base import Base
+from app.models.project import Project
 
 # Association table for many-to-many relationship between Student and Team
 team_members = Table(
@@ -28,6 +29,9 @@ class Team(Base):
     projects = relationship("Project", back_populates="team", cascade="all, delete-orphan")
     invitations = relationship("TeamInvitation", back_populates="team", cascade="all, delete-orphan")
 
-    @property
-    def project_count(self):
-        return len(self.projects)
+    # Считается в SQL коррелированным подзапросом (индекс ix_projects_team_created), проекты не загружаются.
+    # Отложенная: проверкам доступа счетчик не нужен, списки включают его через undefer
+    project_count = column_property(
+        select(func.count(Project.id)).where(Project.team_id == id).correlate_except(Project).scalar_subquery(),
+        deferred=True,
+    )
@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Boolean
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -15,6 +15,10 @@ class InvitationStatus(str, Enum):
 
 class TeamInvitation(Base):
     __tablename__ = "team_invitations"
+    __table_args__ = (
+        # Входящие приглашения: фильтр по получателю и статусу, порядок (created_at, id) для keyset-пагинации
+        Index("ix_team_invitations_inbox", "invited_user_id", "status", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     team_id = Column(Integer, ForeignKey("teams.id"), nullable=False)
@@ -1,7 +1,19 @@
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
+
+# Колонки NOT NULL: в PATCH их можно не передавать, но нельзя обнулить явным null
+NOT_NULL_PATCH_FIELDS = ("name", "duration", "is_completed")
+
+
+def _reject_nulls(patch: BaseModel) -> BaseModel:
+    nulls = [
+        field for field in NOT_NULL_PATCH_FIELDS if field in patch.model_fields_set and getattr(patch, field) is None
+    ]
+    if nulls:
+        raise ValueError(f"{', '.join(nulls)} cannot be null")
+    return patch
 
 
 # --- Task Schemas ---
@@ -23,13 +35,28 @@ class TaskBase(BaseModel):
 
 
 class TaskCreate(TaskBase):
-    pass
+    # ID существующей задачи: в режиме diff строка обновляется, а не пересоздается
+    id: Optional[int] = None
 
 
 class TaskUpdate(TaskBase):
     pass
 
 
+class TaskPatch(BaseModel):
+    # Точечная правка одной задачи: dependencies - реальные ID задач, а не индексы
+    name: Optional[str] = None
+    duration: Optional[int] = Field(None, ge=1)
+    is_completed: Optional[bool] = None
+    responsibles: Optional[List[str]] = None
+    feedback: Optional[str] = None
+    dependencies: Optional[List[int]] = None
+
+    @model_validator(mode="after")
+    def _check_not_null(self):
+        return _reject_nulls(self)
+
+
 class TaskRead(TaskBase):
     id: int
     stage_id: int
@@ -57,6 +84,8 @@ class StageBase(BaseModel):
 
 
 class StageCreate(StageBase):
+    # ID существующего этапа: в режиме diff строка обновляется, а не пересоздается
+    id: Optional[int] = None
     tasks: List[TaskCreate] = []
 
 
@@ -64,6 +93,20 @@ class StageUpdate(StageBase):
     pass
 
 
+class StagePatch(BaseModel):
+    # Точечная правка одного этапа: dependencies - реальные ID этапов, а не индексы
+    name: Optional[str] = None
+    duration: Optional[int] = Field(None, ge=1)
+    is_completed: Optional[bool] = None
+    responsibles: Optional[List[str]] = None
+    feedback: Optional[str] = None
+    dependencies: Optional[List[int]] = None
+
+    @model_validator(mode="after")
+    def _check_not_null(self):
+        return _reject_nulls(self)
+
+
 class StageRead(StageBase):
     id: int
     project_id: int
@@ -98,3 +141,32 @@ class ProjectRead(ProjectBase):
         from_attributes = True
 
 
+
+class ProjectSummary(ProjectBase):
+    # Только заголовок проекта и агрегаты, без дерева этапов и задач
+    id: int
+    created_at: datetime
+    team_id: int
+    stage_count: int = 0
+    completed_stage_count: int = 0
+    task_count: int = 0
+    completed_task_count: int = 0
+    progress: float = 0.0
+
+    class Config:
+        from_attributes = True
+
+
+# --- Import Schemas ---
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class ProjectImportResult(BaseModel):
+    # Итог импорта плана: сколько строк записано и какие отклонены (не больше import_max_reported_errors)
+    stages: int = 0
+    tasks: int = 0
+    version: int
+    error_count: int = 0
+    errors: List[ImportRowError] = []
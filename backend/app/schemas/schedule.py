@@ -0,0 +1,58 @@
+from datetime import date
+from typing import List
+
+from pydantic import BaseModel
+
+
+class ScheduleEntry(BaseModel):
+    id: int
+    start_date: date
+    end_date: date
+
+
+class TaskSchedule(ScheduleEntry):
+    pass
+
+
+class StageSchedule(ScheduleEntry):
+    tasks: List[TaskSchedule] = []
+
+
+class ProjectSchedule(BaseModel):
+    project_id: int
+    deadline: date
+    stages: List[StageSchedule] = []
+
+
+class ScheduleChanges(BaseModel):
+    """Только те этапы и задачи, чьи даты изменились после правки"""
+    project_id: int
+    stages: List[ScheduleEntry] = []
+    tasks: List[ScheduleEntry] = []
+
+
+class CriticalPathEntry(BaseModel):
+    id: int
+    earliest_start: date
+    earliest_finish: date
+    latest_start: date
+    latest_finish: date
+    total_float: int
+    is_critical: bool
+
+
+class StageCriticalPath(CriticalPathEntry):
+    tasks: List[CriticalPathEntry] = []
+
+
+class ProjectCriticalPath(BaseModel):
+    project_id: int
+    deadline: date
+    project_start: date
+    duration: int
+    # ID этапов критического пути в порядке выполнения
+    critical_chain: List[int] = []
+    # ID этапов и задач, попавших в циклические зависимости (исключены из анализа связей)
+    cyclic_stages: List[int] = []
+    cyclic_tasks: List[int] = []
+    stages: List[StageCriticalPath] = []
@@ -0,0 +1,241 @@
+from datetime import timedelta
+from itertools import chain
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.project import Project, Stage, Task
+from app.schemas.schedule import CriticalPathEntry, ProjectCriticalPath, StageCriticalPath
+
+
+def _dependency_edges(
+    ids: np.ndarray, dependencies: Sequence[Optional[List[int]]], groups: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Разворачивает JSON-списки зависимостей в массивы ребер (предшественник -> узел) по индексам ids.
+
+    ids должны быть отсортированы. Неизвестные id, петли и повторы отбрасываются;
+    если задан groups, ребра допускаются только внутри одной группы (задачи одного этапа).
+    """
+    n = ids.size
+    dependencies = [deps if isinstance(deps, list) else [] for deps in dependencies]
+    counts = np.fromiter((len(deps) if deps else 0 for deps in dependencies), dtype=np.int64, count=n)
+    flat = np.fromiter(chain.from_iterable(deps for deps in dependencies if deps), dtype=np.int64, count=int(counts.sum()))
+    dst = np.repeat(np.arange(n, dtype=np.int64), counts)
+
+    src = np.searchsorted(ids, flat)
+    valid = src < n
+    valid[valid] = ids[src[valid]] == flat[valid]
+    src, dst = src[valid], dst[valid]
+
+    keep = src != dst
+    if groups is not None:
+        keep &= groups[src] == groups[dst]
+    src, dst = src[keep], dst[keep]
+
+    unique = np.unique(src * n + dst)
+    return unique // n, unique % n
+
+
+def _topological_levels(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Уровни топологической сортировки (волны Кана); узлы на циклах получают -1"""
+    order = np.argsort(src, kind="stable")
+    successors = dst[order]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+
+    indegree = np.bincount(dst, minlength=n)
+    level = np.full(n, -1, dtype=np.int64)
+    frontier = np.flatnonzero(indegree == 0)
+    depth = 0
+    while frontier.size:
+        level[frontier] = depth
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            break
+        # Индексы всех исходящих ребер фронта одним gather'ом по CSR
+        positions = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(total)
+        released = np.bincount(successors[positions], minlength=n)
+        indegree -= released
+        frontier = np.flatnonzero((released > 0) & (indegree == 0))
+        depth += 1
+    return level
+
+
+def compute_critical_path(
+    durations: np.ndarray,
+    src: np.ndarray,
+    dst: np.ndarray,
+    earliest_start: np.ndarray,
+    latest_finish: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Прямой и обратный проход метода критического пути над массивами.
+
+    Ребра обрабатываются пачками по топологическим уровням, так что число итераций
+    Python равно глубине графа, а не числу узлов. earliest_start / latest_finish —
+    нижняя и верхняя границы для каждого узла (для задач — окно их этапа).
+    Если latest_finish не задан, им служит длительность всего графа.
+    Возвращает (ES, LF, level); узлы на циклах (level == -1) считаются без связей.
+    """
+    n = durations.size
+    level = _topological_levels(n, src, dst)
+    acyclic = (level[src] >= 0) & (level[dst] >= 0)
+    src, dst = src[acyclic], dst[acyclic]
+
+    order = np.argsort(level[src], kind="stable")
+    src, dst = src[order], dst[order]
+    boundaries = np.searchsorted(level[src], np.arange(int(level.max(initial=0)) + 2))
+
+    es = earliest_start.astype(np.int64, copy=True)
+    for lo, hi in zip(boundaries[:-1], boundaries[1:]):
+        if lo < hi:
+            np.maximum.at(es, dst[lo:hi], es[src[lo:hi]] + durations[src[lo:hi]])
+
+    if latest_finish is None:
+        latest_finish = np.full(n, int((es + durations).max(initial=0)), dtype=np.int64)
+    lf = latest_finish.astype(np.int64, copy=True)
+    for lo, hi in zip(boundaries[-2::-1], boundaries[:0:-1]):
+        if lo < hi:
+            np.minimum.at(lf, src[lo:hi], lf[dst[lo:hi]] - durations[dst[lo:hi]])
+
+    return es, lf, level
+
+
+def critical_chain(
+    durations: np.ndarray,
+    es: np.ndarray,
+    lf: np.ndarray,
+    src: np.ndarray,
+    dst: np.ndarray,
+    level: np.ndarray,
+    rank: np.ndarray,
+) -> List[int]:
+    """
+    Индексы узлов одной критической цепочки от старта до финиша графа.
+
+    Идем по ребрам без резерва, где узел начинается сразу после предшественника;
+    из нескольких вариантов берется узел с меньшим rank (порядок этапов в плане).
+    """
+    total_float = lf - durations - es
+    tight = (
+        (level[src] >= 0)
+        & (level[dst] >= 0)
+        & (total_float[src] == 0)
+        & (total_float[dst] == 0)
+        & (es[dst] == es[src] + durations[src])
+    )
+    src, dst = src[tight], dst[tight]
+    # Для каждого узла - следующий по rank критический преемник
+    order = np.lexsort((rank[dst], src))
+    src, dst = src[order], dst[order]
+    first = np.unique(src, return_index=True)
+    successor = dict(zip(first[0].tolist(), dst[first[1]].tolist()))
+
+    starts = np.flatnonzero((total_float == 0) & (es == 0))
+    if not starts.size:
+        return []
+    node = int(starts[np.argmin(rank[starts])])
+    chain_nodes = [node]
+    while node in successor:
+        node = successor[node]
+        chain_nodes.append(node)
+    return chain_nodes
+
+
+class CriticalPathService:
+    @staticmethod
+    def analyze_project(db: Session, project_id: int) -> Optional[ProjectCriticalPath]:
+        """Ранние/поздние сроки, резервы и критический путь проекта"""
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if not project:
+            return None
+
+        # Читаем только нужные колонки, без материализации ORM-объектов
+        # Расчет идет по массивам, отсортированным по id (поиск ребер - searchsorted), а ответ - в порядке плана
+        stage_rows = (
+            db.query(Stage.id, Stage.duration, Stage.dependencies, Stage.position)
+            .filter(Stage.project_id == project_id)
+            .order_by(Stage.id)
+            .all()
+        )
+        task_rows = (
+            db.query(Task.id, Task.stage_id, Task.duration, Task.dependencies, Task.position)
+            .join(Stage, Task.stage_id == Stage.id)
+            .filter(Stage.project_id == project_id)
+            .order_by(Task.id)
+            .all()
+        )
+
+        stage_ids = np.fromiter((row[0] for row in stage_rows), dtype=np.int64, count=len(stage_rows))
+        stage_durations = np.fromiter((row[1] for row in stage_rows), dtype=np.int64, count=len(stage_rows))
+        stage_src, stage_dst = _dependency_edges(stage_ids, [row[2] for row in stage_rows])
+        stage_es, stage_lf, stage_level = compute_critical_path(
+            stage_durations, stage_src, stage_dst, np.zeros(stage_ids.size, dtype=np.int64)
+        )
+        project_duration = int((stage_es + stage_durations).max(initial=0))
+
+        task_ids = np.fromiter((row[0] for row in task_rows), dtype=np.int64, count=len(task_rows))
+        task_stages = np.searchsorted(
+            stage_ids, np.fromiter((row[1] for row in task_rows), dtype=np.int64, count=len(task_rows))
+        )
+        task_durations = np.fromiter((row[2] for row in task_rows), dtype=np.int64, count=len(task_rows))
+        task_src, task_dst = _dependency_edges(task_ids, [row[3] for row in task_rows], groups=task_stages)
+        # Задачи ограничены окном своего этапа: не раньше его раннего старта и не позже позднего финиша
+        task_es, task_lf, task_level = compute_critical_path(
+            task_durations, task_src, task_dst, stage_es[task_stages], stage_lf[task_stages]
+        )
+
+        deadline = project.deadline.date()
+        project_start = deadline - timedelta(days=max(project_duration, 1) - 1)
+
+        def entries(ids, durations, es, lf) -> List[CriticalPathEntry]:
+            total_float = lf - durations - es
+            return [
+                CriticalPathEntry(
+                    id=int(node_id),
+                    earliest_start=project_start + timedelta(days=int(start)),
+                    earliest_finish=project_start + timedelta(days=int(start + duration - 1)),
+                    latest_start=project_start + timedelta(days=int(finish - duration)),
+                    latest_finish=project_start + timedelta(days=int(finish - 1)),
+                    total_float=int(slack),
+                    is_critical=bool(slack == 0),
+                )
+                for node_id, duration, start, finish, slack in zip(
+                    ids.tolist(), durations.tolist(), es.tolist(), lf.tolist(), total_float.tolist()
+                )
+            ]
+
+        # Ранг в порядке плана: (position, id), как в ScheduleService и ответе проекта
+        stage_positions = np.fromiter((row[3] or 0 for row in stage_rows), dtype=np.int64, count=len(stage_rows))
+        stage_rank = np.empty(stage_ids.size, dtype=np.int64)
+        stage_rank[np.lexsort((stage_ids, stage_positions))] = np.arange(stage_ids.size)
+        task_positions = np.fromiter((row[4] or 0 for row in task_rows), dtype=np.int64, count=len(task_rows))
+
+        task_entries = entries(task_ids, task_durations, task_es, task_lf)
+        tasks_by_stage: List[List[CriticalPathEntry]] = [[] for _ in range(stage_ids.size)]
+        for index in np.lexsort((task_ids, task_positions)).tolist():
+            tasks_by_stage[task_stages[index]].append(task_entries[index])
+
+        stage_entries = entries(stage_ids, stage_durations, stage_es, stage_lf)
+        stages = [
+            StageCriticalPath(**stage_entries[index].model_dump(), tasks=tasks_by_stage[index])
+            for index in np.argsort(stage_rank).tolist()
+        ]
+        chain_indices = critical_chain(
+            stage_durations, stage_es, stage_lf, stage_src, stage_dst, stage_level, stage_rank
+        )
+
+        return ProjectCriticalPath(
+            project_id=project.id,
+            deadline=deadline,
+            project_start=project_start,
+            duration=project_duration,
+            critical_chain=stage_ids[chain_indices].tolist(),
+            cyclic_stages=stage_ids[stage_level < 0].tolist(),
+            cyclic_tasks=task_ids[task_level < 0].tolist(),
+            stages=stages,
+        )
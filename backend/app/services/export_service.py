@@ -0,0 +1,63 @@
+from typing import Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.project import Project, Stage, Task
+
+_settings = get_settings()
+
+PROJECT_FIELDS = ("id", "name", "description", "deadline", "created_at", "team_id", "version")
+ITEM_FIELDS = ("id", "name", "duration", "is_completed", "responsibles", "feedback", "dependencies", "position")
+
+
+class ExportService:
+    """
+    Потоковая выгрузка проектов записями NDJSON: project, затем каждый stage и его task.
+
+    Строки читаются через Core-запросы с yield_per (на PostgreSQL - серверный курсор),
+    ORM-объекты и identity map не создаются, поэтому память не зависит от размера проекта.
+    """
+
+    @staticmethod
+    def _project_record(db: Session, project_id: int) -> Iterator[dict]:
+        query = select(*[getattr(Project, name) for name in PROJECT_FIELDS]).where(Project.id == project_id)
+        row = db.execute(query).first()
+        if row is not None:
+            yield {"type": "project", **row._asdict()}
+
+    @staticmethod
+    def _tree_records(db: Session, project_id: int) -> Iterator[dict]:
+        # Один проход: этап с задачами (outer join, чтобы не терять пустые этапы) в порядке отображения
+        query = (
+            select(
+                *[getattr(Stage, name).label(f"stage_{name}") for name in ITEM_FIELDS],
+                *[getattr(Task, name).label(f"task_{name}") for name in ITEM_FIELDS],
+            )
+            .outerjoin(Task, Task.stage_id == Stage.id)
+            .where(Stage.project_id == project_id)
+            .order_by(Stage.position, Stage.id, Task.position, Task.id)
+            .execution_options(yield_per=_settings.export_yield_per)
+        )
+        current_stage = None
+        for row in db.execute(query):
+            if row.stage_id != current_stage:
+                current_stage = row.stage_id
+                stage = {name: getattr(row, f"stage_{name}") for name in ITEM_FIELDS}
+                yield {"type": "stage", "project_id": project_id, **stage}
+            if row.task_id is not None:
+                task = {name: getattr(row, f"task_{name}") for name in ITEM_FIELDS}
+                yield {"type": "task", "stage_id": current_stage, **task}
+
+    @staticmethod
+    def iter_project(db: Session, project_id: int) -> Iterator[dict]:
+        yield from ExportService._project_record(db, project_id)
+        yield from ExportService._tree_records(db, project_id)
+
+    @staticmethod
+    def iter_team(db: Session, team_id: int) -> Iterator[dict]:
+        """Все проекты команды подряд; список ID небольшой, деревья читаются по одному"""
+        project_ids = db.scalars(select(Project.id).where(Project.team_id == team_id).order_by(Project.id)).all()
+        for project_id in project_ids:
+            yield from ExportService.iter_project(db, project_id)
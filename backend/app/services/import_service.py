@@ -0,0 +1,291 @@
+import csv
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple, Type, Union
+
+import orjson
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.project import Stage, Task
+from app.schemas.project import ImportRowError, ProjectImportResult, StageBase, TaskBase
+from app.services.project_service import ProjectService, StaleProjectVersion
+from app.services.schedule_service import ScheduleService
+
+_settings = get_settings()
+
+# В CSV списки (responsibles, dependencies) записываются в одной ячейке через ";"
+CSV_LIST_FIELDS = ("responsibles", "dependencies")
+CSV_LIST_SEPARATOR = ";"
+
+Row = Tuple[int, Union[dict, str]]
+
+
+class PlanImportError(Exception):
+    """План отклонен целиком: транзакция откатывается, этапы и версия проекта не меняются"""
+
+    def __init__(self, message: str, error_count: int = 0, errors: Optional[List[ImportRowError]] = None):
+        super().__init__(message)
+        self.message = message
+        self.error_count = error_count
+        self.errors = errors or []
+
+
+def _ndjson_rows(lines: TextIO) -> Iterator[Row]:
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError as exc:
+            yield line_no, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, "Record must be a JSON object"
+            continue
+        yield line_no, record
+
+
+def _csv_rows(lines: TextIO) -> Iterator[Row]:
+    reader = csv.DictReader(lines)
+    reader.fieldnames = [name.strip() for name in reader.fieldnames or []]
+    for record in reader:
+        if None in record:
+            yield reader.line_num, "Too many columns"
+            continue
+        # Пустые ячейки - значения по умолчанию схемы
+        values = {field: value for field, value in record.items() if value not in (None, "")}
+        for field in CSV_LIST_FIELDS:
+            if field in values:
+                values[field] = [item.strip() for item in values[field].split(CSV_LIST_SEPARATOR) if item.strip()]
+        yield reader.line_num, values
+
+
+def _validate(schema: Type[BaseModel], record: dict) -> Union[BaseModel, str]:
+    try:
+        return schema(**{field: value for field, value in record.items() if field != "type"})
+    except ValidationError as exc:
+        return "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors())
+
+
+class _PlanWriter:
+    """
+    Копит строки плана и пишет их пакетными executemany INSERT без RETURNING (в SQLite
+    RETURNING с sort_by_parameter_order выполняется построчно). Новые ID пакета читаются
+    одним SELECT по position - как в ProjectService.update_project_stages: перед импортом
+    проект очищается, и position уникальна в своем родителе.
+    Между пакетами в памяти остается только отображение индексов в новые ID.
+    """
+
+    def __init__(self, db: Session, project_id: int, batch_size: int):
+        self.db = db
+        self.project_id = project_id
+        self.batch_size = batch_size
+        self.stage_ids: Dict[int, int] = {}
+        self.task_ids: Dict[Tuple[int, int], int] = {}
+        self._stages: List[dict] = []
+        self._stage_keys: List[int] = []
+        self._tasks: List[dict] = []
+        self._task_keys: List[Tuple[int, int]] = []
+
+    def _row(self, item: Union[StageBase, TaskBase], position: int) -> dict:
+        # Зависимости пока пишутся индексами как есть: ссылки вперед разрешаются после загрузки всего плана
+        return {
+            "name": item.name,
+            "duration": item.duration,
+            "is_completed": item.is_completed,
+            "responsibles": item.responsibles or [],
+            "feedback": item.feedback,
+            "dependencies": item.dependencies or [],
+            "position": position,
+        }
+
+    def add_stage(self, stage_index: int, stage: StageBase) -> None:
+        self._stages.append({**self._row(stage, stage_index), "project_id": self.project_id})
+        self._stage_keys.append(stage_index)
+        self._flush_if_full()
+
+    def add_task(self, stage_index: int, task_index: int, task: TaskBase) -> None:
+        self._tasks.append(self._row(task, task_index))
+        self._task_keys.append((stage_index, task_index))
+        self._flush_if_full()
+
+    def _flush_if_full(self) -> None:
+        if len(self._stages) + len(self._tasks) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        # Сначала этапы: задачам пакета нужны ID их этапов
+        if self._stages:
+            self.db.execute(insert(Stage), self._stages)
+            # position этапа - его индекс в плане
+            self.stage_ids.update(
+                self.db.execute(
+                    select(Stage.position, Stage.id).where(
+                        Stage.project_id == self.project_id, Stage.position.in_(self._stage_keys)
+                    )
+                ).all()
+            )
+        if self._tasks:
+            for row, (stage_index, _) in zip(self._tasks, self._task_keys):
+                row["stage_id"] = self.stage_ids[stage_index]
+            self.db.execute(insert(Task), self._tasks)
+            stage_index_by_id = {self.stage_ids[stage_index]: stage_index for stage_index, _ in self._task_keys}
+            keys = [(row["stage_id"], row["position"]) for row in self._tasks]
+            self.task_ids.update(
+                ((stage_index_by_id[stage_id], position), task_id)
+                for task_id, stage_id, position in self.db.execute(
+                    select(Task.id, Task.stage_id, Task.position).where(tuple_(Task.stage_id, Task.position).in_(keys))
+                )
+            )
+        self._stages, self._stage_keys, self._tasks, self._task_keys = [], [], [], []
+
+    def _resolve(
+        self, model, condition, resolve: Callable[[List[int]], Tuple[List[int], List[int]]], edges: Callable
+    ) -> None:
+        # resolve: индексы -> (ID для JSON dependencies, ID для индексной таблицы связей)
+        # Проход по уже записанным строкам порциями по id: в памяти не больше batch_size строк
+        last_id = 0
+        while True:
+            rows = self.db.execute(
+                select(model.id, model.dependencies)
+                .where(condition, model.id > last_id)
+                .order_by(model.id)
+                .limit(self.batch_size)
+            ).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+            resolved = {row.id: resolve(row.dependencies) for row in rows if row.dependencies}
+            if resolved:
+                self.db.execute(
+                    update(model), [{"id": node_id, "dependencies": deps} for node_id, (deps, _) in resolved.items()]
+                )
+                edges({node_id: edge_deps for node_id, (_, edge_deps) in resolved.items()})
+
+    def _resolve_stage_dependencies(self, deps: List[int]) -> Tuple[List[int], List[int]]:
+        resolved = ProjectService._resolve_stage_dependencies(deps, self.stage_ids)
+        return resolved, resolved
+
+    def resolve_dependencies(self) -> None:
+        """Индексы зависимостей -> ID этапов и задач, плюс записи в индексные таблицы связей"""
+        valid_stage_ids = set(self.stage_ids.values())
+        valid_task_ids = set(self.task_ids.values())
+        self._resolve(
+            Stage,
+            Stage.project_id == self.project_id,
+            self._resolve_stage_dependencies,
+            lambda resolved: ProjectService._insert_dependency_edges(
+                self.db, resolved, {}, valid_stage_ids, valid_task_ids
+            ),
+        )
+        self._resolve(
+            Task,
+            Task.stage_id.in_(select(Stage.id).where(Stage.project_id == self.project_id)),
+            lambda deps: ProjectService._resolve_task_dependencies(deps, self.task_ids, self.stage_ids),
+            lambda resolved: ProjectService._insert_dependency_edges(
+                self.db, {}, resolved, valid_stage_ids, valid_task_ids
+            ),
+        )
+
+
+class ImportService:
+    @staticmethod
+    def import_plan(
+        db: Session,
+        project_id: int,
+        lines: TextIO,
+        fmt: str = "ndjson",
+        expected_version: Optional[int] = None,
+        partial: bool = False,
+    ) -> ProjectImportResult:
+        """
+        Заменяет этапы и задачи проекта планом из NDJSON или CSV в одной транзакции.
+
+        Каждая строка - этап (type=stage) или задача (type=task) последнего этапа выше нее.
+        Индексы для dependencies те же, что в StageCreate/TaskCreate: порядковый номер этапа
+        в файле, stage_index * 10000 + task_index для задачи и -(stage_index + 1) для этапа.
+
+        По умолчанию любая ошибка отклоняет весь план (PlanImportError). С partial=True строки,
+        не прошедшие проверку схемы, пропускаются и попадают в отчет, остальные записываются.
+        Строка, которую нельзя разобрать или без известного type, отклоняет план всегда:
+        непонятно, этап это или задача, и индексы всех строк ниже нее были бы сдвинуты.
+        План без единого этапа тоже отклоняется - очистить проект можно через PUT /stages.
+        """
+        rows = _csv_rows(lines) if fmt == "csv" else _ndjson_rows(lines)
+        writer = _PlanWriter(db, project_id, _settings.import_batch_size)
+        errors: List[ImportRowError] = []
+        error_count = 0
+        stage_count = task_count = 0
+        # Индекс текущего этапа и номер строки, если этот этап был отклонен
+        stage_index, rejected_stage_line = -1, None
+        task_index = 0
+
+        try:
+            version = ProjectService._bump_version(db, project_id, expected_version)
+            if version is None:
+                raise StaleProjectVersion()
+
+            ProjectService._delete_dependency_edges(db, project_id)
+            db.execute(
+                delete(Task).where(Task.stage_id.in_(select(Stage.id).where(Stage.project_id == project_id))),
+                execution_options={"synchronize_session": False},
+            )
+            db.execute(
+                delete(Stage).where(Stage.project_id == project_id), execution_options={"synchronize_session": False}
+            )
+
+            for line_no, record in rows:
+                kind = None if isinstance(record, str) else record.get("type")
+                if kind not in ("stage", "task"):
+                    # Последняя ошибка в отчете - та, из-за которой план отклонен
+                    errors.append(ImportRowError(
+                        line=line_no, error=record if isinstance(record, str) else "type must be 'stage' or 'task'"
+                    ))
+                    raise PlanImportError(f"Line {line_no} is not a valid record", error_count + 1, errors)
+
+                error = None
+                if kind == "stage":
+                    # Индекс считается и для отклоненных этапов, чтобы ссылки ниже не съезжали
+                    stage_index, task_index = stage_index + 1, 0
+                    stage = _validate(StageBase, record)
+                    if isinstance(stage, str):
+                        error, rejected_stage_line = stage, line_no
+                    else:
+                        rejected_stage_line = None
+                        writer.add_stage(stage_index, stage)
+                        stage_count += 1
+                else:
+                    task = _validate(TaskBase, record)
+                    if stage_index < 0:
+                        error = "Task must follow a stage"
+                    elif rejected_stage_line is not None:
+                        error = f"Stage on line {rejected_stage_line} was rejected"
+                    elif isinstance(task, str):
+                        error = task
+                    else:
+                        writer.add_task(stage_index, task_index, task)
+                        task_count += 1
+                    task_index += 1
+
+                if error is not None:
+                    error_count += 1
+                    if len(errors) < _settings.import_max_reported_errors:
+                        errors.append(ImportRowError(line=line_no, error=error))
+
+            if error_count and not partial:
+                raise PlanImportError("Plan contains invalid rows", error_count, errors)
+            if not stage_count:
+                raise PlanImportError("Plan contains no valid stages", error_count, errors)
+
+            writer.flush()
+            writer.resolve_dependencies()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        ScheduleService.invalidate(project_id)
+
+        return ProjectImportResult(
+            stages=stage_count, tasks=task_count, version=version, error_count=error_count, errors=errors
+        )
@@ -1,10 +1,22 @@
-from typing import List, Optional
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, Select, case, delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.orm.attributes import flag_modified
 
-from app.models.project import Project, Stage, Task
-from app.schemas.project import ProjectCreate, ProjectUpdate, StageCreate
+from app.core.pagination import count_rows, keyset
+from app.models.project import Project, Stage, Task, stage_dependencies, task_dependencies
+from app.schemas.project import ProjectCreate, ProjectUpdate, StageCreate, StagePatch, TaskPatch
+from app.services.schedule_service import ScheduleService
+
+logger = logging.getLogger(__name__)
+
+
+class StaleProjectVersion(Exception):
+    """Проект изменился после того, как клиент его прочитал (If-Match не совпал)"""
 
 
 class ProjectService:
@@ -26,151 +38,391 @@ class ProjectService:
         return db.query(Project).filter(Project.id == project_id).first()
 
     @staticmethod
-    def get_team_projects(db: Session, team_id: int) -> List[Project]:
-        return db.query(Project).filter(Project.team_id == team_id).all()
+    async def get_project_async(db: AsyncSession, project_id: int, with_stages: bool = False) -> Optional[Project]:
+        query = select(Project).where(Project.id == project_id)
+        if with_stages:
+            # В async-сессии ленивой загрузки нет: дерево для ответа грузим заранее
+            query = query.options(selectinload(Project.stages).selectinload(Stage.tasks))
+        return await db.scalar(query)
+
+    @staticmethod
+    def get_team_projects(
+        db: Session, team_id: int, limit: Optional[int] = None, after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Project]:
+        """Проекты команды по (created_at, id); при limit - страница после курсора after (+1 строка)"""
+        query = keyset(ProjectService._team_projects_query(team_id), Project.created_at, Project.id, limit, after)
+        # Дерево этапов и задач подгружается двумя запросами на всю страницу, а не по запросу на проект
+        return db.scalars(query.options(selectinload(Project.stages).selectinload(Stage.tasks))).all()
+
+    @staticmethod
+    async def get_team_projects_async(
+        db: AsyncSession, team_id: int, limit: Optional[int] = None, after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Project]:
+        query = keyset(ProjectService._team_projects_query(team_id), Project.created_at, Project.id, limit, after)
+        return (await db.scalars(query.options(selectinload(Project.stages).selectinload(Stage.tasks)))).all()
+
+    @staticmethod
+    def count_team_projects(db: Session, team_id: int) -> int:
+        return db.scalar(count_rows(ProjectService._team_projects_query(team_id)))
+
+    @staticmethod
+    async def count_team_projects_async(db: AsyncSession, team_id: int) -> int:
+        return await db.scalar(count_rows(ProjectService._team_projects_query(team_id)))
+
+    @staticmethod
+    def _team_projects_query(team_id: int) -> Select:
+        return select(Project).where(Project.team_id == team_id)
+
+    @staticmethod
+    def get_team_project_summaries(db: Session, team_id: int) -> List[Row]:
+        """Заголовки проектов команды со счетчиками и прогрессом, посчитанными в SQL"""
+        return db.execute(ProjectService._team_project_summaries_query(team_id)).all()
+
+    @staticmethod
+    async def get_team_project_summaries_async(db: AsyncSession, team_id: int) -> List[Row]:
+        return (await db.execute(ProjectService._team_project_summaries_query(team_id))).all()
+
+    @staticmethod
+    def _team_project_summaries_query(team_id: int) -> Select:
+        stage_stats = (
+            select(
+                Stage.project_id.label("project_id"),
+                func.count(Stage.id).label("stage_count"),
+                func.sum(case((Stage.is_completed.is_(True), 1), else_=0)).label("completed_stage_count"),
+            )
+            .group_by(Stage.project_id)
+            .subquery()
+        )
+        task_stats = (
+            select(
+                Stage.project_id.label("project_id"),
+                func.count(Task.id).label("task_count"),
+                func.sum(case((Task.is_completed.is_(True), 1), else_=0)).label("completed_task_count"),
+            )
+            .join(Task, Task.stage_id == Stage.id)
+            .group_by(Stage.project_id)
+            .subquery()
+        )
+        stage_count = func.coalesce(stage_stats.c.stage_count, 0)
+        completed_stage_count = func.coalesce(stage_stats.c.completed_stage_count, 0)
+        task_count = func.coalesce(task_stats.c.task_count, 0)
+        completed_task_count = func.coalesce(task_stats.c.completed_task_count, 0)
+        # Прогресс по задачам, а если задач нет - по этапам
+        progress = case(
+            (task_count > 0, completed_task_count * 1.0 / task_count),
+            (stage_count > 0, completed_stage_count * 1.0 / stage_count),
+            else_=0.0,
+        )
+        return (
+            select(
+                Project.id,
+                Project.name,
+                Project.description,
+                Project.deadline,
+                Project.created_at,
+                Project.team_id,
+                stage_count.label("stage_count"),
+                completed_stage_count.label("completed_stage_count"),
+                task_count.label("task_count"),
+                completed_task_count.label("completed_task_count"),
+                progress.label("progress"),
+            )
+            .outerjoin(stage_stats, stage_stats.c.project_id == Project.id)
+            .outerjoin(task_stats, task_stats.c.project_id == Project.id)
+            .where(Project.team_id == team_id)
+            .order_by(Project.id)
+        )
+
+    @staticmethod
+    def _bump_version(db: Session, project_id: int, expected_version: Optional[int] = None) -> Optional[int]:
+        """
+        Увеличивает Project.version в текущей транзакции и возвращает новую версию.
+        С expected_version - только если версия не менялась (иначе None): проверка и запись атомарны.
+        """
+        query = update(Project).where(Project.id == project_id)
+        if expected_version is not None:
+            query = query.where(Project.version == expected_version)
+        return db.scalar(
+            query.values(version=Project.version + 1).returning(Project.version),
+            execution_options={"synchronize_session": "fetch"},
+        )
 
     # Метод для сохранения всей структуры проекта (этапы, задачи)
-    # В реальном приложении лучше обновлять точечно, но для сохранения "save" кнопки пойдет полная перезапись
+    # Полная перезапись: старые строки удаляются, новые пишутся пачками в одной транзакции
     @staticmethod
-    def update_project_stages(db: Session, project_id: int, stages_in: List[StageCreate]) -> List[Stage]:
+    def update_project_stages(
+        db: Session, project_id: int, stages_in: List[StageCreate], expected_version: Optional[int] = None
+    ) -> List[Stage]:
         try:
             project = ProjectService.get_project(db, project_id)
             if not project:
                 raise ValueError(f"Project with id {project_id} not found")
+            if ProjectService._bump_version(db, project_id, expected_version) is None:
+                raise StaleProjectVersion()
+
+            # Удаляем старые этапы, задачи и их связи несколькими DELETE без загрузки объектов
+            ProjectService._delete_dependency_edges(db, project_id)
+            project_stage_ids = select(Stage.id).where(Stage.project_id == project_id)
+            db.execute(
+                delete(Task).where(Task.stage_id.in_(project_stage_ids)),
+                execution_options={"synchronize_session": False},
+            )
+            db.execute(
+                delete(Stage).where(Stage.project_id == project_id),
+                execution_options={"synchronize_session": False},
+            )
+            db.expire(project, ["stages"])
 
-            # Удаляем старые этапы (каскадно удалятся задачи)
-            project.stages = []
-            db.commit() # Clear
-
-            # Создаем маппинг: позиция в массиве -> новый ID этапа
-            new_stages = []
-            index_to_stage_id = {}  # Маппинг: индекс этапа -> новый ID этапа
-            
-            # Создаем все этапы сначала
-            for idx, stage_data in enumerate(stages_in):
-                stage = Stage(
+            # Этапы и задачи - по одному executemany INSERT без RETURNING: в SQLite
+            # RETURNING с sort_by_parameter_order выполняется построчно. Новые ID
+            # сопоставляются с индексами одним SELECT по position (уникальна в своем родителе)
+            if stages_in:
+                db.execute(
+                    insert(Stage),
+                    [
+                        {
+                            "name": stage_data.name,
+                            "duration": stage_data.duration,
+                            "project_id": project_id,
+                            "is_completed": stage_data.is_completed,
+                            "responsibles": stage_data.responsibles or [],
+                            "feedback": stage_data.feedback,
+                            "dependencies": [],
+                            "position": idx,
+                        }
+                        for idx, stage_data in enumerate(stages_in)
+                    ],
+                )
+            index_to_stage_id = dict(
+                db.execute(select(Stage.position, Stage.id).where(Stage.project_id == project_id)).all()
+            )
+
+            task_rows = [
+                {
+                    "name": task_data.name,
+                    "duration": task_data.duration,
+                    "stage_id": index_to_stage_id[stage_idx],
+                    "is_completed": task_data.is_completed,
+                    "responsibles": task_data.responsibles or [],
+                    "feedback": task_data.feedback,
+                    "dependencies": [],
+                    "position": task_idx,
+                }
+                for stage_idx, stage_data in enumerate(stages_in)
+                for task_idx, task_data in enumerate(stage_data.tasks or [])
+            ]
+            index_to_task_id = {}
+            if task_rows:
+                db.execute(insert(Task), task_rows)
+                stage_index = {stage_id: idx for idx, stage_id in index_to_stage_id.items()}
+                index_to_task_id = {
+                    (stage_index[stage_id], position): task_id
+                    for task_id, stage_id, position in db.execute(
+                        select(Task.id, Task.stage_id, Task.position).where(Task.stage_id.in_(project_stage_ids))
+                    )
+                }
+
+            # Индексы зависимостей -> новые ID в памяти, затем пакетный UPDATE только непустых
+            stage_deps = {
+                index_to_stage_id[idx]: ProjectService._resolve_stage_dependencies(stage_data.dependencies, index_to_stage_id)
+                for idx, stage_data in enumerate(stages_in)
+            }
+            # task_id -> (все зависимости для JSON, только задачи для task_dependencies)
+            task_deps = {
+                index_to_task_id[(stage_idx, task_idx)]: ProjectService._resolve_task_dependencies(
+                    task_data.dependencies, index_to_task_id, index_to_stage_id
+                )
+                for stage_idx, stage_data in enumerate(stages_in)
+                for task_idx, task_data in enumerate(stage_data.tasks or [])
+            }
+            stage_updates = [{"id": node_id, "dependencies": deps} for node_id, deps in stage_deps.items() if deps]
+            task_updates = [{"id": node_id, "dependencies": deps} for node_id, (deps, _) in task_deps.items() if deps]
+            if stage_updates:
+                db.execute(update(Stage), stage_updates)
+            if task_updates:
+                db.execute(update(Task), task_updates)
+
+            ProjectService._insert_dependency_edges(
+                db,
+                stage_deps,
+                {node_id: task_ids for node_id, (_, task_ids) in task_deps.items()},
+                set(stage_deps),
+                set(task_deps),
+            )
+
+            # Один коммит на все сохранение
+            db.commit()
+            ScheduleService.invalidate(project_id)
+
+            # SQLite может переиспользовать ID удаленных строк, поэтому перезаписываем объекты из identity map
+            return (
+                db.query(Stage)
+                .options(selectinload(Stage.tasks))
+                .filter(Stage.project_id == project_id)
+                .order_by(Stage.position, Stage.id)
+                .populate_existing()
+                .all()
+            )
+        except StaleProjectVersion:
+            db.rollback()
+            raise
+        except Exception:
+            db.rollback()
+            logger.exception("Error in update_project_stages for project %s", project_id)
+            raise
+
+    @staticmethod
+    def _resolve_stage_dependencies(deps: Optional[List[int]], index_to_stage_id: Dict[int, int]) -> List[int]:
+        # dep_index - это позиция этапа в массиве
+        return [index_to_stage_id[dep] for dep in deps or [] if isinstance(dep, int) and dep in index_to_stage_id]
+
+    @staticmethod
+    def _resolve_task_dependencies(
+        deps: Optional[List[int]],
+        index_to_task_id: Dict[Tuple[int, int], int],
+        index_to_stage_id: Dict[int, int],
+    ) -> Tuple[List[int], List[int]]:
+        """
+        Индексы зависимостей задачи -> (все ID для JSON dependencies, ID только задач).
+        В JSON ID задач и этапов не различимы (и могут совпадать), поэтому вид зависимости
+        берется из индекса, и в task_dependencies попадает только второй список.
+        """
+        resolved, task_ids = [], []
+        for dep_value in deps or []:
+            if not isinstance(dep_value, int):
+                continue
+            if dep_value >= 0:
+                # Положительное число: stage_index * 10000 + task_index
+                task_key = (dep_value // 10000, dep_value % 10000)
+                if task_key in index_to_task_id:
+                    resolved.append(index_to_task_id[task_key])
+                    task_ids.append(index_to_task_id[task_key])
+            else:
+                # Отрицательное число: это этап, используем -(stage_index + 1)
+                stage_dep_index = -(dep_value + 1)
+                if stage_dep_index in index_to_stage_id:
+                    resolved.append(index_to_stage_id[stage_dep_index])
+        return resolved, task_ids
+
+    @staticmethod
+    def _assign_changed(entity, **values) -> bool:
+        changed = False
+        for field, value in values.items():
+            if getattr(entity, field) != value:
+                setattr(entity, field, value)
+                if field in ("responsibles", "dependencies"):
+                    flag_modified(entity, field)
+                changed = True
+        return changed
+
+    @staticmethod
+    def update_project_stages_diff(
+        db: Session, project_id: int, stages_in: List[StageCreate], expected_version: Optional[int] = None
+    ) -> List[Stage]:
+        """
+        Сохраняет структуру проекта по разнице с текущей: этапы и задачи сопоставляются по id,
+        и выполняются только нужные INSERT/UPDATE/DELETE. ID существующих строк не меняются.
+        Зависимости во входных данных - те же индексы, что и в update_project_stages.
+        """
+        try:
+            if ProjectService._bump_version(db, project_id, expected_version) is None:
+                raise StaleProjectVersion()
+            existing = (
+                db.query(Stage)
+                .options(selectinload(Stage.tasks))
+                .filter(Stage.project_id == project_id)
+                .all()
+            )
+            stages_by_id = {stage.id: stage for stage in existing}
+            tasks_by_id = {task.id: task for stage in existing for task in stage.tasks}
+
+            plan = []  # [(stage, [task, ...])] в порядке входного массива
+            for stage_idx, stage_data in enumerate(stages_in):
+                stage = stages_by_id.pop(stage_data.id, None) if stage_data.id is not None else None
+                if stage is None:
+                    stage = Stage(project_id=project_id, dependencies=[])
+                    db.add(stage)
+                ProjectService._assign_changed(
+                    stage,
                     name=stage_data.name,
                     duration=stage_data.duration,
-                    project_id=project_id,
                     is_completed=stage_data.is_completed,
                     responsibles=stage_data.responsibles or [],
                     feedback=stage_data.feedback,
-                    dependencies=[]  # Временно пустой
+                    position=stage_idx,
                 )
-                db.add(stage)
-                db.commit()
-                db.refresh(stage)
-                new_stages.append(stage)
-                index_to_stage_id[idx] = stage.id
-            
-            # Создаем глобальный маппинг для всех задач: (stage_index, task_index) -> новый ID задачи
-            index_to_task_id_global = {}  # Маппинг: (индекс этапа, индекс задачи) -> новый ID задачи
-            
-            # Создаем все задачи во всех этапах
-            for stage_idx, (stage_data, stage) in enumerate(zip(stages_in, new_stages)):
-                tasks_list = stage_data.tasks if stage_data.tasks is not None else []
-                for task_idx, task_data in enumerate(tasks_list):
-                    task = Task(
+
+                tasks = []
+                for task_idx, task_data in enumerate(stage_data.tasks or []):
+                    task = tasks_by_id.pop(task_data.id, None) if task_data.id is not None else None
+                    if task is None:
+                        task = Task(dependencies=[])
+                    ProjectService._assign_changed(
+                        task,
                         name=task_data.name,
                         duration=task_data.duration,
-                        stage_id=stage.id,
                         is_completed=task_data.is_completed,
                         responsibles=task_data.responsibles or [],
                         feedback=task_data.feedback,
-                        dependencies=[]  # Временно пустой
+                        position=task_idx,
                     )
-                    db.add(task)
-                    db.commit()
-                    db.refresh(task)
-                    index_to_task_id_global[(stage_idx, task_idx)] = task.id
-                    stage.tasks.append(task)
-            
-            # Обновляем зависимости этапов: маппим индексы на новые ID
-            for idx, (stage_data, stage) in enumerate(zip(stages_in, new_stages)):
-                updated_deps = []
-                deps = stage_data.dependencies if stage_data.dependencies is not None else []
-                if deps:
-                    for dep_index in deps:
-                        # dep_index - это позиция этапа в массиве
-                        if isinstance(dep_index, int) and 0 <= dep_index < len(new_stages):
-                            updated_deps.append(index_to_stage_id[dep_index])
-                stage.dependencies = updated_deps
-                flag_modified(stage, "dependencies")
-            
-            # Обновляем зависимости задач: маппим индексы на новые ID
-            # ВАЖНО: Нужно перебрать задачи в правильном порядке из исходного массива
-            for stage_idx, (stage_data, stage) in enumerate(zip(stages_in, new_stages)):
-                tasks_list = stage_data.tasks if stage_data.tasks is not None else []
-                # Получаем все задачи этапа из базы в виде словаря по ID
-                stage_tasks_dict = {task.id: task for task in stage.tasks}
-                
-                # Перебираем задачи в том же порядке, в котором они были в исходном массиве
-                for task_idx, task_data in enumerate(tasks_list):
-                    # Получаем ID задачи из маппинга
-                    task_id = index_to_task_id_global.get((stage_idx, task_idx))
-                    if not task_id:
-                        continue
-                    # Получаем объект задачи из словаря
-                    task = stage_tasks_dict.get(task_id)
-                    if not task:
-                        continue
-                    
-                    updated_task_deps = []
-                    task_deps = task_data.dependencies if task_data.dependencies is not None else []
-                    if task_deps:
-                        for dep_value in task_deps:
-                            if isinstance(dep_value, int):
-                                if dep_value >= 0:
-                                    # Положительное число: stage_index * 10000 + task_index
-                                    # Извлекаем stage_index и task_index
-                                    dep_stage_idx = dep_value // 10000
-                                    dep_task_idx = dep_value % 10000
-                                    task_key = (dep_stage_idx, dep_task_idx)
-                                    if task_key in index_to_task_id_global:
-                                        updated_task_deps.append(index_to_task_id_global[task_key])
-                                else:
-                                    # Отрицательное число: это этап, используем -(stage_index + 1)
-                                    stage_dep_index = -(dep_value + 1)
-                                    if 0 <= stage_dep_index < len(new_stages):
-                                        updated_task_deps.append(index_to_stage_id[stage_dep_index])
-                    
-                    task.dependencies = updated_task_deps
-                    flag_modified(task, "dependencies")
-            
-            # Коммитим все изменения зависимостей
+                    tasks.append(task)
+                plan.append((stage, tasks))
+
+            # Переносим задачи между этапами через коллекции: delete-orphan удалит только реально выпавшие
+            for stage, tasks in plan:
+                if list(stage.tasks) != tasks:
+                    stage.tasks = tasks
+
+            removed_stage_ids = list(stages_by_id)
+            removed_task_ids = list(tasks_by_id)
+            for stage in stages_by_id.values():
+                db.delete(stage)
+
+            # Один flush, чтобы получить ID новых строк для зависимостей
+            db.flush()
+
+            index_to_stage_id = {stage_idx: stage.id for stage_idx, (stage, _) in enumerate(plan)}
+            index_to_task_id = {
+                (stage_idx, task_idx): task.id
+                for stage_idx, (_, tasks) in enumerate(plan)
+                for task_idx, task in enumerate(tasks)
+            }
+            # Узлы, у которых поменялся набор зависимостей; у задач - с их зависимостями-задачами
+            changed_stages, changed_tasks = [], {}
+            for stage_data, (stage, tasks) in zip(stages_in, plan):
+                if ProjectService._assign_changed(
+                    stage,
+                    dependencies=ProjectService._resolve_stage_dependencies(stage_data.dependencies, index_to_stage_id),
+                ):
+                    changed_stages.append(stage)
+                for task_data, task in zip(stage_data.tasks or [], tasks):
+                    deps, task_ids = ProjectService._resolve_task_dependencies(
+                        task_data.dependencies, index_to_task_id, index_to_stage_id
+                    )
+                    if ProjectService._assign_changed(task, dependencies=deps):
+                        changed_tasks[task.id] = task_ids
+
+            # Индексные таблицы связей обновляем только для изменившихся и удаленных узлов
+            stale_stage_ids = removed_stage_ids + [stage.id for stage in changed_stages]
+            stale_task_ids = removed_task_ids + list(changed_tasks)
+            if stale_stage_ids:
+                db.execute(delete(stage_dependencies).where(stage_dependencies.c.stage_id.in_(stale_stage_ids)))
+            if stale_task_ids:
+                db.execute(delete(task_dependencies).where(task_dependencies.c.task_id.in_(stale_task_ids)))
+            ProjectService._insert_dependency_edges(
+                db,
+                {stage.id: stage.dependencies for stage in changed_stages},
+                changed_tasks,
+                set(index_to_stage_id.values()),
+                set(index_to_task_id.values()),
+            )
+
             db.commit()
-            
-            # Важно: возвращаем этапы в том же порядке, в котором они были созданы (по порядку в stages_in)
-            # А задачи в каждом этапе - в том же порядке, в котором они были созданы
-            # Это гарантирует, что порядок на фронтенде останется таким же
-            ordered_stages = []
-            for stage_idx in range(len(stages_in)):
-                stage_id = index_to_stage_id[stage_idx]
-                stage = next((s for s in new_stages if s.id == stage_id), None)
-                if stage:
-                    # Создаем маппинг: task_id -> позиция в исходном массиве для сортировки
-                    tasks_order = {}
-                    for (s_idx, t_idx), task_id in index_to_task_id_global.items():
-                        if s_idx == stage_idx:
-                            tasks_order[task_id] = t_idx
-                    
-                    # Обновляем объекты после изменений
-                    db.refresh(stage)
-                    # После refresh tasks могут быть в неправильном порядке, поэтому сортируем их
-                    # Сортируем задачи по порядку создания (по их позиции в исходном массиве)
-                    stage.tasks.sort(key=lambda t: tasks_order.get(t.id, 999))
-                    # Обновляем каждую задачу после сортировки
-                    for task in stage.tasks:
-                        db.refresh(task)
-                    
-                    ordered_stages.append(stage)
-            
-            return ordered_stages
-        except Exception as e:
+            ScheduleService.invalidate(project_id)
+            return [stage for stage, _ in plan]
+        except Exception:
             db.rollback()
-            print(f"Error in update_project_stages: {str(e)}")
-            import traceback
-            traceback.print_exc()
             raise
 
     @staticmethod
@@ -182,10 +434,228 @@ class ProjectService:
         project.name = project_update.name
         project.description = project_update.description
         project.deadline = project_update.deadline
+        project.version = Project.version + 1
         db.commit()
         db.refresh(project)
+        ScheduleService.invalidate(project_id)
         return project
 
+    @staticmethod
+    def _delete_dependency_edges(db: Session, project_id: int) -> None:
+        # Связи не выходят за пределы проекта, поэтому достаточно фильтра по зависимой стороне
+        project_stage_ids = select(Stage.id).where(Stage.project_id == project_id)
+        project_task_ids = select(Task.id).join(Stage, Task.stage_id == Stage.id).where(Stage.project_id == project_id)
+        db.execute(delete(stage_dependencies).where(stage_dependencies.c.stage_id.in_(project_stage_ids)))
+        db.execute(delete(task_dependencies).where(task_dependencies.c.task_id.in_(project_task_ids)))
+
+    @staticmethod
+    def _insert_dependency_edges(
+        db: Session,
+        stage_deps: Dict[int, List[int]],
+        task_deps: Dict[int, List[int]],
+        valid_stage_ids: Set[int],
+        valid_task_ids: Set[int],
+    ) -> None:
+        """
+        Записывает связи в индексные таблицы; ссылки вне проекта и на себя пропускаются.
+        task_deps - только зависимости задач от задач (см. _resolve_task_dependencies).
+        """
+        stage_rows = [
+            {"stage_id": stage_id, "depends_on_id": dep}
+            for stage_id, deps in stage_deps.items()
+            for dep in dict.fromkeys(deps or [])
+            if dep in valid_stage_ids and dep != stage_id
+        ]
+        task_rows = [
+            {"task_id": task_id, "depends_on_id": dep}
+            for task_id, deps in task_deps.items()
+            for dep in dict.fromkeys(deps or [])
+            if dep in valid_task_ids and dep != task_id
+        ]
+        if stage_rows:
+            db.execute(insert(stage_dependencies), stage_rows)
+        if task_rows:
+            db.execute(insert(task_dependencies), task_rows)
+
+    @staticmethod
+    def _replace_stage_edges(db: Session, stage: Stage) -> None:
+        db.execute(delete(stage_dependencies).where(stage_dependencies.c.stage_id == stage.id))
+        deps = [dep for dep in dict.fromkeys(stage.dependencies or []) if dep != stage.id]
+        if not deps:
+            return
+        valid = db.scalars(select(Stage.id).where(Stage.project_id == stage.project_id, Stage.id.in_(deps))).all()
+        if valid:
+            db.execute(insert(stage_dependencies), [{"stage_id": stage.id, "depends_on_id": dep} for dep in valid])
+
+    @staticmethod
+    def _replace_task_edges(db: Session, project_id: int, task: Task, task_dep_ids: List[int]) -> None:
+        # task_dep_ids - зависимости, про которые известно, что это задачи (TaskPatch.dependencies)
+        db.execute(delete(task_dependencies).where(task_dependencies.c.task_id == task.id))
+        deps = [dep for dep in dict.fromkeys(task_dep_ids) if dep != task.id]
+        if not deps:
+            return
+        valid = db.scalars(
+            select(Task.id)
+            .join(Stage, Task.stage_id == Stage.id)
+            .where(Stage.project_id == project_id, Task.id.in_(deps))
+        ).all()
+        if valid:
+            db.execute(insert(task_dependencies), [{"task_id": task.id, "depends_on_id": dep} for dep in valid])
+
+    @staticmethod
+    def get_stage_dependencies(db: Session, stage_id: int) -> List[int]:
+        """ID этапов, от которых зависит этап"""
+        return db.scalars(
+            select(stage_dependencies.c.depends_on_id).where(stage_dependencies.c.stage_id == stage_id)
+        ).all()
+
+    @staticmethod
+    def get_stage_dependents(db: Session, stage_id: int) -> List[int]:
+        """ID этапов, которые зависят от этапа (индексный обратный запрос)"""
+        return db.scalars(
+            select(stage_dependencies.c.stage_id).where(stage_dependencies.c.depends_on_id == stage_id)
+        ).all()
+
+    @staticmethod
+    def get_task_dependencies(db: Session, task_id: int) -> List[int]:
+        """ID задач, от которых зависит задача"""
+        return db.scalars(
+            select(task_dependencies.c.depends_on_id).where(task_dependencies.c.task_id == task_id)
+        ).all()
+
+    @staticmethod
+    def get_task_dependents(db: Session, task_id: int) -> List[int]:
+        """ID задач, которые зависят от задачи (индексный обратный запрос)"""
+        return db.scalars(
+            select(task_dependencies.c.task_id).where(task_dependencies.c.depends_on_id == task_id)
+        ).all()
+
+    @staticmethod
+    def _detach_task_dependents(db: Session, project_id: int, task_ids: List[int]) -> None:
+        """
+        Убирает удаляемые задачи из JSON-зависимостей тех, кто на них ссылается.
+        Кто и на какие задачи ссылается, берется из task_dependencies: в JSON то же число
+        может быть и ID этапа, и такие ссылки на этапы остаются на месте.
+        """
+        edges = db.execute(
+            select(task_dependencies.c.task_id, task_dependencies.c.depends_on_id).where(
+                task_dependencies.c.depends_on_id.in_(task_ids), task_dependencies.c.task_id.not_in(task_ids)
+            )
+        ).all()
+        if edges:
+            refs: Dict[int, Set[int]] = {}
+            for dependent_id, dep in edges:
+                refs.setdefault(dependent_id, set()).add(dep)
+            # ID удаляемых задач, совпадающие с ID этапов проекта: у таких снимаем одно вхождение на связь
+            shared_ids = set(
+                db.scalars(select(Stage.id).where(Stage.project_id == project_id, Stage.id.in_(task_ids))).all()
+            )
+            for dependent in db.query(Task).filter(Task.id.in_(refs)).all():
+                task_refs = refs[dependent.id]
+                skip_once = task_refs & shared_ids
+                kept = []
+                for dep in dependent.dependencies or []:
+                    if dep in task_refs and dep not in shared_ids:
+                        continue
+                    if dep in skip_once:
+                        skip_once.discard(dep)
+                        continue
+                    kept.append(dep)
+                dependent.dependencies = kept
+                flag_modified(dependent, "dependencies")
+        db.execute(
+            delete(task_dependencies).where(
+                or_(task_dependencies.c.task_id.in_(task_ids), task_dependencies.c.depends_on_id.in_(task_ids))
+            )
+        )
+
+    @staticmethod
+    def delete_stage(db: Session, project_id: int, stage_id: int) -> bool:
+        """Удаляет этап с задачами и вычищает ссылки на них у зависимых этапов и задач"""
+        stage = db.query(Stage).filter(Stage.id == stage_id, Stage.project_id == project_id).first()
+        if not stage:
+            return False
+
+        for dependent in db.query(Stage).filter(Stage.id.in_(ProjectService.get_stage_dependents(db, stage_id))).all():
+            dependent.dependencies = [dep for dep in dependent.dependencies or [] if dep != stage_id]
+            flag_modified(dependent, "dependencies")
+        db.execute(
+            delete(stage_dependencies).where(
+                or_(stage_dependencies.c.stage_id == stage_id, stage_dependencies.c.depends_on_id == stage_id)
+            )
+        )
+        task_ids = [task.id for task in stage.tasks]
+        if task_ids:
+            ProjectService._detach_task_dependents(db, project_id, task_ids)
+
+        db.delete(stage)
+        ProjectService._bump_version(db, project_id)
+        db.commit()
+        ScheduleService.invalidate(project_id)
+        return True
+
+    @staticmethod
+    def delete_task(db: Session, project_id: int, task_id: int) -> bool:
+        """Удаляет задачу и вычищает ссылки на нее у зависимых задач"""
+        task = (
+            db.query(Task)
+            .join(Stage, Task.stage_id == Stage.id)
+            .filter(Task.id == task_id, Stage.project_id == project_id)
+            .first()
+        )
+        if not task:
+            return False
+
+        ProjectService._detach_task_dependents(db, project_id, [task_id])
+        db.delete(task)
+        ProjectService._bump_version(db, project_id)
+        db.commit()
+        ScheduleService.invalidate(project_id)
+        return True
+
+    @staticmethod
+    def _apply_patch(entity, patch) -> None:
+        for field, value in patch.model_dump(exclude_unset=True).items():
+            if field in ("responsibles", "dependencies"):
+                value = value or []
+            setattr(entity, field, value)
+            if field in ("responsibles", "dependencies"):
+                flag_modified(entity, field)
+
+    @staticmethod
+    def update_stage(db: Session, project_id: int, stage_id: int, stage_patch: StagePatch) -> Optional[Stage]:
+        """Точечно обновляет один этап без перезаписи всего проекта"""
+        stage = db.query(Stage).filter(Stage.id == stage_id, Stage.project_id == project_id).first()
+        if not stage:
+            return None
+
+        ProjectService._apply_patch(stage, stage_patch)
+        # Явный null тоже означает "без зависимостей": связи переписываются по уже нормализованному значению
+        if "dependencies" in stage_patch.model_fields_set:
+            ProjectService._replace_stage_edges(db, stage)
+        ProjectService._bump_version(db, project_id)
+        db.commit()
+        return stage
+
+    @staticmethod
+    def update_task(db: Session, project_id: int, task_id: int, task_patch: TaskPatch) -> Optional[Task]:
+        """Точечно обновляет одну задачу без перезаписи всего проекта"""
+        task = (
+            db.query(Task)
+            .join(Stage, Task.stage_id == Stage.id)
+            .filter(Task.id == task_id, Stage.project_id == project_id)
+            .first()
+        )
+        if not task:
+            return None
+
+        ProjectService._apply_patch(task, task_patch)
+        if "dependencies" in task_patch.model_fields_set:
+            ProjectService._replace_task_edges(db, project_id, task, task_patch.dependencies or [])
+        ProjectService._bump_version(db, project_id)
+        db.commit()
+        return task
+
     @staticmethod
     def delete_project(db: Session, project_id: int) -> bool:
         project = ProjectService.get_project(db, project_id)
@@ -193,8 +663,10 @@ class ProjectService:
             return False
         
         # Stages and tasks will be deleted cascade (see Project model: cascade="all, delete-orphan")
+        ProjectService._delete_dependency_edges(db, project_id)
         db.delete(project)
         db.commit()
+        ScheduleService.invalidate(project_id)
         return True
 
 
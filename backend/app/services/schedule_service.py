@@ -0,0 +1,339 @@
+import threading
+from collections import OrderedDict, deque
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.project import Project, Stage, Task
+from app.schemas.schedule import ProjectSchedule, ScheduleChanges, ScheduleEntry, StageSchedule, TaskSchedule
+
+# id -> (duration, dependencies)
+ScheduleNodes = Dict[int, Tuple[int, Iterable[int]]]
+# id -> (start_date, end_date)
+ScheduleDates = Dict[int, Tuple[date, date]]
+
+
+def compute_backward_pass(nodes: ScheduleNodes, latest_end: date) -> ScheduleDates:
+    return _backward_pass(nodes, latest_end)[0]
+
+
+def _backward_pass(nodes: ScheduleNodes, latest_end: date) -> Tuple[ScheduleDates, bool]:
+    """
+    Обратное планирование от дедлайна за один топологический проход (O(V + E)).
+
+    Узел заканчивается за день до самого раннего старта зависящих от него узлов,
+    а если таких нет — в latest_end. Зависимости на неизвестные id игнорируются,
+    как и на клиенте. Циклы разрываются на узле с наименьшим id.
+    """
+    predecessors: Dict[int, List[int]] = {}
+    dependents_left: Dict[int, int] = {node_id: 0 for node_id in nodes}
+    for node_id, (_, deps) in nodes.items():
+        valid = [dep for dep in dict.fromkeys(deps or []) if dep in nodes and dep != node_id]
+        predecessors[node_id] = valid
+        for dep in valid:
+            dependents_left[dep] += 1
+
+    bound: Dict[int, date] = {}
+    result: ScheduleDates = {}
+    queue = deque(node_id for node_id, count in dependents_left.items() if count == 0)
+
+    def schedule(node_id: int) -> None:
+        end = bound[node_id] - timedelta(days=1) if node_id in bound else latest_end
+        start = end - timedelta(days=nodes[node_id][0] - 1)
+        result[node_id] = (start, end)
+        for dep in predecessors[node_id]:
+            if dep not in bound or start < bound[dep]:
+                bound[dep] = start
+            dependents_left[dep] -= 1
+            if dependents_left[dep] == 0 and dep not in result:
+                queue.append(dep)
+
+    has_cycle = False
+    while len(result) < len(nodes):
+        while queue:
+            node_id = queue.popleft()
+            if node_id not in result:
+                schedule(node_id)
+        if len(result) < len(nodes):
+            # Оставшиеся узлы лежат на цикле — разрываем его детерминированно
+            has_cycle = True
+            schedule(min(node_id for node_id in nodes if node_id not in result))
+
+    return result, has_cycle
+
+
+class DependencyGraph:
+    """
+    Граф зависимостей одного уровня (этапы проекта или задачи этапа) с посчитанными датами.
+
+    Хранит прямые и обратные связи, поэтому правка одного узла пересчитывает
+    только его предков (конус влияния), а не весь граф.
+    """
+
+    def __init__(self, nodes: ScheduleNodes, latest_end: date):
+        self.latest_end = latest_end
+        self.duration: Dict[int, int] = {}
+        self.predecessors: Dict[int, List[int]] = {}
+        self.dependents: Dict[int, Set[int]] = {node_id: set() for node_id in nodes}
+        for node_id, (duration, deps) in nodes.items():
+            self.duration[node_id] = duration
+            self.predecessors[node_id] = self._valid_deps(node_id, deps)
+            for dep in self.predecessors[node_id]:
+                self.dependents[dep].add(node_id)
+        self.dates, self.has_cycle = _backward_pass(nodes, latest_end)
+
+    def _valid_deps(self, node_id: int, deps: Iterable[int]) -> List[int]:
+        return [dep for dep in dict.fromkeys(deps or []) if dep in self.dependents and dep != node_id]
+
+    def _recompute_all(self) -> Set[int]:
+        previous = self.dates
+        self.dates, self.has_cycle = _backward_pass(
+            {node_id: (self.duration[node_id], self.predecessors[node_id]) for node_id in self.duration},
+            self.latest_end,
+        )
+        return {node_id for node_id, dates in self.dates.items() if previous.get(node_id) != dates}
+
+    def _recompute(self, seeds: Iterable[int]) -> Set[int]:
+        if self.has_cycle:
+            # Разрыв циклов зависит от всего графа, поэтому локальный пересчет тут не годится
+            return self._recompute_all()
+
+        # Конус влияния: сами узлы и все их предки — только их даты могут поменяться
+        cone: Set[int] = set()
+        stack = [node_id for node_id in seeds if node_id in self.duration]
+        while stack:
+            node_id = stack.pop()
+            if node_id in cone:
+                continue
+            cone.add(node_id)
+            stack.extend(self.predecessors[node_id])
+
+        dependents_left = {
+            node_id: sum(1 for dependent in self.dependents[node_id] if dependent in cone) for node_id in cone
+        }
+        queue = deque(node_id for node_id, count in dependents_left.items() if count == 0)
+        new_dates: ScheduleDates = {}
+        while queue:
+            node_id = queue.popleft()
+            starts = [
+                new_dates[dependent][0] if dependent in new_dates else self.dates[dependent][0]
+                for dependent in self.dependents[node_id]
+            ]
+            end = min(starts) - timedelta(days=1) if starts else self.latest_end
+            new_dates[node_id] = (end - timedelta(days=self.duration[node_id] - 1), end)
+            for dep in self.predecessors[node_id]:
+                dependents_left[dep] -= 1
+                if dependents_left[dep] == 0:
+                    queue.append(dep)
+
+        if len(new_dates) < len(cone):
+            # Правка создала цикл (он обязательно проходит через конус)
+            return self._recompute_all()
+
+        changed = {node_id for node_id, dates in new_dates.items() if self.dates.get(node_id) != dates}
+        self.dates.update(new_dates)
+        return changed
+
+    def set_duration(self, node_id: int, duration: int) -> Set[int]:
+        if self.duration.get(node_id) == duration:
+            return set()
+        self.duration[node_id] = duration
+        return self._recompute([node_id])
+
+    def set_dependencies(self, node_id: int, deps: Iterable[int]) -> Set[int]:
+        old = self.predecessors[node_id]
+        new = self._valid_deps(node_id, deps)
+        if old == new:
+            return set()
+        for dep in old:
+            self.dependents[dep].discard(node_id)
+        for dep in new:
+            self.dependents[dep].add(node_id)
+        self.predecessors[node_id] = new
+        # Бывшие и новые предки теряют или получают зависимый узел
+        return self._recompute([node_id, *old, *new])
+
+    def set_latest_end(self, latest_end: date) -> Set[int]:
+        if self.latest_end == latest_end:
+            return set()
+        self.latest_end = latest_end
+        return self._recompute_all()
+
+
+class ProjectScheduleState:
+    """Посчитанное расписание проекта, которое держится в памяти между правками"""
+
+    def __init__(self, project: Project, stages: List[Stage]):
+        self.project_id = project.id
+        self.version = project.version
+        self.deadline = project.deadline.date()
+        self.lock = threading.Lock()
+        self.stage_order = [stage.id for stage in stages]
+        self.task_order: Dict[int, List[int]] = {}
+        self.task_stage: Dict[int, int] = {}
+        self.stages = DependencyGraph(
+            {stage.id: (stage.duration, stage.dependencies or []) for stage in stages},
+            self.deadline,
+        )
+        self.tasks: Dict[int, DependencyGraph] = {}
+        for stage in stages:
+            self.task_order[stage.id] = [task.id for task in stage.tasks]
+            for task in stage.tasks:
+                self.task_stage[task.id] = stage.id
+            # Задачи зависят только от задач своего этапа и упираются в конец этапа
+            self.tasks[stage.id] = DependencyGraph(
+                {task.id: (task.duration, task.dependencies or []) for task in stage.tasks},
+                self.stages.dates[stage.id][1],
+            )
+
+    def to_schema(self) -> ProjectSchedule:
+        stages = []
+        for stage_id in self.stage_order:
+            stage_start, stage_end = self.stages.dates[stage_id]
+            task_dates = self.tasks[stage_id].dates
+            stages.append(
+                StageSchedule(
+                    id=stage_id,
+                    start_date=stage_start,
+                    end_date=stage_end,
+                    tasks=[
+                        TaskSchedule(id=task_id, start_date=task_dates[task_id][0], end_date=task_dates[task_id][1])
+                        for task_id in self.task_order[stage_id]
+                    ],
+                )
+            )
+        return ProjectSchedule(project_id=self.project_id, deadline=self.deadline, stages=stages)
+
+    def all_changes(self) -> ScheduleChanges:
+        return self._changes(set(self.stage_order), set(self.task_stage))
+
+    def _changes(self, stage_ids: Set[int], task_ids: Set[int]) -> ScheduleChanges:
+        stage_entries = [
+            ScheduleEntry(id=stage_id, start_date=self.stages.dates[stage_id][0], end_date=self.stages.dates[stage_id][1])
+            for stage_id in self.stage_order
+            if stage_id in stage_ids
+        ]
+        task_entries = []
+        for stage_id in self.stage_order:
+            task_dates = self.tasks[stage_id].dates
+            task_entries.extend(
+                ScheduleEntry(id=task_id, start_date=task_dates[task_id][0], end_date=task_dates[task_id][1])
+                for task_id in self.task_order[stage_id]
+                if task_id in task_ids
+            )
+        return ScheduleChanges(project_id=self.project_id, stages=stage_entries, tasks=task_entries)
+
+    def update_stage(self, stage: Stage) -> ScheduleChanges:
+        changed_stages = self.stages.set_duration(stage.id, stage.duration)
+        changed_stages |= self.stages.set_dependencies(stage.id, stage.dependencies or [])
+
+        changed_tasks: Set[int] = set()
+        for stage_id in changed_stages:
+            # Сдвинулся конец этапа — сдвигаются и его задачи
+            changed_tasks |= self.tasks[stage_id].set_latest_end(self.stages.dates[stage_id][1])
+        return self._changes(changed_stages, changed_tasks)
+
+    def update_task(self, task: Task) -> ScheduleChanges:
+        graph = self.tasks[task.stage_id]
+        changed_tasks = graph.set_duration(task.id, task.duration)
+        changed_tasks |= graph.set_dependencies(task.id, task.dependencies or [])
+        return self._changes(set(), changed_tasks)
+
+
+class ScheduleService:
+    # Расписания проектов в памяти процесса (LRU), сбрасываются при полной перезаписи проекта
+    _cache: "OrderedDict[int, ProjectScheduleState]" = OrderedDict()
+    _cache_lock = threading.Lock()
+    cache_size = 128
+
+    @staticmethod
+    def build_schedule(project: Project, stages: List[Stage]) -> ProjectSchedule:
+        """Считает даты этапов и задач так же, как recalculateDates на фронтенде"""
+        return ProjectScheduleState(project, stages).to_schema()
+
+    @staticmethod
+    def _load_state(
+        db: Session, project_id: int, version: Optional[int] = None
+    ) -> Tuple[Optional[ProjectScheduleState], bool]:
+        """version - текущая Project.version: расписание другой версии (правка в другом процессе) пересчитывается"""
+        with ScheduleService._cache_lock:
+            state = ScheduleService._cache.get(project_id)
+            if state is not None and (version is None or state.version == version):
+                ScheduleService._cache.move_to_end(project_id)
+                return state, False
+
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if not project:
+            return None, False
+
+        stages = (
+            db.query(Stage)
+            .options(selectinload(Stage.tasks))
+            .filter(Stage.project_id == project_id)
+            .order_by(Stage.position, Stage.id)
+            .all()
+        )
+        state = ProjectScheduleState(project, stages)
+        with ScheduleService._cache_lock:
+            ScheduleService._cache[project_id] = state
+            while len(ScheduleService._cache) > ScheduleService.cache_size:
+                ScheduleService._cache.popitem(last=False)
+        return state, True
+
+    @staticmethod
+    def get_project_schedule(db: Session, project_id: int, version: Optional[int] = None) -> Optional[ProjectSchedule]:
+        state, _ = ScheduleService._load_state(db, project_id, version)
+        if state is None:
+            return None
+        with state.lock:
+            return state.to_schema()
+
+    @staticmethod
+    def _state_for_update(
+        db: Session, project_id: int, is_known, version: Optional[int] = None
+    ) -> Tuple[ProjectScheduleState, bool]:
+        state, fresh = ScheduleService._load_state(db, project_id)
+        # Инкрементально можно применить только правку, сделанную поверх версии из памяти
+        stale = version is not None and state.version != version - 1
+        if not fresh and (stale or not is_known(state)):
+            # Расписание в памяти устарело (узел появился после его построения или проект правили в другом месте)
+            ScheduleService.invalidate(project_id)
+            state, fresh = ScheduleService._load_state(db, project_id)
+        return state, fresh
+
+    @staticmethod
+    def apply_stage_update(db: Session, stage: Stage, version: Optional[int] = None) -> ScheduleChanges:
+        """
+        Пересчитывает только этапы и задачи, зависящие от измененного этапа.
+        version - Project.version после правки.
+        """
+        state, fresh = ScheduleService._state_for_update(
+            db, stage.project_id, lambda s: stage.id in s.stages.duration, version
+        )
+        with state.lock:
+            if fresh:
+                # Расписание построено уже с учетом правки
+                return state.all_changes()
+            if version is not None:
+                state.version = version
+            return state.update_stage(stage)
+
+    @staticmethod
+    def apply_task_update(db: Session, task: Task, version: Optional[int] = None) -> ScheduleChanges:
+        """Пересчитывает только задачи этапа, от которых зависит измененная задача"""
+        project_id = db.query(Stage.project_id).filter(Stage.id == task.stage_id).scalar()
+        state, fresh = ScheduleService._state_for_update(
+            db, project_id, lambda s: s.task_stage.get(task.id) == task.stage_id, version
+        )
+        with state.lock:
+            if fresh:
+                return state.all_changes()
+            if version is not None:
+                state.version = version
+            return state.update_task(task)
+
+    @staticmethod
+    def invalidate(project_id: int) -> None:
+        with ScheduleService._cache_lock:
+            ScheduleService._cache.pop(project_id, None)
@@ -1,28 +1,76 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple
 
-from sqlalchemy import or_
+from sqlalchemy import ColumnElement, Row, case, column, func, literal_column, or_, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.security import get_password_hash, verify_password
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.security import get_password_hash, invalidate_principal, verify_password
 from app.models.student import Student
 from app.schemas.student import StudentCreate
 
+_settings = get_settings()
+
+# FTS5-таблица с триграммами (создается в app.db.migrations, только SQLite)
+_search_index = table("students_search", column("rowid"))
+
+
+def _search_rank(student: Row, needle: str) -> tuple:
+    """
+    Сначала точное совпадение email или имени, затем совпадения с начала email или имени,
+    затем с начала слова в имени, затем остальные
+    """
+    email = student.email.casefold()
+    full_name = student.full_name.casefold()
+    if needle in (email, full_name):
+        rank = 0
+    elif email.startswith(needle) or full_name.startswith(needle):
+        rank = 1
+    elif any(word.startswith(needle) for word in full_name.split()):
+        rank = 2
+    else:
+        rank = 3
+    return rank, full_name, student.id
+
+
+def _exact_match(needle: str) -> ColumnElement[bool]:
+    return or_(func.lower(Student.email) == needle, func.lower(Student.full_name) == needle)
+
+
+def _search_matches(student: Row, needle: str) -> bool:
+    return needle in student.email.casefold() or needle in student.full_name.casefold()
+
 
 class StudentService:
+    # нормализованный запрос -> (ранжированные кандидаты, полный ли это список совпадений)
+    search_cache = TTLCache(
+        maxsize=_settings.student_search_cache_size, ttl=_settings.student_search_cache_ttl_seconds
+    )
+    _search_index_available: Optional[bool] = None
+
     @staticmethod
     def get_by_email(db: Session, email: str) -> Student | None:
         return db.query(Student).filter(Student.email == email).first()
 
     @staticmethod
-    def create_student(db: Session, student_in: StudentCreate) -> Student:
+    async def get_by_email_async(db: AsyncSession, email: str) -> Student | None:
+        return await db.scalar(select(Student).where(Student.email == email).limit(1))
+
+    @staticmethod
+    def create_student(db: Session, student_in: StudentCreate, hashed_password: Optional[str] = None) -> Student:
+        """hashed_password можно посчитать заранее (например, в password_pool)"""
         student = Student(
             email=student_in.email,
             full_name=student_in.full_name,
-            hashed_password=get_password_hash(student_in.password),
+            hashed_password=hashed_password or get_password_hash(student_in.password),
         )
         db.add(student)
         db.commit()
         db.refresh(student)
+        # Старые токены с тем же email не должны указывать на прежнюю запись
+        invalidate_principal(student.email)
+        StudentService.search_cache.clear()
         return student
 
     @staticmethod
@@ -35,20 +83,103 @@ class StudentService:
         return student
 
     @staticmethod
-    def search_students(db: Session, query: str, limit: int = 10) -> List[Student]:
-        """Поиск пользователей по имени или email"""
-        search_term = f"%{query.lower()}%"
-        return (
-            db.query(Student)
-            .filter(
+    def search_students(db: Session, query: str, limit: int = 10) -> List[Row]:
+        """Поиск пользователей по подстроке имени или email: точные совпадения, затем с начала, затем остальные"""
+        needle = query.strip().casefold()
+        if not needle:
+            return []
+
+        entry = StudentService._cached_search(needle)
+        if entry is None:
+            candidates, exhaustive = StudentService._search_candidates(db, needle)
+            entry = (tuple(sorted(candidates, key=lambda student: _search_rank(student, needle))), exhaustive)
+            StudentService.search_cache.set(needle, entry)
+        return list(entry[0][:limit])
+
+    @staticmethod
+    def _cached_search(needle: str) -> Optional[Tuple[Sequence[Row], bool]]:
+        """
+        Результат из кэша для самого запроса или для его префикса.
+
+        Если для префикса закэширован полный список совпадений, то совпадения
+        более длинного запроса - его подмножество: фильтруем без обращения к БД.
+        """
+        for end in range(len(needle), 0, -1):
+            entry = StudentService.search_cache.get(needle[:end])
+            if entry is None:
+                continue
+            if end == len(needle):
+                return entry
+            rows, exhaustive = entry
+            if not exhaustive:
+                continue
+            matches = [student for student in rows if _search_matches(student, needle)]
+            entry = (tuple(sorted(matches, key=lambda student: _search_rank(student, needle))), True)
+            StudentService.search_cache.set(needle, entry)
+            return entry
+        return None
+
+    @staticmethod
+    def _search_candidates(db: Session, needle: str) -> Tuple[List[Row], bool]:
+        """
+        До student_search_candidates совпадений и признак полноты.
+        В приоритете точные совпадения, затем начинающиеся с needle.
+        """
+        limit = _settings.student_search_candidates
+        query = select(Student.id, Student.email, Student.full_name)
+
+        # Триграммам нужно хотя бы 3 символа; более короткие запросы обслуживает кэш префиксов
+        if len(needle) >= 3 and StudentService._has_search_index(db):
+            phrase = '"' + needle.replace('"', '""') + '"'
+            query = query.join(_search_index, _search_index.c.rowid == Student.id)
+            match = literal_column("students_search").op("MATCH")
+            # ^ - фраза в начале колонки: совпадения с начала не теряются среди тысяч остальных
+            # Точные совпадения - частный случай префиксных, сортируем их в начало до LIMIT
+            prefixed = db.execute(
+                query.where(match("^" + phrase))
+                .order_by(case((_exact_match(needle), 0), else_=1), Student.id)
+                .limit(limit)
+            ).all()
+            rows = db.execute(query.where(match(phrase)).limit(limit)).all()
+            seen = {student.id for student in prefixed}
+            candidates = prefixed + [student for student in rows if student.id not in seen]
+            return candidates[:limit], len(rows) < limit
+
+        # На Postgres этот ILIKE обслуживают GIN-индексы pg_trgm
+        escaped = needle.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        match_tier = case(
+            (_exact_match(needle), 0),
+            (
                 or_(
-                    Student.email.ilike(search_term),
-                    Student.full_name.ilike(search_term)
+                    Student.email.ilike(f"{escaped}%", escape="\\"),
+                    Student.full_name.ilike(f"{escaped}%", escape="\\"),
+                ),
+                1,
+            ),
+            else_=2,
+        )
+        pattern = f"%{escaped}%"
+        rows = db.execute(
+            query.where(
+                or_(
+                    Student.email.ilike(pattern, escape="\\"),
+                    Student.full_name.ilike(pattern, escape="\\"),
                 )
             )
+            .order_by(match_tier, Student.id)
             .limit(limit)
-            .all()
-        )
+        ).all()
+        return rows, len(rows) < limit
+
+    @staticmethod
+    def _has_search_index(db: Session) -> bool:
+        if StudentService._search_index_available is None:
+            StudentService._search_index_available = db.get_bind().dialect.name == "sqlite" and bool(
+                db.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students_search'")
+                ).first()
+            )
+        return StudentService._search_index_available
 
     @staticmethod
     def get_by_id(db: Session, student_id: int) -> Optional[Student]:
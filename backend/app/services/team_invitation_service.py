@@ -1,10 +1,13 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, select
+from sqlalchemy.orm import Session, aliased
 
-from app.models.team_invitation import InvitationStatus, TeamInvitation
+from app.core.pagination import count_rows, keyset
+from app.models.student import Student
 from app.models.team import Team
+from app.models.team_invitation import InvitationStatus, TeamInvitation
 from app.services.team_service import TeamService
 
 
@@ -23,13 +26,11 @@ class TeamInvitationService:
             return None
         
         # Проверяем, что пользователь не является уже участником
-        team = db.query(Team).filter(Team.id == team_id).first()
-        from app.models.student import Student
         invited_user = db.query(Student).filter(Student.id == invited_user_id).first()
         if not invited_user:
             return None
         
-        if invited_user in team.members:
+        if TeamService.is_user_member(db, team_id, invited_user_id):
             return None  # Уже участник
         
         # Проверяем, нет ли уже активного приглашения
@@ -57,15 +58,49 @@ class TeamInvitationService:
         return invitation
 
     @staticmethod
-    def get_user_invitations(db: Session, user_id: int) -> List[TeamInvitation]:
-        """Получить все приглашения пользователя"""
-        return (
-            db.query(TeamInvitation)
-            .filter(
-                TeamInvitation.invited_user_id == user_id,
-                TeamInvitation.status == InvitationStatus.PENDING
+    def get_user_invitations(
+        db: Session,
+        user_id: int,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> List[Row]:
+        """
+        Входящие приглашения пользователя одним запросом: вместе с названием команды
+        и именами отправителя и получателя, по индексу ix_team_invitations_inbox.
+        При limit - страница после курсора after (+1 строка).
+        """
+        invited_by = aliased(Student)
+        invited_user = aliased(Student)
+        query = (
+            select(
+                TeamInvitation.id,
+                TeamInvitation.team_id,
+                TeamInvitation.invited_by_id,
+                TeamInvitation.invited_user_id,
+                TeamInvitation.status,
+                TeamInvitation.created_at,
+                TeamInvitation.responded_at,
+                Team.name.label("team_name"),
+                invited_by.full_name.label("invited_by_name"),
+                invited_user.full_name.label("invited_user_name"),
             )
-            .all()
+            .join(Team, Team.id == TeamInvitation.team_id)
+            .join(invited_by, invited_by.id == TeamInvitation.invited_by_id)
+            .join(invited_user, invited_user.id == TeamInvitation.invited_user_id)
+            .where(*TeamInvitationService._user_invitations_filter(user_id))
+        )
+        return db.execute(keyset(query, TeamInvitation.created_at, TeamInvitation.id, limit, after)).all()
+
+    @staticmethod
+    def count_user_invitations(db: Session, user_id: int) -> int:
+        query = select(TeamInvitation.id).where(*TeamInvitationService._user_invitations_filter(user_id))
+        return db.scalar(count_rows(query))
+
+    @staticmethod
+    def _user_invitations_filter(user_id: int) -> tuple:
+        return (
+            TeamInvitation.invited_user_id == user_id,
+            TeamInvitation.status == InvitationStatus.PENDING,
         )
 
     @staticmethod
@@ -92,6 +127,7 @@ class TeamInvitationService:
         invitation.status = InvitationStatus.ACCEPTED
         invitation.responded_at = datetime.utcnow()
         db.commit()
+        TeamService.invalidate_membership(invitation.team_id, user_id)
         return True
 
     @staticmethod
@@ -1,14 +1,28 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Tuple
 
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, delete, exists, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload, undefer
 
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.pagination import count_rows, keyset
+from app.models.project import Project
 from app.models.team import Team, team_members
 from app.models.student import Student
 from app.schemas.team import TeamCreate, TeamUpdate
+from app.services.project_service import ProjectService
+
+_settings = get_settings()
 
 
 class TeamService:
+    # (team_id, student_id) -> является ли участником (владелец или член)
+    membership_cache = TTLCache(
+        maxsize=_settings.membership_cache_size, ttl=_settings.membership_cache_ttl_seconds
+    )
+
     @staticmethod
     def create_team(db: Session, team_in: TeamCreate, owner_id: int) -> Team:
         team = Team(
@@ -18,6 +32,8 @@ class TeamService:
         db.add(team)
         db.commit()
         db.refresh(team)
+        # ID удаленных команд могут переиспользоваться
+        TeamService.invalidate_membership(team.id)
         # Add owner as a member automatically? Usually yes.
         TeamService.add_member(db, team.id, owner_id)
         return team
@@ -27,20 +43,47 @@ class TeamService:
         return db.query(Team).filter(Team.id == team_id).first()
 
     @staticmethod
-    def get_user_teams(db: Session, user_id: int) -> List[Team]:
+    async def get_team_async(db: AsyncSession, team_id: int, with_members: bool = False) -> Optional[Team]:
+        # В async-сессии ленивой загрузки нет, поэтому поля ответа грузим сразу
+        options = [undefer(Team.project_count)]
+        if with_members:
+            options.append(selectinload(Team.members))
+        return await db.scalar(select(Team).options(*options).where(Team.id == team_id))
+
+    @staticmethod
+    def _user_teams_query(user_id: int) -> Select:
         # Return teams where user is owner OR member
         # Get team IDs where user is a member (via team_members table)
-        member_team_ids_subquery = db.query(team_members.c.team_id).filter(
-            team_members.c.student_id == user_id
-        )
-        
-        # Return teams where user is owner OR member
-        return db.query(Team).filter(
+        member_team_ids_subquery = select(team_members.c.team_id).where(team_members.c.student_id == user_id)
+        return select(Team).where(
             or_(
                 Team.owner_id == user_id,
                 Team.id.in_(member_team_ids_subquery)
             )
-        ).distinct().all()
+        ).distinct()
+
+    @staticmethod
+    def get_user_teams(
+        db: Session, user_id: int, limit: Optional[int] = None, after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Team]:
+        """Команды пользователя по (created_at, id); при limit - страница после курсора after (+1 строка)"""
+        query = keyset(TeamService._user_teams_query(user_id), Team.created_at, Team.id, limit, after)
+        return db.scalars(query.options(undefer(Team.project_count))).all()
+
+    @staticmethod
+    async def get_user_teams_async(
+        db: AsyncSession, user_id: int, limit: Optional[int] = None, after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Team]:
+        query = keyset(TeamService._user_teams_query(user_id), Team.created_at, Team.id, limit, after)
+        return (await db.scalars(query.options(undefer(Team.project_count)))).all()
+
+    @staticmethod
+    def count_user_teams(db: Session, user_id: int) -> int:
+        return db.scalar(count_rows(TeamService._user_teams_query(user_id)))
+
+    @staticmethod
+    async def count_user_teams_async(db: AsyncSession, user_id: int) -> int:
+        return await db.scalar(count_rows(TeamService._user_teams_query(user_id)))
 
     @staticmethod
     def add_member(db: Session, team_id: int, student_id: int) -> bool:
@@ -49,9 +92,11 @@ class TeamService:
         if not team or not student:
             return False
         
-        if student not in team.members:
-            team.members.append(student)
+        if not TeamService._has_member_row(db, team_id, student_id):
+            db.execute(insert(team_members).values(team_id=team_id, student_id=student_id))
             db.commit()
+            db.expire(team, ["members"])
+        TeamService.invalidate_membership(team_id, student_id)
         return True
 
     @staticmethod
@@ -86,63 +131,100 @@ class TeamService:
         if not TeamService.is_user_member(db, team_id, user_id):
             return False
         
-        # All associated objects (projects, stages, tasks, invitations) 
-        # will be deleted via SQLAlchemy cascade rules
+        TeamService._delete(db, team)
+        return True
+
+    @staticmethod
+    def _delete(db: Session, team: Team) -> None:
+        # Проекты, этапы, задачи и приглашения удаляются каскадом ORM, а связи зависимостей
+        # в него не входят - чистим их явно, как в ProjectService.delete_project
+        for project_id in db.scalars(select(Project.id).where(Project.team_id == team.id)).all():
+            ProjectService._delete_dependency_edges(db, project_id)
         db.delete(team)
         db.commit()
-        return True
+        TeamService.invalidate_membership(team.id)
+
+    @staticmethod
+    def _has_member_row(db: Session, team_id: int, student_id: int) -> bool:
+        return db.scalar(
+            select(
+                exists().where(team_members.c.team_id == team_id, team_members.c.student_id == student_id)
+            )
+        )
 
     @staticmethod
     def is_user_member(db: Session, team_id: int, user_id: int) -> bool:
         """Проверяет, является ли пользователь участником команды (владелец или член)"""
-        team = db.query(Team).filter(Team.id == team_id).first()
-        if not team:
-            return False
-        
-        # Владелец всегда участник
-        if team.owner_id == user_id:
-            return True
-        
-        # Прямой запрос к таблице связей через колонки (самый быстрый и надежный)
-        is_member = db.query(team_members.c.student_id).filter(
-            team_members.c.team_id == team_id,
-            team_members.c.student_id == user_id
-        ).first() is not None
-        
+        key = (team_id, user_id)
+        cached = TeamService.membership_cache.get(key)
+        if cached is not None:
+            return cached
+
+        is_member = bool(db.scalar(TeamService._membership_query(team_id, user_id)))
+        TeamService.membership_cache.set(key, is_member)
+        return is_member
+
+    @staticmethod
+    async def is_user_member_async(db: AsyncSession, team_id: int, user_id: int) -> bool:
+        key = (team_id, user_id)
+        cached = TeamService.membership_cache.get(key)
+        if cached is not None:
+            return cached
+
+        is_member = bool(await db.scalar(TeamService._membership_query(team_id, user_id)))
+        TeamService.membership_cache.set(key, is_member)
         return is_member
 
+    @staticmethod
+    def _membership_query(team_id: int, user_id: int) -> Select:
+        # Один EXISTS-запрос по PK teams и PK team_members, без загрузки списка участников
+        return select(
+            or_(
+                exists().where(Team.id == team_id, Team.owner_id == user_id),
+                exists().where(team_members.c.team_id == team_id, team_members.c.student_id == user_id),
+            )
+        )
+
+    @staticmethod
+    def invalidate_membership(team_id: int, student_id: Optional[int] = None) -> None:
+        """Сбрасывает кэш членства для пары или для всей команды (смена владельца, удаление)"""
+        if student_id is not None:
+            TeamService.membership_cache.pop((team_id, student_id))
+        else:
+            TeamService.membership_cache.discard_if(lambda key, _: key[0] == team_id)
+
     @staticmethod
     def remove_member(db: Session, team_id: int, student_id: int) -> bool:
         """Удаляет участника из команды. Если выходит последний участник — удаляет команду."""
         team = TeamService.get_team(db, team_id)
         if not team:
             return False
-            
-        student = db.query(Student).filter(Student.id == student_id).first()
-        if not student:
-            return False
-        
-        # Проверяем, является ли пользователь участником
-        if student not in team.members:
+
+        # Проверяем участие одним EXISTS по team_members, без загрузки списка участников
+        if not TeamService._has_member_row(db, team_id, student_id):
             return False
 
         # Если это владелец, нужно передать права или удалить команду
         if team.owner_id == student_id:
             # Ищем другого участника, который не является уходящим владельцем
-            other_member = next((m for m in team.members if m.id != student_id), None)
-            
-            if other_member:
-                # Передаем владение следующему по списку
-                team.owner_id = other_member.id
-            else:
+            other_member_id = db.scalar(
+                select(team_members.c.student_id)
+                .where(team_members.c.team_id == team_id, team_members.c.student_id != student_id)
+                .order_by(team_members.c.student_id)
+                .limit(1)
+            )
+            if other_member_id is None:
                 # Если больше никого нет — удаляем команду целиком
-                db.delete(team)
-                db.commit()
+                TeamService._delete(db, team)
                 return True
+            # Передаем владение следующему участнику
+            team.owner_id = other_member_id
 
-        # Удаляем пользователя из списка участников
-        team.members.remove(student)
+        db.execute(
+            delete(team_members).where(team_members.c.team_id == team_id, team_members.c.student_id == student_id)
+        )
         db.commit()
+        db.expire(team, ["members"])
+        # Новый владелец и так был участником: меняется только запись ушедшего
+        TeamService.invalidate_membership(team_id, student_id)
         return True
-
-
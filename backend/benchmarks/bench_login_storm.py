@@ -0,0 +1,148 @@
+"""
+Шторм логинов: сколько логинов в секунду выдерживает сервер и как при этом
+растет задержка остальных эндпоинтов (GET /api/v1/teams).
+
+Поднимает uvicorn отдельным процессом во временной базе (чтобы клиенты не делили
+с сервером GIL) и бьет по нему обычными HTTP-запросами.
+Запуск из каталога backend:
+    python -m benchmarks.bench_login_storm --clients 32 --duration 10
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+PASSWORD = "bench-password"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(base: str, method: str, path: str, body=None, token=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base + path, data=data, method=method)
+    req.add_header("Content-Type", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            return response.status, json.loads(response.read() or b"null")
+    except urllib.error.HTTPError as exc:
+        return exc.code, None
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def probe(base: str, token: str, stop: threading.Event, interval: float):
+    """Задержки GET /teams, пока не выставлен stop"""
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        request(base, "GET", "/api/v1/teams", token=token)
+        latencies.append(time.perf_counter() - started)
+        time.sleep(interval)
+    return latencies
+
+
+def storm(base: str, emails, stop: threading.Event, counters: dict, lock: threading.Lock, index: int):
+    email = emails[index % len(emails)]
+    while not stop.is_set():
+        status, _ = request(base, "POST", "/api/v1/auth/login", {"email": email, "password": PASSWORD})
+        with lock:
+            counters[status] = counters.get(status, 0) + 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32, help="одновременных клиентов логина")
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="секунд на каждую фазу")
+    parser.add_argument("--probe-interval", type=float, default=0.02)
+    args = parser.parse_args()
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        run(base, port, args)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def wait_for_server(port: int) -> None:
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def run(base: str, port: int, args) -> None:
+    wait_for_server(port)
+
+    emails = [f"storm-{i}@example.com" for i in range(args.users)]
+    for email in emails:
+        request(base, "POST", "/api/v1/auth/register", {"email": email, "full_name": "Storm", "password": PASSWORD})
+    _, tokens = request(base, "POST", "/api/v1/auth/login", {"email": emails[0], "password": PASSWORD})
+    token = tokens["access_token"]
+
+    # Фаза 1: только пробы, без нагрузки
+    stop = threading.Event()
+    timer = threading.Timer(args.duration, stop.set)
+    timer.start()
+    baseline = probe(base, token, stop, args.probe_interval)
+
+    # Фаза 2: пробы на фоне шторма логинов
+    stop = threading.Event()
+    counters: dict = {}
+    lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=args.clients + 1) as pool:
+        for index in range(args.clients):
+            pool.submit(storm, base, emails, stop, counters, lock, index)
+        probe_future = pool.submit(probe, base, token, stop, args.probe_interval)
+        started = time.perf_counter()
+        time.sleep(args.duration)
+        stop.set()
+        loaded = probe_future.result()
+        elapsed = time.perf_counter() - started
+
+
+    print(f"login clients: {args.clients}, phase: {args.duration:.0f}s")
+    print(f"logins ok:     {counters.get(200, 0) / elapsed:8.1f} /s")
+    print(f"logins shed:   {counters.get(503, 0) / elapsed:8.1f} /s (503)")
+    other = {code: count for code, count in counters.items() if code not in (200, 503)}
+    if other:
+        print(f"other codes:   {other}")
+    for name, latencies in (("idle", baseline), ("storm", loaded)):
+        print(
+            f"GET /teams {name:5}: n={len(latencies):5} "
+            f"p50={percentile(latencies, 0.50) * 1000:7.1f}ms p99={percentile(latencies, 0.99) * 1000:7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Бенчмарк сериализации дерева проекта (GET /api/v1/projects/{id}).
+
+Отдельно меряет валидацию ORM -> ProjectRead, кодирование тела стандартным
+JSONResponse и ORJSONResponse, а также размер ответа до и после gzip.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_serialization --sizes 100 1000 10000
+"""
+import argparse
+import gzip
+import os
+import tempfile
+import time
+
+# База создается во временном каталоге до импорта приложения
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models import Project, Stage  # noqa: E402
+from app.schemas.project import ProjectRead  # noqa: E402
+from app.services.project_service import ProjectService  # noqa: E402
+from benchmarks.bench_stage_save import build_payload, create_project  # noqa: E402
+
+adapter = TypeAdapter(ProjectRead)
+
+
+def best_of(repeat: int, func):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def load_tree(db, project_id: int) -> Project:
+    db.expunge_all()
+    return (
+        db.query(Project)
+        .options(selectinload(Project.stages).selectinload(Stage.tasks))
+        .filter(Project.id == project_id)
+        .one()
+    )
+
+
+def run(sizes, repeat: int, level: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    print(
+        f"{'tasks':>8} {'validate, ms':>13} {'json, ms':>10} {'orjson, ms':>11} "
+        f"{'raw, KB':>9} {'gzip, KB':>9} {'gzip, ms':>9}"
+    )
+    for size in sizes:
+        db = SessionLocal()
+        try:
+            project_id = create_project(db)
+            ProjectService.update_project_stages(db, project_id, build_payload(size))
+            project = load_tree(db, project_id)
+
+            # То же, что делает FastAPI для response_model: валидация и dump в JSON-совместимые типы
+            validate, content = best_of(
+                repeat, lambda: adapter.dump_python(adapter.validate_python(project), mode="json")
+            )
+            plain, body = best_of(repeat, lambda: JSONResponse(content).body)
+            fast, fast_body = best_of(repeat, lambda: ORJSONResponse(content).body)
+            compress, packed = best_of(repeat, lambda: gzip.compress(fast_body, compresslevel=level))
+        finally:
+            db.close()
+        print(
+            f"{size:>8} {validate * 1000:>13.1f} {plain * 1000:>10.1f} {fast * 1000:>11.1f} "
+            f"{len(body) / 1024:>9.1f} {len(packed) / 1024:>9.1f} {compress * 1000:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--level", type=int, default=6, help="Уровень сжатия gzip")
+    args = parser.parse_args()
+    run(args.sizes, args.repeat, args.level)
@@ -0,0 +1,147 @@
+"""
+Бенчмарк сохранения структуры проекта (ProjectService.update_project_stages).
+
+Стратегия current - код сервиса; row-by-row - эталон прежней реализации
+(коммит и refresh на каждую строку), чтобы "до" и "после" мерились одним прогоном.
+Кроме времени печатается число SQL-запросов на одно сохранение.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_stage_save --sizes 100 1000 10000
+    python -m benchmarks.bench_stage_save --sizes 100 1000 --strategies current row-by-row
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import List
+
+# База создается во временном каталоге до импорта приложения
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.orm.attributes import flag_modified  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models import Project, Stage, Student, Task, Team  # noqa: E402
+from app.schemas.project import StageCreate, TaskCreate  # noqa: E402
+from app.services.project_service import ProjectService  # noqa: E402
+
+TASKS_PER_STAGE = 50
+
+
+def build_payload(task_count: int):
+    stage_count = max(1, task_count // TASKS_PER_STAGE)
+    stages = []
+    for stage_idx in range(stage_count):
+        tasks = [
+            TaskCreate(
+                name=f"Task {stage_idx}.{task_idx}",
+                duration=1 + task_idx % 3,
+                # Цепочка внутри этапа плюс ссылка на этап
+                dependencies=[stage_idx * 10000 + task_idx - 1] if task_idx else [-(stage_idx + 1)],
+            )
+            for task_idx in range(TASKS_PER_STAGE)
+        ]
+        stages.append(
+            StageCreate(
+                name=f"Stage {stage_idx}",
+                duration=5,
+                dependencies=[stage_idx - 1] if stage_idx else [],
+                tasks=tasks,
+            )
+        )
+    return stages
+
+
+def create_project(db) -> int:
+    student = Student(email=f"bench-{time.time_ns()}@example.com", full_name="Bench", hashed_password="x")
+    db.add(student)
+    db.flush()
+    team = Team(name="Bench", owner_id=student.id)
+    db.add(team)
+    db.flush()
+    project = Project(name="Bench", deadline=datetime(2030, 1, 1), team_id=team.id)
+    db.add(project)
+    db.commit()
+    return project.id
+
+
+def save_row_by_row(db, project_id: int, stages_in: List[StageCreate]) -> None:
+    """Эталон прежнего update_project_stages: INSERT, COMMIT и refresh на каждый этап и задачу"""
+    project = ProjectService.get_project(db, project_id)
+    project.stages = []
+    db.commit()
+
+    stages, stage_ids, task_ids = [], {}, {}
+    for idx, stage_data in enumerate(stages_in):
+        stage = Stage(name=stage_data.name, duration=stage_data.duration, project_id=project_id, dependencies=[])
+        db.add(stage)
+        db.commit()
+        db.refresh(stage)
+        stages.append(stage)
+        stage_ids[idx] = stage.id
+    for stage_idx, (stage_data, stage) in enumerate(zip(stages_in, stages)):
+        for task_idx, task_data in enumerate(stage_data.tasks):
+            task = Task(name=task_data.name, duration=task_data.duration, stage_id=stage.id, dependencies=[])
+            db.add(task)
+            db.commit()
+            db.refresh(task)
+            task_ids[(stage_idx, task_idx)] = task.id
+            stage.tasks.append(task)
+
+    for stage_data, stage in zip(stages_in, stages):
+        stage.dependencies = ProjectService._resolve_stage_dependencies(stage_data.dependencies, stage_ids)
+        flag_modified(stage, "dependencies")
+        for task_data, task in zip(stage_data.tasks, stage.tasks):
+            task.dependencies = ProjectService._resolve_task_dependencies(task_data.dependencies, task_ids, stage_ids)
+            flag_modified(task, "dependencies")
+    db.commit()
+    for stage in stages:
+        db.refresh(stage)
+        for task in stage.tasks:
+            db.refresh(task)
+
+
+STRATEGIES = {
+    "current": ProjectService.update_project_stages,
+    "row-by-row": save_row_by_row,
+}
+
+
+def run(sizes, repeat: int, strategies: List[str]) -> None:
+    Base.metadata.create_all(bind=engine)
+    statements = 0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(*_):
+        nonlocal statements
+        statements += 1
+
+    print(f"{'tasks':>8} {'strategy':>12} {'best, s':>10} {'mean, s':>10} {'queries':>9}")
+    for size in sizes:
+        payload = build_payload(size)
+        for name in strategies:
+            timings = []
+            db = SessionLocal()
+            try:
+                project_id = create_project(db)
+                for _ in range(repeat):
+                    statements = 0
+                    started = time.perf_counter()
+                    STRATEGIES[name](db, project_id, payload)
+                    timings.append(time.perf_counter() - started)
+                    db.expunge_all()
+            finally:
+                db.close()
+            print(f"{size:>8} {name:>12} {min(timings):>10.3f} {sum(timings) / len(timings):>10.3f} {statements:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--strategies", nargs="+", choices=list(STRATEGIES), default=list(STRATEGIES))
+    args = parser.parse_args()
+    run(args.sizes, args.repeat, args.strategies)
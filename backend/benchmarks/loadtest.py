@@ -0,0 +1,340 @@
+"""
+Нагрузочный прогон смешанных сценариев с фиксированной интенсивностью (открытая модель):
+запросы стартуют по пуассоновскому расписанию независимо от того, успели ли ответить
+предыдущие, а задержка считается от запланированного момента старта. Поэтому
+перегрузка видна как рост p99 и отброшенные запросы, а не как молча упавший RPS.
+
+Режимы:
+  * по умолчанию - приложение в том же процессе (httpx.ASGITransport), временная SQLite;
+  * --spawn-uvicorn - отдельный процесс uvicorn (клиент не делит GIL с сервером);
+  * --base-url - уже запущенный сервер, база которого наполнена benchmarks.workload.
+--database-url задает базу для первых двух режимов (например, локальный PostgreSQL).
+
+Запуск из каталога backend (нужны зависимости из benchmarks/requirements.txt):
+    python -m benchmarks.loadtest --rate 50 --duration 30 --mix read=80,save=10,invites=10
+    python -m benchmarks.loadtest --spawn-uvicorn --workers 2 --rate 200 --out load.json
+    python -m benchmarks.loadtest --base-url http://127.0.0.1:8000 --prefix load --rate 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field, fields
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.bench_login_storm import free_port, percentile, wait_for_server
+
+API = "/api/v1"
+SHARED_WORKLOAD_FIELDS = ("seed", "prefix", "password")
+SEARCH_TERMS = ["iv", "olga", "petr", "smirn", "anna", "load1", "serg"]
+
+
+@dataclass
+class VirtualUser:
+    email: str
+    headers: Dict[str, str]
+    project_ids: List[int]
+
+
+@dataclass
+class Context:
+    users: List[VirtualUser]
+    save_payload: list
+
+
+@dataclass
+class ScenarioStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: Dict[str, int] = field(default_factory=dict)
+
+
+Scenario = Callable[[httpx.AsyncClient, Context, random.Random], Awaitable[httpx.Response]]
+
+
+def _user_project(ctx: Context, rng: random.Random):
+    user = rng.choice(ctx.users)
+    return user, rng.choice(user.project_ids)
+
+
+async def scenario_read(client, ctx, rng):
+    user, project_id = _user_project(ctx, rng)
+    return await client.get(f"{API}/projects/{project_id}", headers=user.headers)
+
+
+async def scenario_save(client, ctx, rng):
+    # Полная перезапись плана: именно здесь видна конкуренция за блокировку записи
+    user, project_id = _user_project(ctx, rng)
+    return await client.put(f"{API}/projects/{project_id}/stages", json=ctx.save_payload, headers=user.headers)
+
+
+async def scenario_schedule(client, ctx, rng):
+    user, project_id = _user_project(ctx, rng)
+    return await client.get(f"{API}/projects/{project_id}/schedule", headers=user.headers)
+
+
+async def scenario_invites(client, ctx, rng):
+    return await client.get(f"{API}/teams/invitations/my", headers=rng.choice(ctx.users).headers)
+
+
+async def scenario_teams(client, ctx, rng):
+    return await client.get(f"{API}/teams", headers=rng.choice(ctx.users).headers)
+
+
+async def scenario_search(client, ctx, rng):
+    return await client.get(
+        f"{API}/teams/search-users", params={"q": rng.choice(SEARCH_TERMS)}, headers=rng.choice(ctx.users).headers
+    )
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "read": scenario_read,
+    "save": scenario_save,
+    "schedule": scenario_schedule,
+    "invites": scenario_invites,
+    "teams": scenario_teams,
+    "search": scenario_search,
+}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def build_save_payload(tasks: int, tasks_per_stage: int = 10) -> list:
+    """План в формате StageCreate: цепочка этапов, внутри этапа цепочка задач"""
+    stages = []
+    for stage_idx in range(max(1, tasks // tasks_per_stage)):
+        stages.append({
+            "name": f"Load stage {stage_idx}",
+            "duration": 3,
+            "dependencies": [stage_idx - 1] if stage_idx else [],
+            "tasks": [
+                {"name": f"Load task {stage_idx}.{task_idx}", "duration": 1,
+                 "dependencies": [stage_idx * 10000 + task_idx - 1] if task_idx else []}
+                for task_idx in range(tasks_per_stage)
+            ],
+        })
+    return stages
+
+
+async def login_users(client: httpx.AsyncClient, args) -> List[VirtualUser]:
+    """Логинит пользователей {prefix}{n}@example.com, пока не наберется --users участников команд с проектами"""
+
+    async def try_user(n: int) -> Optional[VirtualUser]:
+        email = f"{args.prefix}{n}@example.com"
+        response = await client.post(f"{API}/auth/login", json={"email": email, "password": args.password})
+        if response.status_code != 200:
+            return None
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        project_ids = []
+        for team in (await client.get(f"{API}/teams", headers=headers)).json():
+            summaries = await client.get(f"{API}/projects/summary", params={"team_id": team["id"]}, headers=headers)
+            project_ids.extend(project["id"] for project in summaries.json())
+        return VirtualUser(email, headers, project_ids) if project_ids else None
+
+    users: List[VirtualUser] = []
+    # Пачками по 8: Argon2 дорогой, а пул хэширования ограничен
+    for start in range(0, args.scan_limit, 8):
+        found = await asyncio.gather(*(try_user(n) for n in range(start, min(start + 8, args.scan_limit))))
+        users.extend(user for user in found if user is not None)
+        if len(users) >= args.users:
+            return users[: args.users]
+    if not users:
+        raise RuntimeError(f"no {args.prefix}N@example.com users with projects; seed with benchmarks.workload")
+    return users
+
+
+async def drive(client: httpx.AsyncClient, ctx: Context, args) -> dict:
+    rng = random.Random(args.seed)
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    stats = {name: ScenarioStats() for name in names}
+    loop = asyncio.get_running_loop()
+    in_flight = set()
+    dropped = 0
+    sent = 0
+
+    async def fire(name: str, scheduled: float, measured: bool) -> None:
+        try:
+            response = await SCENARIOS[name](client, ctx, rng)
+            outcome = None if response.status_code < 400 else str(response.status_code)
+        except httpx.HTTPError as exc:
+            outcome = type(exc).__name__
+        if not measured:
+            return
+        if outcome is None:
+            # От запланированного старта, а не от фактического: иначе задержка очереди клиента теряется
+            stats[name].latencies.append(loop.time() - scheduled)
+        else:
+            stats[name].errors[outcome] = stats[name].errors.get(outcome, 0) + 1
+
+    start = loop.time()
+    scheduled = start
+    while True:
+        scheduled += rng.expovariate(args.rate)
+        if scheduled - start > args.warmup + args.duration:
+            break
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        measured = scheduled - start >= args.warmup
+        if len(in_flight) >= args.max_in_flight:
+            # Система уже не справляется: запрос не отправляется, но учитывается
+            dropped += measured
+            continue
+        sent += measured
+        task = asyncio.create_task(fire(rng.choices(names, weights)[0], scheduled, measured))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    await asyncio.gather(*in_flight)
+    elapsed = loop.time() - start - args.warmup
+    return report(stats, sent, dropped, elapsed, args)
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    return {
+        "ok": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 0.90) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 2),
+    }
+
+
+def report(stats: Dict[str, ScenarioStats], sent: int, dropped: int, elapsed: float, args) -> dict:
+    scenarios = {
+        name: {**summarize(item.latencies, sum(item.errors.values()), elapsed), "error_codes": item.errors}
+        for name, item in stats.items()
+    }
+    all_latencies = [value for item in stats.values() for value in item.latencies]
+    total = summarize(all_latencies, sum(sum(item.errors.values()) for item in stats.values()), elapsed)
+    total.update(offered_rps=args.rate, sent=sent, dropped=dropped)
+
+    print(f"\noffered {args.rate:.0f} rps for {elapsed:.0f} s, sent {sent}, dropped {dropped} (max in flight {args.max_in_flight})")
+    print(f"{'scenario':<10} {'ok':>7} {'err':>5} {'rps':>8} {'p50, ms':>9} {'p90, ms':>9} {'p99, ms':>9} {'max, ms':>9}")
+    for name, row in [*scenarios.items(), ("total", total)]:
+        print(f"{name:<10} {row['ok']:>7} {row['errors']:>5} {row['throughput_rps']:>8.1f} "
+              f"{row['p50_ms']:>9.1f} {row['p90_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}")
+    for name, row in scenarios.items():
+        if row["error_codes"]:
+            print(f"  {name} errors: {row['error_codes']}")
+    return {"total": total, "scenarios": scenarios}
+
+
+async def run(args, client: httpx.AsyncClient) -> dict:
+    users = await login_users(client, args)
+    print(f"{len(users)} users, {sum(len(user.project_ids) for user in users)} projects")
+    ctx = Context(users=users, save_payload=build_save_payload(args.plan_tasks))
+    return await drive(client, ctx, args)
+
+
+def seed(args) -> None:
+    """Наполняет --database-url генератором benchmarks.workload (импорт после выбора базы)"""
+    from app.db.session import engine
+    from benchmarks.workload import WorkloadConfig, generate
+
+    written = generate(engine, WorkloadConfig(**{item.name: getattr(args, item.name) for item in fields(WorkloadConfig)}))
+    print(f"seeded {sum(written.values()):,} rows")
+
+
+def main() -> int:
+    # Настройки приложения кэшируются при первом импорте app, поэтому база выбирается до него
+    database = argparse.ArgumentParser(add_help=False)
+    database.add_argument("--database-url", help="База для наполнения и сервера (по умолчанию временная SQLite)")
+    known, _ = database.parse_known_args()
+    os.environ["DATABASE_URL"] = known.database_url or f"sqlite:///{tempfile.mkdtemp()}/load.db"
+    from benchmarks.workload import WorkloadConfig
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter, parents=[database]
+    )
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("read=80,save=10,invites=10"),
+                        help=f"Сценарии и веса: {','.join(SCENARIOS)}")
+    parser.add_argument("--rate", type=float, default=50.0, help="Запросов в секунду (пуассоновский поток)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Секунд измерения")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Секунд разгона, не входящих в отчет")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Больше одновременных запросов не отправлять")
+    parser.add_argument("--users", type=int, default=20, help="Виртуальных пользователей")
+    parser.add_argument("--plan-tasks", type=int, default=200, help="Задач в плане сценария save")
+    parser.add_argument("--seed", type=int, default=42)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url", help="Уже запущенный сервер (база наполнена benchmarks.workload)")
+    target.add_argument("--spawn-uvicorn", action="store_true", help="Запустить uvicorn отдельным процессом")
+    parser.add_argument("--workers", type=int, default=1, help="Процессов uvicorn для --spawn-uvicorn")
+    parser.add_argument("--no-seed", action="store_true", help="База уже наполнена")
+    parser.add_argument("--prefix", default="load", help="Префикс email пользователей генератора")
+    parser.add_argument("--password", default="load-password")
+    parser.add_argument("--scan-limit", type=int, default=2000, help="Сколько email перебрать при поиске пользователей")
+    # Размеры генерируемых данных - поля WorkloadConfig, кроме общих с нагрузкой
+    sizing = WorkloadConfig(students=2000, teams=100)
+    for item in fields(WorkloadConfig):
+        if item.name not in SHARED_WORKLOAD_FIELDS:
+            parser.add_argument(f"--{item.name.replace('_', '-')}", type=type(getattr(sizing, item.name)),
+                                default=getattr(sizing, item.name))
+    parser.add_argument("--out", help="Куда записать отчет (JSON)")
+    args = parser.parse_args()
+
+    server = None
+    if not args.base_url:
+        from app.main import app
+
+        if not args.no_seed:
+            seed(args)
+        if args.spawn_uvicorn:
+            port = free_port()
+            args.base_url = f"http://127.0.0.1:{port}"
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                 "--workers", str(args.workers), "--log-level", "warning"],
+                env=dict(os.environ),
+            )
+            wait_for_server(port)
+
+    async def session() -> dict:
+        limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+        if args.base_url:
+            client = httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits)
+        else:
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=60)
+        async with client:
+            return await run(args, client)
+
+    try:
+        started = time.perf_counter()
+        result = asyncio.run(session())
+        result["config"] = {
+            "mode": "uvicorn" if args.spawn_uvicorn else ("external" if server is None and args.base_url else "in-process"),
+            "database": "external" if args.base_url and not args.spawn_uvicorn else os.environ["DATABASE_URL"].split(":")[0],
+            "mix": args.mix, "rate": args.rate, "duration": args.duration, "warmup": args.warmup,
+            "users": args.users, "plan_tasks": args.plan_tasks, "workers": args.workers, "seed": args.seed,
+            "wall_seconds": round(time.perf_counter() - started, 1),
+        }
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
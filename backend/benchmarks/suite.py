@@ -0,0 +1,327 @@
+"""
+Набор бенчмарков горячих путей API: приложение FastAPI в том же процессе,
+временная SQLite-база, результаты в JSON для сравнения между коммитами.
+
+Сценарии: login (Argon2), GET и PUT /projects/{id} на 100/1k/10k задач,
+GET /teams при большом числе проектов, search-users среди 100k студентов,
+входящие приглашения.
+
+Запуск из каталога backend (нужны зависимости из benchmarks/requirements.txt):
+    python -m benchmarks.suite --out baseline.json
+    python -m benchmarks.suite --out current.json --compare baseline.json --fail-on-regression
+    python -m benchmarks.suite --only project search --sizes 100 1000
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+# База создается во временном каталоге до импорта приложения
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from app.core.config import get_settings  # noqa: E402
+from app.core.metrics import query_metrics  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Project, Student, Team, TeamInvitation  # noqa: E402
+from app.models.team import team_members  # noqa: E402
+from app.services.student_service import StudentService  # noqa: E402
+from benchmarks.bench_login_storm import percentile  # noqa: E402
+from benchmarks.bench_stage_save import build_payload  # noqa: E402
+
+PASSWORD = "bench-password"
+FIRST_NAMES = ["Ivan", "Maria", "Alexey", "Olga", "Dmitry", "Anna", "Sergey", "Elena", "Pavel", "Natalia"]
+LAST_NAMES = ["Ivanov", "Petrova", "Smirnov", "Kuznetsova", "Popov", "Sokolova", "Lebedev", "Novikova"]
+# Без повторов для поиска: кэш результатов поиска сбрасывается перед каждым вызовом
+SEARCH_QUERIES = ["iv", "olga", "petrova", "student1234", "serg smir", "example.com"]
+
+CASES: Dict[str, Callable] = {}
+
+
+def case(name: str):
+    def register(func):
+        CASES[name] = func
+        return func
+
+    return register
+
+
+def query_count() -> int:
+    return sum(metrics.snapshot().count for metrics in query_metrics.values())
+
+
+class Bench:
+    def __init__(self, client: TestClient, repeat: int):
+        self.client = client
+        self.repeat = repeat
+        self.results: List[dict] = []
+
+    def user(self, email: str, full_name: str = "Bench User") -> dict:
+        self.client.post(
+            "/api/v1/auth/register", json={"email": email, "full_name": full_name, "password": PASSWORD}
+        )
+        response = self.client.post("/api/v1/auth/login", json={"email": email, "password": PASSWORD})
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def measure(
+        self,
+        name: str,
+        params: dict,
+        call: Callable[[], object],
+        iterations: Optional[int] = None,
+        before_each: Optional[Callable[[], None]] = None,
+        warmup: int = 1,
+    ) -> None:
+        """Прогоняет call iterations раз (после warmup) и записывает задержки и число SQL-запросов"""
+        iterations = iterations or self.repeat
+        for _ in range(warmup):
+            if before_each:
+                before_each()
+            call()
+        timings = []
+        queries = query_count()
+        for _ in range(iterations):
+            if before_each:
+                before_each()
+            started = time.perf_counter()
+            response = call()
+            timings.append((time.perf_counter() - started) * 1000)
+            status = getattr(response, "status_code", 200)
+            if status >= 400:
+                raise RuntimeError(f"{name} {params}: HTTP {status} {response.text[:200]}")
+        result = {
+            "name": name,
+            "params": params,
+            "iterations": iterations,
+            "min_ms": round(min(timings), 3),
+            "median_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(percentile(timings, 0.95), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "queries_per_op": round((query_count() - queries) / iterations, 2),
+        }
+        self.results.append(result)
+        print(f"{name:<22} {json.dumps(params):<28} median {result['median_ms']:>9.2f} ms  "
+              f"p95 {result['p95_ms']:>9.2f} ms  queries {result['queries_per_op']:>6}")
+
+
+# --- Наполнение базы напрямую через Core executemany (API для объемов в 100k слишком медленный) ---
+
+def seed_students(count: int, start: int = 0) -> None:
+    with SessionLocal() as db:
+        for offset in range(0, count, 10000):
+            db.execute(
+                insert(Student),
+                [
+                    {
+                        "email": f"student{i}@example.com",
+                        "full_name": f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[i // 10 % len(LAST_NAMES)]}",
+                        "hashed_password": "x",
+                    }
+                    for i in range(start + offset, start + min(offset + 10000, count))
+                ],
+            )
+        db.commit()
+
+
+def user_id(email: str) -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(Student.id).where(Student.email == email))
+
+
+@case("login")
+def bench_login(bench: Bench, args) -> None:
+    bench.user("login@example.com")
+    body = {"email": "login@example.com", "password": PASSWORD}
+    bench.measure("login", {}, lambda: bench.client.post("/api/v1/auth/login", json=body), iterations=10)
+
+
+@case("project")
+def bench_project(bench: Bench, args) -> None:
+    headers = bench.user("project@example.com")
+    team = bench.client.post("/api/v1/teams", json={"name": "Bench"}, headers=headers).json()
+    for size in args.sizes:
+        project = bench.client.post(
+            "/api/v1/projects",
+            json={"name": f"Bench {size}", "deadline": "2030-01-01T00:00:00", "team_id": team["id"]},
+            headers=headers,
+        ).json()
+        payload = [stage.model_dump() for stage in build_payload(size)]
+        url = f"/api/v1/projects/{project['id']}"
+        # Тяжелые размеры гоняются меньше раз, чтобы весь набор укладывался в минуты
+        iterations = max(3, bench.repeat * 100 // max(size, 100))
+        bench.measure(
+            "project_put_stages",
+            {"tasks": size},
+            lambda: bench.client.put(f"{url}/stages", json=payload, headers=headers),
+            iterations=iterations,
+        )
+        bench.measure("project_get", {"tasks": size}, lambda: bench.client.get(url, headers=headers), iterations)
+
+
+@case("teams")
+def bench_teams(bench: Bench, args) -> None:
+    headers = bench.user("teams@example.com")
+    owner = user_id("teams@example.com")
+    created = datetime(2024, 1, 1)
+    with SessionLocal() as db:
+        team_ids = db.scalars(
+            insert(Team).returning(Team.id, sort_by_parameter_order=True),
+            [{"name": f"Team {i}", "owner_id": owner, "created_at": created} for i in range(args.teams)],
+        ).all()
+        db.execute(insert(team_members), [{"team_id": team_id, "student_id": owner} for team_id in team_ids])
+        db.execute(
+            insert(Project),
+            [
+                {"name": f"Project {i}", "deadline": created, "created_at": created, "team_id": team_id}
+                for team_id in team_ids
+                for i in range(args.projects_per_team)
+            ],
+        )
+        db.commit()
+    params = {"teams": args.teams, "projects_per_team": args.projects_per_team}
+    bench.measure("teams_list", params, lambda: bench.client.get("/api/v1/teams", headers=headers))
+    bench.measure(
+        "teams_list_page", {**params, "limit": 20},
+        lambda: bench.client.get("/api/v1/teams", params={"limit": 20}, headers=headers),
+    )
+
+
+@case("search")
+def bench_search(bench: Bench, args) -> None:
+    headers = bench.user("search@example.com")
+    seed_students(args.students)
+    for query in SEARCH_QUERIES:
+        bench.measure(
+            "search_users",
+            {"students": args.students, "q": query},
+            lambda: bench.client.get("/api/v1/teams/search-users", params={"q": query}, headers=headers),
+            before_each=StudentService.search_cache.clear,
+        )
+
+
+@case("inbox")
+def bench_inbox(bench: Bench, args) -> None:
+    headers = bench.user("inbox@example.com")
+    invitee = user_id("inbox@example.com")
+    inviter_email = "inviter@example.com"
+    bench.user(inviter_email)
+    inviter = user_id(inviter_email)
+    created = datetime(2024, 1, 1)
+    with SessionLocal() as db:
+        team_ids = db.scalars(
+            insert(Team).returning(Team.id, sort_by_parameter_order=True),
+            [{"name": f"Inviting {i}", "owner_id": inviter, "created_at": created} for i in range(args.invitations)],
+        ).all()
+        db.execute(
+            insert(TeamInvitation),
+            [
+                {
+                    "team_id": team_id,
+                    "invited_by_id": inviter,
+                    "invited_user_id": invitee,
+                    "status": "pending",
+                    "created_at": created + timedelta(seconds=i),
+                }
+                for i, team_id in enumerate(team_ids)
+            ],
+        )
+        db.commit()
+    url = "/api/v1/teams/invitations/my"
+    params = {"invitations": args.invitations}
+    bench.measure("invitations_inbox", params, lambda: bench.client.get(url, headers=headers))
+    bench.measure(
+        "invitations_inbox_page", {**params, "limit": 20},
+        lambda: bench.client.get(url, params={"limit": 20}, headers=headers),
+    )
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    settings = get_settings()
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "async_db": settings.async_db,
+            "orjson_responses": settings.orjson_responses,
+            "gzip_enabled": settings.gzip_enabled,
+        },
+    }
+
+
+def compare(results: List[dict], baseline_path: str, threshold: float) -> List[str]:
+    """Сравнивает медианы с прошлым прогоном; возвращает сценарии, замедлившиеся больше чем на threshold"""
+    with open(baseline_path) as f:
+        baseline = {
+            (item["name"], json.dumps(item["params"], sort_keys=True)): item for item in json.load(f)["results"]
+        }
+    regressions = []
+    print(f"\n{'case':<50} {'base, ms':>10} {'now, ms':>10} {'ratio':>7}")
+    for item in results:
+        key = (item["name"], json.dumps(item["params"], sort_keys=True))
+        old = baseline.get(key)
+        if old is None:
+            continue
+        ratio = item["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        label = f"{item['name']} {key[1]}"
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(label)
+        print(f"{label[:50]:<50} {old['median_ms']:>10.2f} {item['median_ms']:>10.2f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="Запустить только эти сценарии")
+    parser.add_argument("--repeat", type=int, default=20, help="Повторов на легких сценариях")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Задач в проекте")
+    parser.add_argument("--students", type=int, default=100000)
+    parser.add_argument("--teams", type=int, default=50)
+    parser.add_argument("--projects-per-team", type=int, default=40)
+    parser.add_argument("--invitations", type=int, default=500)
+    parser.add_argument("--out", help="Куда записать результаты (JSON)")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения медиан")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Допустимое замедление медианы (0.2 = 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Код выхода 1 при замедлении")
+    args = parser.parse_args()
+
+    bench = Bench(TestClient(app), args.repeat)
+    for name in args.only or CASES:
+        CASES[name](bench, args)
+
+    report = {"environment": environment(), "results": bench.results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        regressions = compare(bench.results, args.compare, args.threshold)
+        if regressions and args.fail_on_regression:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+Генератор синтетической нагрузки: студенты, команды с участниками, проекты с DAG
+этапов и задач, входящие приглашения. Пишет напрямую через Core executemany
+с заранее выделенными ID, поэтому миллионы строк вставляются за минуты.
+
+Одинаковый --seed дает одинаковые данные (кроме соли хэша пароля).
+Все пользователи получают один пароль (--password), их email: {prefix}{n}@example.com.
+
+Запуск из каталога backend:
+    python -m benchmarks.workload --database-url sqlite:///load.db --students 100000 --teams 2000
+    python -m benchmarks.workload --database-url sqlite:///load.db --stage-depth 12 --stage-width 4 --fan-in 3
+"""
+import argparse
+import random
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence
+
+from sqlalchemy import Table, create_engine, func, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import get_settings
+from app.core.security import get_password_hash
+from app.db.base import Base
+from app.db.engine import configure_engine, engine_options
+from app.db.migrations import run_migrations
+from app.models import Project, Stage, Student, Task, Team, TeamInvitation
+from app.models.project import stage_dependencies, task_dependencies
+from app.models.team import team_members
+
+FIRST_NAMES = ["Ivan", "Maria", "Alexey", "Olga", "Dmitry", "Anna", "Sergey", "Elena", "Pavel", "Natalia",
+               "Nikita", "Daria", "Artem", "Polina", "Kirill", "Sofia", "Egor", "Victoria"]
+LAST_NAMES = ["Ivanov", "Petrova", "Smirnov", "Kuznetsova", "Popov", "Sokolova", "Lebedev", "Novikova",
+              "Morozov", "Volkova", "Fedorov", "Orlova", "Zaitsev", "Pavlova"]
+EPOCH = datetime(2024, 1, 1)
+
+
+@dataclass
+class WorkloadConfig:
+    seed: int = 42
+    prefix: str = "load"
+    password: str = "load-password"
+    students: int = 10000
+    teams: int = 500
+    members_min: int = 3
+    members_max: int = 30
+    projects_per_team: int = 4
+    # DAG этапов: stage_depth слоев по stage_width этапов; каждый узел зависит
+    # от 1..fan_in узлов предыдущего слоя. Внутри этапа задачи устроены так же
+    stage_depth: int = 6
+    stage_width: int = 3
+    task_depth: int = 4
+    task_width: int = 5
+    fan_in: int = 2
+    # Доля студентов, у которых есть входящее приглашение
+    invited_share: float = 0.3
+    batch_size: int = 10000
+
+
+class _Writer:
+    """
+    Буферы строк по таблицам. При переполнении сбрасываются все сразу в порядке
+    sorted_tables (родители раньше детей), чтобы не нарушать внешние ключи PostgreSQL.
+    """
+
+    def __init__(self, conn: Connection, batch_size: int):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.pending: Dict[Table, List[dict]] = {}
+        self.written: Dict[str, int] = {}
+        self._size = 0
+
+    def add(self, table: Table, row: dict) -> None:
+        self.pending.setdefault(table, []).append(row)
+        self._size += 1
+        if self._size >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        for table in Base.metadata.sorted_tables:
+            rows = self.pending.pop(table, None)
+            if rows:
+                self.conn.execute(table.insert(), rows)
+                self.written[table.name] = self.written.get(table.name, 0) + len(rows)
+        self._size = 0
+
+
+class _Ids:
+    """Следующие свободные ID таблиц: строки вставляются с явными ID, без RETURNING"""
+
+    def __init__(self, conn: Connection, tables: Sequence[Table]):
+        self._next = {table: (conn.scalar(select(func.max(table.c.id))) or 0) + 1 for table in tables}
+
+    def take(self, table: Table) -> int:
+        value = self._next[table]
+        self._next[table] = value + 1
+        return value
+
+
+def _layered_dag(rng: random.Random, depth: int, width: int, fan_in: int) -> List[List[int]]:
+    """Зависимости узлов 0..depth*width-1 (индексы) слоями: узел слоя k ссылается на узлы слоя k-1"""
+    deps = []
+    for layer in range(depth):
+        previous = range((layer - 1) * width, layer * width)
+        for _ in range(width):
+            deps.append(sorted(rng.sample(previous, rng.randint(1, min(fan_in, width)))) if layer else [])
+    return deps
+
+
+def _write_plan(writer: _Writer, ids: _Ids, rng: random.Random, config: WorkloadConfig, project_id: int) -> None:
+    stage_tab, task_tab = Stage.__table__, Task.__table__
+    stage_dag = _layered_dag(rng, config.stage_depth, config.stage_width, config.fan_in)
+    stage_ids = [ids.take(stage_tab) for _ in stage_dag]
+    for position, (stage_id, deps) in enumerate(zip(stage_ids, stage_dag)):
+        stage_deps = [stage_ids[dep] for dep in deps]
+        writer.add(stage_tab, {
+            "id": stage_id, "name": f"Stage {position + 1}", "duration": rng.randint(1, 10),
+            "project_id": project_id, "is_completed": rng.random() < 0.3, "responsibles": [],
+            "feedback": None, "dependencies": stage_deps, "position": position,
+        })
+        for dep in stage_deps:
+            writer.add(stage_dependencies, {"stage_id": stage_id, "depends_on_id": dep})
+
+        task_dag = _layered_dag(rng, config.task_depth, config.task_width, config.fan_in)
+        task_ids = [ids.take(task_tab) for _ in task_dag]
+        for task_position, (task_id, task_deps) in enumerate(zip(task_ids, task_dag)):
+            resolved = [task_ids[dep] for dep in task_deps]
+            writer.add(task_tab, {
+                "id": task_id, "name": f"Task {position + 1}.{task_position + 1}", "duration": rng.randint(1, 5),
+                "stage_id": stage_id, "is_completed": rng.random() < 0.3, "responsibles": [],
+                "feedback": None, "dependencies": resolved, "position": task_position,
+            })
+            for dep in resolved:
+                writer.add(task_dependencies, {"task_id": task_id, "depends_on_id": dep})
+
+
+def generate(engine: Engine, config: WorkloadConfig) -> Dict[str, int]:
+    """Наполняет базу engine по config в одной транзакции; возвращает число вставленных строк по таблицам"""
+    rng = random.Random(config.seed)
+    student_tab, team_tab, project_tab = Student.__table__, Team.__table__, Project.__table__
+    invitation_tab = TeamInvitation.__table__
+    hashed_password = get_password_hash(config.password)
+
+    with engine.begin() as conn:
+        ids = _Ids(conn, [student_tab, team_tab, project_tab, Stage.__table__, Task.__table__, invitation_tab])
+        writer = _Writer(conn, config.batch_size)
+
+        student_ids = []
+        for n in range(config.students):
+            student_id = ids.take(student_tab)
+            student_ids.append(student_id)
+            writer.add(student_tab, {
+                "id": student_id, "email": f"{config.prefix}{n}@example.com", "hashed_password": hashed_password,
+                "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            })
+
+        members_by_team: Dict[int, set] = {}
+        for n in range(config.teams):
+            team_id = ids.take(team_tab)
+            size = min(len(student_ids), rng.randint(config.members_min, config.members_max))
+            members = rng.sample(student_ids, size)
+            members_by_team[team_id] = set(members)
+            created = EPOCH + timedelta(minutes=n)
+            writer.add(team_tab, {"id": team_id, "name": f"Team {n + 1}", "owner_id": members[0], "created_at": created})
+            for member in members:
+                writer.add(team_members, {"team_id": team_id, "student_id": member})
+            for p in range(config.projects_per_team):
+                project_id = ids.take(project_tab)
+                writer.add(project_tab, {
+                    "id": project_id, "name": f"Project {n + 1}.{p + 1}", "description": None,
+                    "deadline": created + timedelta(days=rng.randint(30, 365)),
+                    "created_at": created + timedelta(seconds=p), "team_id": team_id, "version": 1,
+                })
+                _write_plan(writer, ids, rng, config, project_id)
+
+        # Приглашения от владельца команды тем, кто в ней еще не состоит
+        team_ids = list(members_by_team)
+        invited = rng.sample(student_ids, int(len(student_ids) * config.invited_share)) if team_ids else []
+        for n, student_id in enumerate(invited):
+            team_id = rng.choice(team_ids)
+            if student_id in members_by_team[team_id]:
+                continue
+            writer.add(invitation_tab, {
+                "id": ids.take(invitation_tab), "team_id": team_id,
+                "invited_by_id": next(iter(members_by_team[team_id])), "invited_user_id": student_id,
+                "status": "pending", "created_at": EPOCH + timedelta(seconds=n), "responded_at": None,
+            })
+
+        writer.flush()
+        if conn.dialect.name == "postgresql":
+            # Явные ID не двигают последовательности SERIAL
+            for table in ids._next:
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+                ))
+    return writer.written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=get_settings().database_url)
+    defaults = WorkloadConfig()
+    for field in fields(WorkloadConfig):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(getattr(defaults, field.name)),
+                            default=getattr(defaults, field.name))
+    args = parser.parse_args()
+    config = WorkloadConfig(**{field.name: getattr(args, field.name) for field in fields(WorkloadConfig)})
+
+    settings = get_settings()
+    engine = create_engine(args.database_url, **engine_options(args.database_url, settings, "workload"))
+    configure_engine(engine, settings, "workload")
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    started = time.perf_counter()
+    written = generate(engine, config)
+    elapsed = time.perf_counter() - started
+    total = sum(written.values())
+    for table, count in written.items():
+        print(f"{table:<20} {count:>12,}")
+    print(f"{'total':<20} {total:>12,} rows in {elapsed:.1f} s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Общие фикстуры: приложение поверх временной SQLite и хелперы для пользователей, команд и проектов.
+Окружение выставляется до импорта app: настройки кэшируются при первом чтении.
+"""
+import os
+import tempfile
+import uuid
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+# Дешевый Argon2: в тестах важна логика, а не стоимость хэша
+os.environ["ARGON2_TIME_COST"] = "1"
+os.environ["ARGON2_MEMORY_COST"] = "1024"
+os.environ["ARGON2_PARALLELISM"] = "1"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+API = "/api/v1"
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(client):
+    """Регистрирует пользователя и возвращает заголовки авторизации"""
+
+    def make():
+        email = f"user-{uuid.uuid4().hex[:12]}@example.com"
+        response = client.post(
+            f"{API}/auth/register", json={"email": email, "password": "password", "full_name": "Test User"}
+        )
+        assert response.status_code == 201, response.text
+        response = client.post(f"{API}/auth/login", json={"email": email, "password": "password"})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return make
+
+
+@pytest.fixture
+def make_team(client):
+    def make(headers, name="Team"):
+        response = client.post(f"{API}/teams", json={"name": name}, headers=headers)
+        assert response.status_code == 201, response.text
+        return response.json()["id"]
+
+    return make
+
+
+@pytest.fixture
+def make_project(client, make_team):
+    """Создает проект (по умолчанию в новой команде) и возвращает (team_id, project_id)"""
+
+    def make(headers, team_id=None):
+        team_id = team_id or make_team(headers)
+        response = client.post(
+            f"{API}/projects",
+            json={"name": "Project", "deadline": "2030-01-01T00:00:00", "team_id": team_id},
+            headers=headers,
+        )
+        assert response.status_code == 201, response.text
+        return team_id, response.json()["id"]
+
+    return make
@@ -0,0 +1,102 @@
+"""
+Асинхронные маршруты чтения (ASYNC_DB=true) через aiosqlite против синхронных на той же базе:
+ответы, статусы и заголовки пагинации должны совпадать.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import get_settings
+from app.db.session import get_async_db, to_async_url
+from app.main import create_application
+
+from conftest import API
+
+PLAN = [
+    {"name": "A", "duration": 2, "is_completed": True, "tasks": [{"name": "a1"}, {"name": "a2", "dependencies": [0]}]},
+    {"name": "B", "duration": 3, "dependencies": [0], "tasks": [{"name": "b1", "dependencies": [-1]}]},
+]
+
+
+@pytest.fixture(scope="module")
+def async_client():
+    settings = get_settings()
+    async_url = to_async_url(settings.database_url)
+    assert async_url.startswith("sqlite+aiosqlite://")
+    # NullPool: соединения aiosqlite не переживают event loop TestClient
+    engine = create_async_engine(async_url, poolclass=NullPool)
+    sessions = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    opened = []
+
+    async def get_db():
+        async with sessions() as db:
+            opened.append(db)
+            yield db
+
+    app = create_application(settings.model_copy(update={"async_db": True}))
+    app.dependency_overrides[get_async_db] = get_db
+    with TestClient(app) as client:
+        client.opened_sessions = opened
+        yield client
+
+
+@pytest.fixture
+def data(client, make_user, make_team, make_project):
+    owner, outsider = make_user(), make_user()
+    team_id = make_team(owner, "Async team")
+    project_ids = []
+    for _ in range(3):
+        _, project_id = make_project(owner, team_id)
+        assert client.put(f"{API}/projects/{project_id}/stages", json=PLAN, headers=owner).status_code == 200
+        project_ids.append(project_id)
+    make_team(owner, "Second team")
+    return owner, outsider, team_id, project_ids
+
+
+def assert_same(sync_client, async_client, path, headers, request_headers=None):
+    request_headers = {**headers, **(request_headers or {})}
+    sync_response = sync_client.get(path, headers=request_headers)
+    opened = len(async_client.opened_sessions)
+    async_response = async_client.get(path, headers=request_headers)
+    # Маршрут действительно асинхронный: запрос прошел через сессию aiosqlite
+    assert len(async_client.opened_sessions) > opened, path
+    assert async_response.status_code == sync_response.status_code, path
+    if sync_response.status_code != 304:
+        assert async_response.json() == sync_response.json(), path
+    for header in ("ETag", "X-Next-Cursor", "X-Total-Count"):
+        assert async_response.headers.get(header) == sync_response.headers.get(header), (path, header)
+    return sync_response
+
+
+def test_async_reads_match_sync(client, async_client, data):
+    owner, outsider, team_id, project_ids = data
+    paths = [
+        f"{API}/teams",
+        f"{API}/teams/{team_id}",
+        f"{API}/projects?team_id={team_id}",
+        f"{API}/projects/summary?team_id={team_id}",
+        *(f"{API}/projects/{project_id}" for project_id in project_ids),
+        f"{API}/teams/999999",
+        f"{API}/projects/999999",
+        f"{API}/projects?team_id=999999",
+    ]
+    for path in paths:
+        assert_same(client, async_client, path, owner)
+    for path in paths[1:5]:
+        assert_same(client, async_client, path, outsider)
+
+
+def test_async_pagination_matches_sync(client, async_client, data):
+    owner, _, team_id, _ = data
+    for path in (f"{API}/teams?limit=1", f"{API}/projects?team_id={team_id}&limit=2"):
+        response = assert_same(client, async_client, path, owner)
+        cursor = response.headers["X-Next-Cursor"]
+        assert_same(client, async_client, f"{path}&cursor={cursor}", owner)
+
+
+def test_async_project_conditional_get(client, async_client, data):
+    owner, _, _, project_ids = data
+    etag = assert_same(client, async_client, f"{API}/projects/{project_ids[0]}", owner).headers["ETag"]
+    response = assert_same(client, async_client, f"{API}/projects/{project_ids[0]}", owner, {"If-None-Match": etag})
+    assert response.status_code == 304
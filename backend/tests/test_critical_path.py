@@ -0,0 +1,131 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.services.critical_path_service import _dependency_edges, compute_critical_path, critical_chain
+
+from conftest import API
+
+
+def reference_cpm(ids, durations, dependencies, earliest_start, latest_finish=None):
+    """Прямой и обратный проход по узлам в топологическом порядке, без numpy"""
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    preds = [
+        sorted({index[dep] for dep in deps if dep in index and index[dep] != node})
+        for node, deps in enumerate(dependencies)
+    ]
+    succs = [[] for _ in ids]
+    for node, node_preds in enumerate(preds):
+        for pred in node_preds:
+            succs[pred].append(node)
+
+    indegree = [len(node_preds) for node_preds in preds]
+    order = [node for node in range(len(ids)) if indegree[node] == 0]
+    for node in order:
+        for succ in succs[node]:
+            indegree[succ] -= 1
+            if indegree[succ] == 0:
+                order.append(succ)
+
+    es = list(earliest_start)
+    for node in order:
+        for pred in preds[node]:
+            es[node] = max(es[node], es[pred] + durations[pred])
+    if latest_finish is None:
+        latest_finish = [max((start + duration for start, duration in zip(es, durations)), default=0)] * len(ids)
+    lf = list(latest_finish)
+    for node in reversed(order):
+        for succ in succs[node]:
+            lf[node] = min(lf[node], lf[succ] - durations[succ])
+    return es, lf
+
+
+def random_dag(rng: random.Random, n: int):
+    """Случайные id и JSON-зависимости: ребра только вперед по скрытому порядку, плюс мусор"""
+    ids = sorted(rng.sample(range(1, 10 * n + 1), n))
+    hidden = ids[:]
+    rng.shuffle(hidden)
+    density = rng.uniform(0.05, 0.5)
+    dependencies = {node_id: [] for node_id in ids}
+    for pos, node_id in enumerate(hidden):
+        dependencies[node_id] = [pred for pred in hidden[:pos] if rng.random() < density]
+        # Повторы, петли и неизвестные id должны отбрасываться
+        if dependencies[node_id] and rng.random() < 0.2:
+            dependencies[node_id].append(dependencies[node_id][0])
+        if rng.random() < 0.1:
+            dependencies[node_id] += [node_id, -node_id]
+    durations = [rng.randint(1, 9) for _ in ids]
+    return ids, durations, [dependencies[node_id] for node_id in ids]
+
+
+@pytest.mark.parametrize("seed", range(500))
+def test_matches_reference_on_random_dags(seed):
+    rng = random.Random(seed)
+    ids, durations, dependencies = random_dag(rng, rng.randint(1, 40))
+    earliest_start = [rng.choice([0, 0, rng.randint(0, 5)]) for _ in ids]
+    # Половина прогонов - с верхней границей, как у задач в окне этапа
+    latest_finish = None
+    if seed % 2:
+        horizon = sum(durations) + 10
+        latest_finish = [rng.randint(horizon - 5, horizon) for _ in ids]
+
+    src, dst = _dependency_edges(np.array(ids, dtype=np.int64), dependencies)
+    es, lf, level = compute_critical_path(
+        np.array(durations, dtype=np.int64),
+        src,
+        dst,
+        np.array(earliest_start, dtype=np.int64),
+        None if latest_finish is None else np.array(latest_finish, dtype=np.int64),
+    )
+
+    expected_es, expected_lf = reference_cpm(ids, durations, dependencies, earliest_start, latest_finish)
+    assert es.tolist() == expected_es
+    assert lf.tolist() == expected_lf
+    assert (level >= 0).all()
+
+
+def test_cycle_nodes_are_reported_and_ignored():
+    ids = np.array([1, 2, 3, 4], dtype=np.int64)
+    # 2 <-> 3 - цикл, 4 зависит от 1
+    src, dst = _dependency_edges(ids, [[], [3], [2], [1]])
+    es, lf, level = compute_critical_path(np.array([2, 1, 1, 3]), src, dst, np.zeros(4, dtype=np.int64))
+    assert level.tolist()[1:3] == [-1, -1]
+    assert es.tolist() == [0, 0, 0, 2]
+
+
+def test_critical_chain_follows_tight_edges():
+    # 0 -> 1 -> 3 и 0 -> 2 -> 3; через 2 короче, поэтому цепочка идет через 1
+    ids = np.arange(1, 5, dtype=np.int64)
+    durations = np.array([2, 3, 1, 2], dtype=np.int64)
+    src, dst = _dependency_edges(ids, [[], [1], [1], [2, 3]])
+    es, lf, level = compute_critical_path(durations, src, dst, np.zeros(4, dtype=np.int64))
+    assert critical_chain(durations, es, lf, src, dst, level, np.arange(4)) == [0, 1, 3]
+
+
+def test_critical_chain_is_a_path_in_plan_order(client, make_user, make_project):
+    headers = make_user()
+    _, project_id = make_project(headers)
+    # Два независимых критических пути одинаковой длины: в цепочку попадает один, первый по плану
+    plan = [
+        {"name": "A", "duration": 3},
+        {"name": "X", "duration": 2},
+        {"name": "B", "duration": 2, "dependencies": [0]},
+        {"name": "Y", "duration": 3, "dependencies": [1]},
+    ]
+    stages = client.put(f"{API}/projects/{project_id}/stages", json=plan, headers=headers).json()
+    # Порядок плана не совпадает с порядком id
+    reordered = [
+        {**plan[1], "id": stages[1]["id"]},
+        {**plan[0], "id": stages[0]["id"]},
+        {**plan[3], "id": stages[3]["id"], "dependencies": [0]},
+        {**plan[2], "id": stages[2]["id"], "dependencies": [1]},
+    ]
+    stages = client.put(f"{API}/projects/{project_id}/stages?diff=true", json=reordered, headers=headers).json()
+
+    response = client.get(f"{API}/projects/{project_id}/critical-path", headers=headers)
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert [stage["id"] for stage in result["stages"]] == [stage["id"] for stage in stages]
+    assert all(stage["is_critical"] for stage in result["stages"])
+    assert result["critical_chain"] == [stages[0]["id"], stages[2]["id"]]
@@ -0,0 +1,91 @@
+import logging
+
+import pytest
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.base import Base
+from app.db.engine import configure_engine
+from app.db.session import engine, get_db
+from app.main import create_application
+from app.models.student import Student
+from conftest import API
+
+THRESHOLD = 3
+
+
+@pytest.fixture(scope="module")
+def debug_client():
+    settings = get_settings().model_copy(update={"debug_queries": True, "n_plus_one_threshold": THRESHOLD})
+    app = create_application(settings)
+
+    @app.get("/repeat/{times}")
+    def repeat(times: int, db: Session = Depends(get_db)):
+        # Один и тот же SQL в цикле - как ленивая загрузка связи для каждой строки
+        for student_id in range(times):
+            db.execute(select(Student.id).where(Student.id == student_id)).first()
+        return {}
+
+    with TestClient(app) as client:
+        yield client
+
+
+def test_headers_report_request_queries(debug_client, make_user, make_project):
+    headers = make_user()
+    _, project_id = make_project(headers)
+
+    statements = []
+
+    def listener(conn, cursor, statement, *_):
+        statements.append(statement)
+
+    event.listen(engine, "after_cursor_execute", listener)
+    try:
+        response = debug_client.get(f"{API}/projects/{project_id}", headers=headers)
+    finally:
+        event.remove(engine, "after_cursor_execute", listener)
+
+    assert response.status_code == 200
+    assert int(response.headers["X-Query-Count"]) == len(statements) > 0
+    assert float(response.headers["X-DB-Time"]) >= 0
+    assert response.headers["X-N-Plus-One"] == "0"
+
+
+def test_repeated_statement_flagged_as_n_plus_one(debug_client, caplog):
+    with caplog.at_level(logging.WARNING, logger="app.core.middleware"):
+        below = debug_client.get(f"/repeat/{THRESHOLD - 1}")
+        assert below.headers["X-N-Plus-One"] == "0"
+        assert not caplog.records
+
+        above = debug_client.get(f"/repeat/{THRESHOLD}")
+    assert int(above.headers["X-Query-Count"]) == THRESHOLD
+    assert above.headers["X-N-Plus-One"] == "1"
+    assert f"Possible N+1 in GET /repeat/{{times}}: statement ran {THRESHOLD} times" in caplog.text
+
+
+def test_slow_query_logged_with_plan(monkeypatch, caplog):
+    # Отдельный engine: порог медленных запросов читается при настройке engine
+    monkeypatch.setattr("app.db.engine.query_metrics", {})
+    settings = get_settings().model_copy(update={"slow_query_ms": 1e-6})
+    memory = create_engine("sqlite://")
+    Base.metadata.create_all(memory)
+    configure_engine(memory, settings, "slow-test")
+
+    with caplog.at_level(logging.WARNING, logger="app.db.engine"), memory.begin() as conn:
+        conn.execute(
+            insert(Student),
+            [{"email": f"s{i}@example.com", "full_name": "S", "hashed_password": "x"} for i in range(3)],
+        )
+        assert not caplog.records  # executemany без плана и без записи в лог
+        conn.execute(select(Student.id).where(Student.email == "s1@example.com")).all()
+        conn.execute(text("CREATE TABLE scratch (id INTEGER)"))
+
+    select_log, ddl_log = [record.getMessage() for record in caplog.records]
+    assert select_log.startswith("Slow query")
+    assert "parameters: ('s1@example.com'," in select_log
+    # EXPLAIN QUERY PLAN выполнен с теми же параметрами и показывает поиск по индексу email
+    assert "plan:\nSEARCH students USING" in select_log
+    assert ddl_log.endswith("plan:\n<not available>")
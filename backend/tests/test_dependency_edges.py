@@ -0,0 +1,138 @@
+from sqlalchemy import create_engine, func, select
+
+from app.db.base import Base
+from app.db.migrations import _backfill_dependency_edges
+from app.db.session import engine
+from app.models.project import Stage, Task, stage_dependencies, task_dependencies
+
+from conftest import API
+
+PLAN = [
+    {"name": "Design", "duration": 2, "tasks": [{"name": "Sketch"}, {"name": "Review", "dependencies": [0]}]},
+    {"name": "Build", "duration": 3, "dependencies": [0], "tasks": [{"name": "Code", "dependencies": [-1]}]},
+]
+
+
+def orphan_edges() -> int:
+    with engine.connect() as conn:
+        stages = select(Stage.id)
+        tasks = select(Task.id)
+        return conn.scalar(
+            select(func.count()).select_from(stage_dependencies).where(
+                stage_dependencies.c.stage_id.not_in(stages) | stage_dependencies.c.depends_on_id.not_in(stages)
+            )
+        ) + conn.scalar(
+            select(func.count()).select_from(task_dependencies).where(
+                task_dependencies.c.task_id.not_in(tasks) | task_dependencies.c.depends_on_id.not_in(tasks)
+            )
+        )
+
+
+def test_plan_saves_again_after_team_deleted(client, make_user, make_project):
+    headers = make_user()
+    team_id, project_id = make_project(headers)
+    assert client.put(f"{API}/projects/{project_id}/stages", json=PLAN, headers=headers).status_code == 200
+
+    assert client.delete(f"{API}/teams/{team_id}", headers=headers).status_code == 204
+    assert orphan_edges() == 0
+
+    # SQLite переиспользует ID удаленных строк: старые связи столкнулись бы с новыми
+    _, project_id = make_project(headers)
+    response = client.put(f"{API}/projects/{project_id}/stages", json=PLAN, headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def test_last_member_leaving_removes_edges(client, make_user, make_project):
+    headers = make_user()
+    team_id, project_id = make_project(headers)
+    assert client.put(f"{API}/projects/{project_id}/stages", json=PLAN, headers=headers).status_code == 200
+
+    assert client.post(f"{API}/teams/{team_id}/leave", headers=headers).status_code == 200
+    assert client.get(f"{API}/teams/{team_id}", headers=headers).status_code in (403, 404)
+    assert orphan_edges() == 0
+
+
+def test_patch_with_null_dependencies_clears_edges(client, make_user, make_project):
+    headers = make_user()
+    _, project_id = make_project(headers)
+    stages = client.put(f"{API}/projects/{project_id}/stages", json=PLAN, headers=headers).json()
+    build, review = stages[1], stages[0]["tasks"][1]
+
+    clear = {"dependencies": None}
+    response = client.patch(f"{API}/projects/{project_id}/stages/{build['id']}", json=clear, headers=headers)
+    assert response.status_code == 200, response.text
+    response = client.patch(f"{API}/projects/{project_id}/tasks/{review['id']}", json=clear, headers=headers)
+    assert response.status_code == 200, response.text
+
+    with engine.connect() as conn:
+        assert conn.scalar(
+            select(func.count()).select_from(stage_dependencies).where(stage_dependencies.c.stage_id == build["id"])
+        ) == 0
+        assert conn.scalar(
+            select(func.count()).select_from(task_dependencies).where(task_dependencies.c.task_id == review["id"])
+        ) == 0
+    stages = client.get(f"{API}/projects/{project_id}", headers=headers).json()["stages"]
+    assert stages[1]["dependencies"] == [] and stages[0]["tasks"][1]["dependencies"] == []
+
+
+def align_next_ids(project_id: int) -> int:
+    """Заглушки с одинаковым ID в отдельном проекте: следующие этап и задача получат один и тот же ID"""
+    with engine.begin() as conn:
+        base = max(conn.scalar(select(func.max(Stage.id))) or 0, conn.scalar(select(func.max(Task.id))) or 0) + 1
+        conn.execute(Stage.__table__.insert().values(id=base, name="Filler", project_id=project_id, position=0))
+        conn.execute(Task.__table__.insert().values(id=base, name="Filler", stage_id=base, position=0))
+    return base + 1
+
+
+def test_task_delete_keeps_stage_dependency_with_same_id(client, make_user, make_project):
+    headers = make_user()
+    team_id, filler_project_id = make_project(headers)
+    _, project_id = make_project(headers, team_id)
+    shared_id = align_next_ids(filler_project_id)
+
+    plan = [
+        {"name": "Design", "tasks": [{"name": "Sketch"}]},
+        # Первая задача зависит от этапа Design, вторая - от задачи Sketch: в JSON обе ссылки - shared_id
+        {"name": "Build", "tasks": [{"name": "Code", "dependencies": [-1]}, {"name": "Test", "dependencies": [0]}]},
+    ]
+    stages = client.put(f"{API}/projects/{project_id}/stages", json=plan, headers=headers).json()
+    design, sketch = stages[0], stages[0]["tasks"][0]
+    code, test = stages[1]["tasks"]
+    assert design["id"] == sketch["id"] == shared_id
+    assert code["dependencies"] == test["dependencies"] == [shared_id]
+
+    with engine.connect() as conn:
+        edges = conn.execute(select(task_dependencies.c.task_id, task_dependencies.c.depends_on_id)).all()
+    assert (code["id"], shared_id) not in edges
+    assert (test["id"], shared_id) in edges
+
+    assert client.delete(f"{API}/projects/{project_id}/tasks/{sketch['id']}", headers=headers).status_code == 204
+    tasks = client.get(f"{API}/projects/{project_id}", headers=headers).json()["stages"][1]["tasks"]
+    assert tasks[0]["dependencies"] == [shared_id]
+    assert tasks[1]["dependencies"] == []
+    assert orphan_edges() == 0
+
+
+def test_backfill_skips_ids_shared_by_stage_and_task():
+    memory = create_engine("sqlite://")
+    Base.metadata.create_all(memory)
+    with memory.begin() as conn:
+        conn.execute(
+            Stage.__table__.insert(),
+            [
+                {"id": 1, "name": "Design", "project_id": 1, "position": 0, "dependencies": []},
+                {"id": 2, "name": "Build", "project_id": 1, "position": 1, "dependencies": [1]},
+            ],
+        )
+        conn.execute(
+            Task.__table__.insert(),
+            [
+                {"id": 1, "name": "Sketch", "stage_id": 1, "position": 0, "dependencies": []},
+                {"id": 3, "name": "Draft", "stage_id": 1, "position": 1, "dependencies": []},
+                # 1 - и этап Design, и задача Sketch: вид зависимости не восстановить
+                {"id": 4, "name": "Code", "stage_id": 2, "position": 0, "dependencies": [1, 3]},
+            ],
+        )
+        _backfill_dependency_edges(conn)
+        assert conn.execute(select(task_dependencies.c.task_id, task_dependencies.c.depends_on_id)).all() == [(4, 3)]
+        assert conn.execute(select(stage_dependencies.c.stage_id, stage_dependencies.c.depends_on_id)).all() == [(2, 1)]
@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.core.etag import etag_matches, project_etag
+from app.main import create_application
+from conftest import API
+
+GZIP = {"Accept-Encoding": "gzip"}
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+@pytest.fixture(scope="module")
+def gzip_client():
+    settings = get_settings().model_copy(update={"gzip_enabled": True, "gzip_minimum_size": 1})
+    with TestClient(create_application(settings)) as client:
+        yield client
+
+
+def test_etag_matches_encoded_forms():
+    etag = project_etag(1, 3)
+    assert etag_matches('"project-1-v3-gzip"', etag)
+    assert etag_matches('W/"project-1-v3-br"', etag, weak=True)
+    assert not etag_matches('"project-1-v2-gzip"', etag)
+
+
+def test_compressed_body_gets_own_strong_etag(gzip_client, make_user, make_project):
+    headers = make_user()
+    _, project_id = make_project(headers)
+
+    plain = gzip_client.get(f"{API}/projects/{project_id}", headers={**headers, **IDENTITY})
+    packed = gzip_client.get(f"{API}/projects/{project_id}", headers={**headers, **GZIP})
+    assert "content-encoding" not in plain.headers
+    assert packed.headers["content-encoding"] == "gzip"
+    assert plain.headers["etag"] == project_etag(project_id, 1)
+    assert packed.headers["etag"] == project_etag(project_id, 1)[:-1] + '-gzip"'
+    assert plain.json() == packed.json()
+
+
+def test_encoded_etag_revalidates_and_saves(gzip_client, make_user, make_project):
+    headers = make_user()
+    _, project_id = make_project(headers)
+    etag = gzip_client.get(f"{API}/projects/{project_id}", headers={**headers, **GZIP}).headers["etag"]
+
+    # 304 повторяет ту форму тега, что лежит в кэше клиента
+    cached = gzip_client.get(
+        f"{API}/projects/{project_id}", headers={**headers, **GZIP, "If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+    # If-Match с тегом сжатого представления - та же версия проекта
+    plan = [{"name": "Stage", "duration": 2, "tasks": []}]
+    saved = gzip_client.put(
+        f"{API}/projects/{project_id}/stages", json=plan, headers={**headers, **IDENTITY, "If-Match": etag}
+    )
+    assert saved.status_code == 200, saved.text
+    stale = gzip_client.put(
+        f"{API}/projects/{project_id}/stages", json=plan, headers={**headers, **IDENTITY, "If-Match": etag}
+    )
+    assert stale.status_code == 412
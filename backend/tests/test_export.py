@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from app.core.config import get_settings
+from conftest import API
+
+PLAN = [
+    {"name": "Design", "tasks": [{"name": "Sketch"}, {"name": "Review", "dependencies": [0]}]},
+    {"name": "Approval", "dependencies": [0]},
+    {"name": "Build", "dependencies": [1], "tasks": [{"name": "Code", "dependencies": [-2]}]},
+]
+
+
+def export(client, headers, path):
+    response = client.get(f"{API}/{path}/export", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.text.endswith("\n")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Записи переходят через границы чанков потокового тела
+    monkeypatch.setattr(get_settings(), "export_chunk_bytes", 64)
+
+
+def save_plan(client, headers, project_id, plan=PLAN):
+    response = client.put(f"{API}/projects/{project_id}/stages", json=plan, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_project_records_in_display_order(client, make_user, make_project):
+    headers = make_user()
+    _, project_id = make_project(headers)
+    design, approval, build = save_plan(client, headers, project_id)
+    sketch, review = design["tasks"]
+    code = build["tasks"][0]
+
+    # Переставляем этапы и задачи: порядок выгрузки - по position, а не по id
+    reordered = [
+        {
+            "id": build["id"],
+            "name": "Build",
+            "dependencies": [1],
+            "tasks": [{"id": code["id"], "name": "Code", "dependencies": [-3]}],
+        },
+        {"id": approval["id"], "name": "Approval", "dependencies": [2]},
+        {
+            "id": design["id"],
+            "name": "Design",
+            "tasks": [
+                {"id": review["id"], "name": "Review", "dependencies": [20001]},
+                {"id": sketch["id"], "name": "Sketch"},
+            ],
+        },
+    ]
+    response = client.put(
+        f"{API}/projects/{project_id}/stages", params={"diff": "true"}, json=reordered, headers=headers
+    )
+    assert response.status_code == 200, response.text
+
+    records = export(client, headers, f"projects/{project_id}")
+    assert [(record["type"], record["name"]) for record in records] == [
+        ("project", "Project"),
+        ("stage", "Build"),
+        ("task", "Code"),
+        # Этап без задач тоже выгружается
+        ("stage", "Approval"),
+        ("stage", "Design"),
+        ("task", "Review"),
+        ("task", "Sketch"),
+    ]
+
+    project, build_record, code_record, approval_record, design_record, review_record, sketch_record = records
+    assert project["id"] == project_id and project["version"] == 3
+    assert all(record["project_id"] == project_id for record in (build_record, approval_record, design_record))
+    assert [build_record["position"], approval_record["position"], design_record["position"]] == [0, 1, 2]
+    assert code_record["id"] == code["id"] and code_record["stage_id"] == build["id"]
+    assert code_record["dependencies"] == [design["id"]]
+    assert approval_record["dependencies"] == [design["id"]]
+    assert review_record["stage_id"] == sketch_record["stage_id"] == design["id"]
+    assert review_record["dependencies"] == [sketch["id"]]
+    assert (review_record["position"], sketch_record["position"]) == (0, 1)
+
+
+def test_empty_project_exports_only_project_record(client, make_user, make_project):
+    headers = make_user()
+    _, project_id = make_project(headers)
+    assert [record["type"] for record in export(client, headers, f"projects/{project_id}")] == ["project"]
+
+
+def test_team_export_concatenates_projects(client, make_user, make_team, make_project):
+    headers = make_user()
+    team_id = make_team(headers)
+    _, first = make_project(headers, team_id)
+    _, second = make_project(headers, team_id)
+    save_plan(client, headers, first)
+    save_plan(client, headers, second, [{"name": "Only"}])
+    # Проект другой команды в выгрузку не попадает
+    _, foreign = make_project(headers)
+    save_plan(client, headers, foreign)
+
+    records = export(client, headers, f"teams/{team_id}")
+    assert [(record["type"], record["name"]) for record in records] == [
+        ("project", "Project"),
+        ("stage", "Design"),
+        ("task", "Sketch"),
+        ("task", "Review"),
+        ("stage", "Approval"),
+        ("stage", "Build"),
+        ("task", "Code"),
+        ("project", "Project"),
+        ("stage", "Only"),
+    ]
+    projects = [record for record in records if record["type"] == "project"]
+    assert [project["id"] for project in projects] == [first, second]
+    assert all(project["team_id"] == team_id for project in projects)
+    assert records[-1]["project_id"] == second
+
+
+def test_export_requires_membership(client, make_user, make_project):
+    _, project_id = make_project(make_user())
+    outsider = make_user()
+    assert client.get(f"{API}/projects/{project_id}/export", headers=outsider).status_code == 403
@@ -0,0 +1,154 @@
+import json
+import math
+
+import pytest
+from sqlalchemy import event
+
+from app.db.session import engine
+from app.services import import_service
+from conftest import API
+
+
+def ndjson(*records) -> str:
+    return "".join((record if isinstance(record, str) else json.dumps(record)) + "\n" for record in records)
+
+
+@pytest.fixture
+def project(client, make_user, make_project):
+    """Проект с уже сохраненным планом из одного этапа"""
+    headers = make_user()
+    _, project_id = make_project(headers)
+    plan = [{"name": "Existing", "tasks": [{"name": "Kept"}]}]
+    assert client.put(f"{API}/projects/{project_id}/stages", json=plan, headers=headers).status_code == 200
+    return headers, project_id
+
+
+def import_plan(client, headers, project_id, body, **params):
+    return client.post(f"{API}/projects/{project_id}/import", params=params, content=body, headers=headers)
+
+
+def assert_plan_untouched(client, headers, project_id, etag):
+    response = client.get(f"{API}/projects/{project_id}", headers=headers)
+    assert response.headers["ETag"] == etag
+    assert [stage["name"] for stage in response.json()["stages"]] == ["Existing"]
+
+
+def current_etag(client, headers, project_id):
+    return client.get(f"{API}/projects/{project_id}", headers=headers).headers["ETag"]
+
+
+def test_valid_plan_resolves_dependencies(client, project):
+    headers, project_id = project
+    body = ndjson(
+        {"type": "stage", "name": "A"},
+        {"type": "task", "name": "a1"},
+        {"type": "stage", "name": "B", "dependencies": [0]},
+        {"type": "task", "name": "b1", "dependencies": [0, -1]},
+    )
+    response = import_plan(client, headers, project_id, body)
+    assert response.status_code == 200, response.text
+    assert response.json()["stages"] == 2 and response.json()["error_count"] == 0
+
+    a, b = client.get(f"{API}/projects/{project_id}", headers=headers).json()["stages"]
+    assert b["dependencies"] == [a["id"]]
+    assert b["tasks"][0]["dependencies"] == [a["tasks"][0]["id"], a["id"]]
+
+
+@pytest.mark.parametrize("partial", [False, True])
+def test_empty_upload_is_rejected(client, project, partial):
+    headers, project_id = project
+    etag = current_etag(client, headers, project_id)
+    response = import_plan(client, headers, project_id, "", partial=partial)
+    assert response.status_code == 422, response.text
+    assert_plan_untouched(client, headers, project_id, etag)
+
+
+@pytest.mark.parametrize("partial", [False, True])
+def test_all_invalid_upload_is_rejected(client, project, partial):
+    headers, project_id = project
+    etag = current_etag(client, headers, project_id)
+    body = ndjson({"type": "stage", "duration": 1}, {"type": "task", "name": "orphan"})
+    response = import_plan(client, headers, project_id, body, partial=partial)
+    assert response.status_code == 422, response.text
+    assert response.json()["detail"]["error_count"] == 2
+    assert_plan_untouched(client, headers, project_id, etag)
+
+
+def test_invalid_row_rejects_plan_by_default(client, project):
+    headers, project_id = project
+    etag = current_etag(client, headers, project_id)
+    body = ndjson({"type": "stage", "name": "A"}, {"type": "task", "name": "t", "duration": "long"})
+    response = import_plan(client, headers, project_id, body)
+    assert response.status_code == 422, response.text
+    assert response.json()["detail"]["errors"][0]["line"] == 2
+    assert_plan_untouched(client, headers, project_id, etag)
+
+
+@pytest.mark.parametrize("bad_line", ["{not json", json.dumps({"name": "no type"}), json.dumps({"type": "milestone"})])
+def test_unidentifiable_line_rejects_plan_even_when_partial(client, project, bad_line):
+    headers, project_id = project
+    etag = current_etag(client, headers, project_id)
+    # Без отказа задачи ниже плохой строки достались бы этапу A, а ссылка -2 стала бы ссылкой этапа на себя
+    body = ndjson(
+        {"type": "stage", "name": "A"},
+        bad_line,
+        {"type": "task", "name": "b1"},
+        {"type": "stage", "name": "C", "dependencies": [1]},
+    )
+    response = import_plan(client, headers, project_id, body, partial=True)
+    assert response.status_code == 422, response.text
+    assert response.json()["detail"]["errors"][-1]["line"] == 2
+    assert_plan_untouched(client, headers, project_id, etag)
+
+
+def test_partial_skips_rejected_stage_with_its_tasks(client, project):
+    headers, project_id = project
+    body = ndjson(
+        {"type": "stage", "name": "A"},
+        {"type": "stage", "duration": "x"},
+        {"type": "task", "name": "b1"},
+        {"type": "stage", "name": "C", "dependencies": [0, 1]},
+    )
+    response = import_plan(client, headers, project_id, body, partial=True)
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["stages"], result["tasks"], result["error_count"]) == (2, 0, 2)
+
+    a, c = client.get(f"{API}/projects/{project_id}", headers=headers).json()["stages"]
+    assert c["dependencies"] == [a["id"]]
+
+
+def test_batched_insert_maps_ids_across_batches(client, project, monkeypatch):
+    headers, project_id = project
+    monkeypatch.setattr(import_service._settings, "import_batch_size", 64)
+    records = []
+    for stage_index in range(10):
+        stage_deps = [stage_index - 1] if stage_index else []
+        records.append({"type": "stage", "name": f"S{stage_index}", "dependencies": stage_deps})
+        for task_index in range(100):
+            # Ссылка на задачу предыдущего этапа - она записана в другом пакете
+            deps = [(stage_index - 1) * 10000 + task_index] if stage_index else [-1]
+            records.append({"type": "task", "name": f"T{stage_index}.{task_index}", "dependencies": deps})
+
+    inserts = []
+
+    def count_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO TASKS"):
+            inserts.append(executemany)
+
+    event.listen(engine, "before_cursor_execute", count_inserts)
+    try:
+        response = import_plan(client, headers, project_id, ndjson(*records))
+    finally:
+        event.remove(engine, "before_cursor_execute", count_inserts)
+    assert response.status_code == 200, response.text
+    # Один executemany на пакет, а не INSERT на каждую задачу
+    assert len(inserts) == math.ceil(len(records) / 64)
+
+    stages = client.get(f"{API}/projects/{project_id}", headers=headers).json()["stages"]
+    assert [stage["name"] for stage in stages] == [f"S{index}" for index in range(10)]
+    for previous, stage in zip(stages, stages[1:]):
+        assert stage["dependencies"] == [previous["id"]]
+        assert [task["name"] for task in stage["tasks"]] == [f"T{stages.index(stage)}.{i}" for i in range(100)]
+        assert [task["dependencies"] for task in stage["tasks"]] == [[task["id"]] for task in previous["tasks"]]
+    assert all(task["dependencies"] == [stages[0]["id"]] for task in stages[0]["tasks"])
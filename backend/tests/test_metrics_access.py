@@ -0,0 +1,37 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import get_settings
+from app.main import app
+
+
+def get_from(host: str, path: str, headers=None) -> httpx.Response:
+    async def fetch():
+        transport = httpx.ASGITransport(app=app, client=(host, 40000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+            return await client.get(path, headers=headers)
+
+    return asyncio.run(fetch())
+
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    monkeypatch.setattr(get_settings(), "metrics_token", "scrape-secret")
+    return "scrape-secret"
+
+
+@pytest.mark.parametrize("path", ["/metrics", "/metrics/pool"])
+def test_without_token_only_localhost(path):
+    assert get_from("203.0.113.7", path).status_code == 403
+    assert get_from("127.0.0.1", path).status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/metrics", "/metrics/pool"])
+def test_token_required_when_configured(path, metrics_token):
+    # С токеном localhost тоже должен его предъявить
+    assert get_from("127.0.0.1", path).status_code == 401
+    assert get_from("203.0.113.7", path, {"Authorization": "Bearer wrong"}).status_code == 401
+    response = get_from("203.0.113.7", path, {"Authorization": f"Bearer {metrics_token}"})
+    assert response.status_code == 200
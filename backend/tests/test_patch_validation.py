@@ -0,0 +1,40 @@
+import pytest
+
+from conftest import API
+
+PLAN = [{"name": "Stage", "duration": 2, "tasks": [{"name": "Task", "duration": 1}]}]
+
+
+@pytest.fixture
+def plan(client, make_user, make_project):
+    headers = make_user()
+    _, project_id = make_project(headers)
+    stages = client.put(f"{API}/projects/{project_id}/stages", json=PLAN, headers=headers).json()
+    return headers, project_id, stages[0]["id"], stages[0]["tasks"][0]["id"]
+
+
+def patch_urls(project_id, stage_id, task_id):
+    return [f"{API}/projects/{project_id}/stages/{stage_id}", f"{API}/projects/{project_id}/tasks/{task_id}"]
+
+
+@pytest.mark.parametrize("body", [{"duration": None}, {"name": None}, {"is_completed": None}])
+def test_null_for_not_null_field_is_rejected(client, plan, body):
+    headers, *ids = plan
+    for url in patch_urls(*ids):
+        response = client.patch(url, json=body, headers=headers)
+        assert response.status_code == 422, response.text
+
+
+@pytest.mark.parametrize("duration", [0, -3])
+def test_non_positive_duration_is_rejected(client, plan, duration):
+    headers, *ids = plan
+    for url in patch_urls(*ids):
+        response = client.patch(url, json={"duration": duration}, headers=headers)
+        assert response.status_code == 422, response.text
+
+
+def test_nullable_fields_still_accept_null(client, plan):
+    headers, *ids = plan
+    for url in patch_urls(*ids):
+        response = client.patch(url, json={"feedback": None, "responsibles": None, "duration": 4}, headers=headers)
+        assert response.status_code == 200, response.text
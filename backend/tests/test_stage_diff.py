@@ -0,0 +1,183 @@
+import pytest
+from sqlalchemy import select
+
+from app.db.session import engine
+from app.models.project import stage_dependencies, task_dependencies
+from conftest import API
+
+PLAN = [
+    {"name": "Design", "tasks": [{"name": "Sketch"}, {"name": "Review", "dependencies": [0]}]},
+    {
+        "name": "Build",
+        "dependencies": [0],
+        "tasks": [{"name": "Code", "dependencies": [-1]}, {"name": "Test", "dependencies": [1]}],
+    },
+    {"name": "Ship", "dependencies": [1], "tasks": [{"name": "Release", "dependencies": [10001]}]},
+]
+
+
+def stage_edges():
+    with engine.connect() as conn:
+        return set(conn.execute(select(stage_dependencies.c.stage_id, stage_dependencies.c.depends_on_id)).all())
+
+
+def task_edges():
+    with engine.connect() as conn:
+        return set(conn.execute(select(task_dependencies.c.task_id, task_dependencies.c.depends_on_id)).all())
+
+
+def save_diff(client, headers, project_id, stages, **extra_headers):
+    return client.put(
+        f"{API}/projects/{project_id}/stages",
+        params={"diff": "true"},
+        json=stages,
+        headers={**headers, **extra_headers},
+    )
+
+
+def load(client, headers, project_id):
+    return client.get(f"{API}/projects/{project_id}", headers=headers).json()["stages"]
+
+
+@pytest.fixture
+def saved(client, make_user, make_project):
+    """Проект с планом PLAN и словарь name -> id для этапов и задач"""
+    headers = make_user()
+    _, project_id = make_project(headers)
+    stages = client.put(f"{API}/projects/{project_id}/stages", json=PLAN, headers=headers).json()
+    ids = {stage["name"]: stage["id"] for stage in stages}
+    ids.update((task["name"], task["id"]) for stage in stages for task in stage["tasks"])
+    return headers, project_id, ids
+
+
+def test_unchanged_rows_keep_ids(client, saved):
+    headers, project_id, ids = saved
+    before = load(client, headers, project_id)
+    payload = [
+        {
+            "id": ids["Design"],
+            "name": "Design",
+            "tasks": [
+                {"id": ids["Sketch"], "name": "Sketch"},
+                {"id": ids["Review"], "name": "Review", "dependencies": [0]},
+            ],
+        },
+        {
+            "id": ids["Build"],
+            "name": "Build (renamed)",
+            "dependencies": [0],
+            "tasks": [
+                {"id": ids["Code"], "name": "Code", "dependencies": [-1]},
+                {"id": ids["Test"], "name": "Test", "dependencies": [1]},
+            ],
+        },
+        {
+            "id": ids["Ship"],
+            "name": "Ship",
+            "dependencies": [1],
+            "tasks": [{"id": ids["Release"], "name": "Release", "dependencies": [10001]}, {"name": "Announce"}],
+        },
+    ]
+    response = save_diff(client, headers, project_id, payload)
+    assert response.status_code == 200, response.text
+
+    after = load(client, headers, project_id)
+    assert [stage["id"] for stage in after] == [stage["id"] for stage in before]
+    assert [task["id"] for task in after[0]["tasks"]] == [ids["Sketch"], ids["Review"]]
+    assert after[1]["name"] == "Build (renamed)"
+    assert [stage["dependencies"] for stage in after] == [stage["dependencies"] for stage in before]
+    release, announce = after[2]["tasks"]
+    assert release["id"] == ids["Release"] and release["dependencies"] == [ids["Test"]]
+    assert announce["id"] not in ids.values()
+
+
+def test_moved_task_keeps_id(client, saved):
+    headers, project_id, ids = saved
+    payload = [
+        {"id": ids["Design"], "name": "Design", "tasks": [{"id": ids["Sketch"], "name": "Sketch"}]},
+        {
+            "id": ids["Build"],
+            "name": "Build",
+            "dependencies": [0],
+            "tasks": [
+                {"id": ids["Code"], "name": "Code", "dependencies": [-1]},
+                {"id": ids["Test"], "name": "Test", "dependencies": [1]},
+                # Review переезжает из Design в Build и по-прежнему зависит от Sketch
+                {"id": ids["Review"], "name": "Review", "dependencies": [0]},
+            ],
+        },
+        {
+            "id": ids["Ship"],
+            "name": "Ship",
+            "dependencies": [1],
+            "tasks": [{"id": ids["Release"], "name": "Release", "dependencies": [10001]}],
+        },
+    ]
+    response = save_diff(client, headers, project_id, payload)
+    assert response.status_code == 200, response.text
+
+    design, build, _ = load(client, headers, project_id)
+    assert [task["id"] for task in design["tasks"]] == [ids["Sketch"]]
+    review = build["tasks"][2]
+    assert review["id"] == ids["Review"]
+    assert review["stage_id"] == ids["Build"]
+    assert review["dependencies"] == [ids["Sketch"]]
+    assert (ids["Review"], ids["Sketch"]) in task_edges()
+
+
+def test_removed_rows_and_their_edges_deleted(client, saved):
+    headers, project_id, ids = saved
+    assert (ids["Ship"], ids["Build"]) in stage_edges()
+    assert (ids["Release"], ids["Test"]) in task_edges()
+
+    # Ship удаляется целиком, Test - из Build
+    payload = [
+        {
+            "id": ids["Design"],
+            "name": "Design",
+            "tasks": [
+                {"id": ids["Sketch"], "name": "Sketch"},
+                {"id": ids["Review"], "name": "Review", "dependencies": [0]},
+            ],
+        },
+        {
+            "id": ids["Build"],
+            "name": "Build",
+            "dependencies": [0],
+            "tasks": [{"id": ids["Code"], "name": "Code", "dependencies": [-1]}],
+        },
+    ]
+    response = save_diff(client, headers, project_id, payload)
+    assert response.status_code == 200, response.text
+
+    stages = load(client, headers, project_id)
+    assert [stage["id"] for stage in stages] == [ids["Design"], ids["Build"]]
+    assert [task["id"] for task in stages[1]["tasks"]] == [ids["Code"]]
+
+    assert not any(ids["Ship"] in edge for edge in stage_edges())
+    assert not any({ids["Test"], ids["Release"]} & set(edge) for edge in task_edges())
+    assert (ids["Review"], ids["Sketch"]) in task_edges()
+    assert (ids["Build"], ids["Design"]) in stage_edges()
+
+
+def test_stale_if_match_rejected_without_changes(client, saved):
+    headers, project_id, ids = saved
+    response = client.get(f"{API}/projects/{project_id}", headers=headers)
+    etag, before = response.headers["ETag"], response.json()["stages"]
+
+    # Кто-то сохранил план после того, как клиент получил ETag
+    response = client.patch(
+        f"{API}/projects/{project_id}/stages/{ids['Design']}", json={"name": "Design v2"}, headers=headers
+    )
+    assert response.status_code == 200
+    current = load(client, headers, project_id)
+    edges = stage_edges(), task_edges()
+
+    payload = [{"id": ids["Design"], "name": "Design", "tasks": []}]
+    response = save_diff(client, headers, project_id, payload, **{"If-Match": etag})
+    # Без If-Match тот же запрос удалил бы Build и Ship
+    assert response.status_code == 412
+
+    assert load(client, headers, project_id) == current
+    assert (stage_edges(), task_edges()) == edges
+    assert [stage["id"] for stage in current] == [stage["id"] for stage in before]
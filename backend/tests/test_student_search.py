@@ -0,0 +1,57 @@
+import uuid
+
+import pytest
+
+from app.services import student_service
+from app.services.student_service import StudentService
+from conftest import API
+
+
+def register(client, full_name: str) -> None:
+    email = f"user-{uuid.uuid4().hex[:12]}@example.com"
+    response = client.post(
+        f"{API}/auth/register", json={"email": email, "password": "password", "full_name": full_name}
+    )
+    assert response.status_code == 201, response.text
+
+
+@pytest.fixture(params=["fts", "ilike"])
+def search_backend(request, monkeypatch):
+    if request.param == "ilike":
+        # Путь Postgres / SQLite без FTS5
+        monkeypatch.setattr(StudentService, "_search_index_available", False)
+    StudentService.search_cache.clear()
+    yield request.param
+    StudentService.search_cache.clear()
+
+
+def test_exact_match_ranked_first(client, make_user, search_backend):
+    headers = make_user()
+    needle = "qz" + uuid.uuid4().hex[:6]
+    # Точное совпадение регистрируется последним: по id оно оказалось бы в конце
+    register(client, f"Ivan {needle}")
+    register(client, f"{needle}ova")
+    register(client, f"xx{needle}xx")
+    register(client, needle.capitalize())
+
+    response = client.get(f"{API}/teams/search-users", params={"q": needle.upper()}, headers=headers)
+    assert response.status_code == 200
+    assert [student["full_name"] for student in response.json()] == [
+        needle.capitalize(),
+        f"{needle}ova",
+        f"Ivan {needle}",
+        f"xx{needle}xx",
+    ]
+
+
+def test_exact_match_survives_candidate_limit(client, make_user, search_backend, monkeypatch):
+    headers = make_user()
+    needle = "qz" + uuid.uuid4().hex[:6]
+    for suffix in ("a", "b", "c"):
+        register(client, f"{needle}{suffix}")
+    register(client, needle)
+
+    monkeypatch.setattr(student_service._settings, "student_search_candidates", 2)
+    response = client.get(f"{API}/teams/search-users", params={"q": needle}, headers=headers)
+    # Без точного уровня в ORDER BY кандидатами стали бы первые по id префиксные совпадения
+    assert [student["full_name"] for student in response.json()] == [needle, f"{needle}a"]
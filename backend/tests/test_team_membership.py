@@ -0,0 +1,45 @@
+from conftest import API
+
+
+def join(client, team_id, owner, member):
+    member_id = client.get(f"{API}/auth/me", headers=member).json()["id"]
+    response = client.post(f"{API}/teams/{team_id}/invitations", json={"invited_user_id": member_id}, headers=owner)
+    assert response.status_code == 201, response.text
+    invitation_id = response.json()["id"]
+    response = client.post(
+        f"{API}/teams/invitations/{invitation_id}/respond", json={"id": invitation_id, "action": "accept"}, headers=member
+    )
+    assert response.status_code == 200, response.text
+    return member_id
+
+
+def test_member_loses_access_right_after_leaving(client, make_user, make_team):
+    owner, member = make_user(), make_user()
+    team_id = make_team(owner)
+    join(client, team_id, owner, member)
+    # Кэш членства заполнен положительным ответом
+    assert client.get(f"{API}/teams/{team_id}", headers=member).status_code == 200
+
+    assert client.post(f"{API}/teams/{team_id}/leave", headers=member).status_code == 200
+    assert client.get(f"{API}/teams/{team_id}", headers=member).status_code == 403
+    assert client.post(f"{API}/teams/{team_id}/leave", headers=member).status_code == 400
+
+
+def test_owner_leaving_hands_team_over(client, make_user, make_team):
+    owner, member = make_user(), make_user()
+    team_id = make_team(owner)
+    member_id = join(client, team_id, owner, member)
+    assert client.get(f"{API}/teams/{team_id}", headers=owner).status_code == 200
+
+    assert client.post(f"{API}/teams/{team_id}/leave", headers=owner).status_code == 200
+    assert client.get(f"{API}/teams/{team_id}", headers=owner).status_code == 403
+    team = client.get(f"{API}/teams/{team_id}", headers=member).json()
+    assert team["owner_id"] == member_id
+    assert [student["id"] for student in team["members"]] == [member_id]
+
+
+def test_outsider_cannot_leave(client, make_user, make_team):
+    owner, outsider = make_user(), make_user()
+    team_id = make_team(owner)
+    assert client.post(f"{API}/teams/{team_id}/leave", headers=outsider).status_code == 400
+    assert client.get(f"{API}/teams/{team_id}", headers=owner).status_code == 200